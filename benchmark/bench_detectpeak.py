@@ -0,0 +1,80 @@
+"""
+Benchmark of casa_fits.detectpeak against the previous pixel-by-pixel implementation.
+
+Usage:
+    python benchmark/bench_detectpeak.py [size]
+"""
+import sys
+import time
+import numpy as np
+
+sys.path.append('.')
+from casa_fits import Image, detectpeak
+
+
+def detectpeak_loop(img: Image, rms: float, threshold_rms: int = 5, find_max: bool = True):
+    """The previous implementation of detectpeak (Python double loop)."""
+    img.convert_axes_unit("arcsec")
+    beam_x = img.beam[0] / abs(img.incr_x)
+    beam_y = img.beam[1] / abs(img.incr_y)
+    beam_ang = (90 + img.beam[2]) * np.pi / 180
+    cell_width = int(
+        np.sqrt((beam_x * np.cos(beam_ang)) ** 2 + (beam_x * np.sin(beam_ang)) ** 2) + 1
+    )
+    cell_height = int(
+        np.sqrt((beam_x * np.sin(beam_ang)) ** 2 + (beam_y * np.cos(beam_ang)) ** 2) + 1
+    )
+    peak = []
+    threshold = threshold_rms * rms
+    data = img.get_two_dim_data()
+    for i in range(cell_height // 2, img.height - cell_height // 2, 1):
+        for j in range(cell_width // 2, img.width - cell_width // 2, 1):
+            if data[i][j] > threshold:
+                region = data[
+                    i - cell_height // 2 : i + cell_height // 2 + 1,
+                    j - cell_width // 2 : j + cell_width // 2 + 1,
+                ]
+                if find_max:
+                    if data[i][j] == np.max(region):
+                        peak.append((j, i, data[i][j]))
+                else:
+                    if data[i][j] == np.min(region):
+                        peak.append((j, i, data[i][j]))
+    return peak
+
+
+def make_image(size: int) -> Image:
+    rng = np.random.default_rng(0)
+    img = Image()
+    img.width = size
+    img.height = size
+    img.incr_x = -0.05
+    img.incr_y = 0.05
+    img.unit_x = 'arcsec'
+    img.unit_y = 'arcsec'
+    img.beam = (0.3, 0.2, 30.0)
+    img.data = rng.normal(0, 1, (1, 1, size, size)).astype(np.float32)
+    # point sources
+    ys, xs = rng.integers(10, size - 10, (2, size // 4))
+    img.data[0, 0, ys, xs] += rng.uniform(5, 50, ys.size).astype(np.float32)
+    return img
+
+
+def main(size: int = 1024):
+    img = make_image(size)
+    t0 = time.perf_counter()
+    peak_loop = detectpeak_loop(img, 1.0, 2)
+    t1 = time.perf_counter()
+    peak_box = detectpeak(img, 1.0, 2)
+    t2 = time.perf_counter()
+    peak_beam = detectpeak(img, 1.0, 2, footprint='beam')
+    t3 = time.perf_counter()
+    assert peak_box == peak_loop
+    print(f'Image size: {size} x {size}, {len(peak_loop)} peaks')
+    print(f'loop:              {t1 - t0:8.3f} s')
+    print(f'vectorized (box):  {t2 - t1:8.3f} s  (x{(t1 - t0) / (t2 - t1):.0f})')
+    print(f'vectorized (beam): {t3 - t2:8.3f} s  ({len(peak_beam)} peaks)')
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1024)
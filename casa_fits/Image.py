@@ -1,11 +1,15 @@
+from collections.abc import Callable, Hashable, Iterator
+from typing import Any
 import numpy as np
+from .chunked import ChunkedArray
+from .lazy_data import LazyFitsData
 from .utilities import unitConvDict
 
 
 class Image:
     def __init__(self):
         self.imagename: str | None = None
-        self.data: np.ndarray | None = None
+        self.data = None
         self.width: int | None = None
         self.height: int | None = None
         self.nchan: int | None = None
@@ -15,10 +19,45 @@ class Image:
         self.incr_x: float | None = None
         self.incr_y: float | None = None
         self.incr_hz: float | None = None
+        self.unit_freq: str | None = None  # Unit of freq0 and incr_hz (e.g. 'Hz' or 'm/s')
+        self.restfreq: float | None = None  # Rest frequency in Hz
         self.unit_x: str | None = None
         self.unit_y: str | None = None
         self.unit_data: str | None = None
         self.beam: tuple[float, float, float] | None = None  # (major, minor, angle)
+        self.nbytes_read: int | None = None  # Bytes read from the file by the loader
+
+    @property
+    def data(self) -> np.ndarray | LazyFitsData | ChunkedArray | None:
+        return self._data
+
+    @data.setter
+    def data(self, value: np.ndarray | LazyFitsData | ChunkedArray | None):
+        self._data = value
+        # Statistics of the previous data are no longer valid
+        self._stats: dict = {}
+
+    def cached_stat(self, key: Hashable, compute: Callable[[], Any]) -> Any:
+        """
+        Returns a statistic of the data computed once and cached until the data is replaced.
+        If the data is modified in place, call `invalidate_stats`.
+
+        Args:
+            key (Hashable): Key of the statistic.
+            compute (Callable[[], Any]): Function computing the statistic.
+
+        Returns:
+            Any: The statistic.
+        """
+        if key not in self._stats:
+            self._stats[key] = compute()
+        return self._stats[key]
+
+    def invalidate_stats(self) -> None:
+        """
+        Discards the cached statistics of the data. Necessary only when the data is modified in place.
+        """
+        self._stats = {}
 
     def convert_axes_unit(self, unit: str):
         """
@@ -113,28 +152,37 @@ class Image:
             yticks_label[i] = _fmt.format(s)
         return xticks, xticks_label, yticks, yticks_label
 
-    def get_two_dim_data(self, stokes: int = 0, chan: int = 0) -> np.ndarray:
+    def _check_stokes_chan(self, stokes: int, chan: int) -> None:
         """
-        Extracts the 2D data based on the specified Stokes and channel indices.
-
-        Args:
-            stokes (int, optional): Stokes parameter index. Defaults to 0.
-            chan (int, optional): Channel index. Defaults to 0.
-
-        Returns:
-            np.ndarray: The extracted 2D data.
+        Checks that the Stokes and channel indices are within the image data.
         """
         if self.data is None:
             raise ValueError("Image data is None.")
-        if stokes < 0 or stokes >= self.data.shape[0]:
+        if self.data.ndim == 4 and (stokes < 0 or stokes >= self.data.shape[0]):
             raise IndexError(
                 f"Stokes index {stokes} is out of bounds for the image data."
             )
-        if chan < 0 or chan >= self.data.shape[1]:
+        if self.data.ndim >= 3 and (chan < 0 or chan >= self.data.shape[-3]):
             raise IndexError(
                 f"Channel index {chan} is out of bounds for the image data."
             )
 
+    def get_two_dim_data(self, stokes: int = 0, chan: int = 0) -> np.ndarray:
+        """
+        Extracts the 2D data based on the specified Stokes and channel indices.
+
+        Args:
+            stokes (int, optional): Stokes parameter index. Defaults to 0.
+            chan (int, optional): Channel index. Defaults to 0.
+
+        Returns:
+            np.ndarray: The extracted 2D data.
+        """
+        self._check_stokes_chan(stokes, chan)
+        if isinstance(self.data, LazyFitsData):
+            return self.data.get_plane(stokes, chan)
+        if isinstance(self.data, ChunkedArray):
+            return self.data[(stokes, chan)[4 - self.data.ndim :]].compute()
         if self.data.ndim == 4:
             return self.data[stokes, chan]
         elif self.data.ndim == 3:
@@ -144,6 +192,97 @@ class Image:
         else:
             raise ValueError("Unsupported image data dimensions.")
 
+    def get_two_dim_window(
+        self, stokes: int, chan: int, window: tuple[int, int, int, int]
+    ) -> np.ndarray:
+        """
+        Extracts a window of the 2D data.
+        For the lazily loaded data, only the window is read from the file.
+
+        Args:
+            stokes (int): Stokes parameter index.
+            chan (int): Channel index.
+            window (tuple[int, int, int, int]): (left, right, bottom, top) pixel window. `right` and `top` are exclusive.
+
+        Returns:
+            np.ndarray: The extracted 2D data.
+        """
+        if isinstance(self.data, LazyFitsData):
+            self._check_stokes_chan(stokes, chan)
+            return self.data.read_window(stokes, chan, window)
+        left, right, bottom, top = window
+        if isinstance(self.data, ChunkedArray):
+            self._check_stokes_chan(stokes, chan)
+            lead = (stokes, chan)[4 - self.data.ndim :]
+            return self.data[lead + (slice(bottom, top), slice(left, right))].compute()
+        return self.get_two_dim_data(stokes, chan)[bottom:top, left:right]
+
+    def get_channels(
+        self,
+        stokes: int = 0,
+        start: int = 0,
+        stop: int | None = None,
+        window: tuple[int, int, int, int] | None = None,
+    ) -> np.ndarray:
+        """
+        Extracts a range of channels of the specified Stokes as a 3D array (channel, y, x).
+        For the lazily loaded data, the channels are read from the file at once without caching.
+
+        Args:
+            stokes (int, optional): Stokes parameter index. Defaults to 0.
+            start (int, optional): First channel index. Defaults to 0.
+            stop (int | None, optional): Channel index after the last one. If None, up to the last channel.
+            window (tuple[int, int, int, int] | None, optional): (left, right, bottom, top) pixel window.
+                If None, the full plane. Defaults to None.
+
+        Returns:
+            np.ndarray: The 3D data.
+        """
+        if self.data is None:
+            raise ValueError("Image data is None.")
+        nchan = self.data.shape[-3] if self.data.ndim >= 3 else 1
+        if stop is None:
+            stop = nchan
+        self._check_stokes_chan(stokes, start)
+        if stop <= start or stop > nchan:
+            raise IndexError(f"Channel range ({start}, {stop}) is out of bounds for the image data.")
+        if isinstance(self.data, LazyFitsData):
+            return self.data.read_channels(stokes, start, stop, window)
+        if window is None:
+            rows = cols = slice(None)
+        else:
+            left, right, bottom, top = window
+            rows, cols = slice(bottom, top), slice(left, right)
+        if isinstance(self.data, ChunkedArray):
+            if self.data.ndim == 2:
+                return self.data[rows, cols].compute()[np.newaxis]
+            lead = (stokes, slice(start, stop))[4 - self.data.ndim :]
+            return self.data[lead + (rows, cols)].compute()
+        if self.data.ndim == 4:
+            return self.data[stokes, start:stop, rows, cols]
+        elif self.data.ndim == 3:
+            return self.data[start:stop, rows, cols]
+        elif self.data.ndim == 2:
+            return self.data[np.newaxis, rows, cols]
+        else:
+            raise ValueError("Unsupported image data dimensions.")
+
+    def iter_planes(self) -> Iterator[tuple[int, int, np.ndarray]]:
+        """
+        Iterates over all 2D planes of the image data.
+        For the lazily loaded data, only one plane is read at a time.
+
+        Yields:
+            tuple[int, int, np.ndarray]: Stokes index, channel index and the 2D data.
+        """
+        if self.data is None:
+            raise ValueError("Image data is None.")
+        nstokes = self.data.shape[0] if self.data.ndim == 4 else 1
+        nchan = self.data.shape[-3] if self.data.ndim >= 3 else 1
+        for stokes in range(nstokes):
+            for chan in range(nchan):
+                yield stokes, chan, self.get_two_dim_data(stokes, chan)
+
     def keep_stokes_chan(self, stokes: int, chan: int):
         """
         Keep only specific stokes and channel from the image data.
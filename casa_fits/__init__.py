@@ -1,7 +1,21 @@
 from .Image import Image
+from .lazy_data import LazyFitsData
+from .chunked import ChunkedArray
 from .io import load_fits, load_image
-from .radial_profile import radial_profile
+from .radial_profile import radial_profile, radial_profile_cube
 from .imshow import imshow, overlay_contour
 from .imstat import imstat
+from .cubestat import cubestat
 from .radial_cut import radial_cut
-from .detectpeak import detectpeak
\ No newline at end of file
+from .azimuthal_cut import azimuthal_cut, azimuthal_cut_cube
+from .polar import reproject_polar, polar_radial_profile, polar_azimuthal_profile
+from .detectpeak import detectpeak, detectpeak_cube
+from .moments import immoments, velocity_axis
+from .spectrum import extract_spectra
+from .pv import PVDiagram, pv_diagram
+from .parallel import map_channels
+from .channel_map import ChannelMap
+from .movie import save_movie
+from .batch import render_images
+from .scaling import data_range, percentile_range, asinh_norm
+from .reproject import reproject_image
\ No newline at end of file
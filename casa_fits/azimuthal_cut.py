@@ -0,0 +1,203 @@
+from math import degrees
+import numpy as np
+from .Image import Image
+from .geometry import AnnulusWeights, get_annulus_weights, get_disk_geometry
+from .utilities import _binned_stats
+
+
+def _annulus(
+    img: Image, radius: float, beam_factor: float
+) -> tuple[tuple[int, int], float, float, float]:
+    """
+    Returns the center, the radial range of the annulus (in pixels) and the azimuthal sampling (in degrees).
+    """
+    if img.data is None:
+        raise ValueError("Image data is None.")
+    height, width = img.data.shape[-2:]
+    # Calculate the center of the image
+    center_x = width // 2
+    center_y = height // 2
+
+    # Calculate the beam size in pixel units
+    if img.beam is None:
+        raise ValueError("The image does not have a beam size.")
+    if img.incr_x is None or img.incr_y is None:
+        raise ValueError("Image increment x or y is None.")
+    img.convert_axes_unit("arcsec")
+    beam_x = img.beam[0] / np.abs(img.incr_x)
+    beam_y = img.beam[1] / np.abs(img.incr_y)
+    beam_size = max(beam_x, beam_y)
+
+    # Convert the input radius from arcsec to pixels.
+    radius_px = radius / np.abs(img.incr_x)
+
+    # Define the radial range (annulus width) in deprojected pixel units.
+    r_min = radius_px - beam_size / 2
+    r_max = radius_px + beam_size / 2
+
+    # Sampling step in the azimuthal direction.
+    sampling_deg = degrees(beam_size * beam_factor / radius_px)
+    return (center_x, center_y), r_min, r_max, sampling_deg
+
+
+def _azimuthal_bins(
+    img: Image, radius: float, inc: float, PA: float, beam_factor: float
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Returns the azimuthal bins and the pixels in the annulus.
+
+    Returns:
+        tuple: A tuple of three numpy arrays:
+            - The azimuthal angle (in degrees) bins.
+            - The boolean mask of the pixels in the annulus.
+            - The bin index of each pixel in the annulus.
+    """
+    (center_x, center_y), r_min, r_max, sampling_deg = _annulus(img, radius, beam_factor)
+    line_azm = np.arange(0, 360, sampling_deg)
+
+    # Deprojected radius and azimuth angle of each pixel (cached for the same geometry).
+    geom = get_disk_geometry(
+        img.data.shape[-2:], (center_x, center_y), inc, PA, np.abs(img.incr_x)
+    )
+
+    # Select pixels within the annulus.
+    in_annulus = (geom.r >= r_min) & (geom.r <= r_max)
+
+    # Deprojected azimuth angle (in degrees) measured from the north.
+    theta = (geom.theta[in_annulus] - 90) % 360
+
+    # The closest azimuthal bin. Angles beyond the last bin belong to the last bin.
+    idx = np.minimum(np.floor(theta / sampling_deg + 0.5).astype(int), len(line_azm) - 1)
+
+    return line_azm, in_annulus, idx
+
+
+def _exact_weights(
+    img: Image, radius: float, inc: float, PA: float, beam_factor: float
+) -> tuple[np.ndarray, AnnulusWeights]:
+    """
+    Returns the azimuthal bins and the exact fractional weights of the pixels in the wedges of the annulus.
+    The wedge of each bin extends halfway to the neighboring bins, and the last one extends to 360 degrees.
+
+    Returns:
+        tuple: The azimuthal angle (in degrees) bins and the weights.
+    """
+    center, r_min, r_max, sampling_deg = _annulus(img, radius, beam_factor)
+    line_azm = np.arange(0, 360, sampling_deg)
+    azm_edges = np.concatenate([[0], line_azm[1:] - sampling_deg / 2, [360]])
+    # The wedges are measured from the x-axis of the rotated frame
+    theta_ranges = tuple(zip(azm_edges[:-1] + 90, azm_edges[1:] + 90))
+    weights = get_annulus_weights(
+        img.data.shape[-2:], center, inc, PA, (max(r_min, 0), r_max), theta_ranges
+    )
+    return line_azm, weights
+
+
+def azimuthal_cut(
+    img: Image,
+    radius: float,
+    inc: float = 0.0,
+    PA: float = 0.0,
+    beam_factor: float = 0.5,
+    stokes: int = 0,
+    chan: int = 0,
+    exact: bool = False,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Extract an azimuthal cut from an image using a deprojected elliptical annulus.
+
+    The pixels within the annulus [radius - beam_size/2, radius + beam_size/2] in the deprojected frame
+    are assigned to the closest azimuthal bin. The azimuthal angle is measured from the north in the deprojected frame.
+
+    Args:
+        img (Image): The Image object.
+        radius (float): The radius in arcsec.
+        inc (float, optional): The inclination angle in degrees. Defaults to 0.0.
+        PA (float, optional): The position angle in degrees. Defaults to 0.0.
+        beam_factor (float, optional): Sampling size based on the beam size. Defaults to 0.5.
+        stokes (int, optional): Stokes parameter index. Defaults to 0.
+        chan (int, optional): Channel index. Defaults to 0.
+        exact (bool, optional): If True, each pixel is weighted by the exact fraction of its area
+            within the annulus and the wedge of each bin. The weights are cached for the geometry. Defaults to False.
+
+    Returns:
+        tuple: A tuple of three numpy arrays:
+            - The azimuthal angle (in degrees) bins.
+            - The mean intensity in each bin.
+            - The standard deviation of the intensity in each bin.
+    """
+    data = img.get_two_dim_data(stokes, chan)
+    if exact:
+        line_azm, weights = _exact_weights(img, radius, inc, PA, beam_factor)
+        line_mean, line_std, _ = weights.stats(data.reshape(1, -1))
+        return line_azm, line_mean[0, 0], line_std[0, 0]
+    line_azm, in_annulus, idx = _azimuthal_bins(img, radius, inc, PA, beam_factor)
+    line_mean, line_std, _ = _binned_stats(
+        data[in_annulus][np.newaxis], idx, len(line_azm), ignore_nan=False
+    )
+    return line_azm, line_mean[0], line_std[0]
+
+
+def azimuthal_cut_cube(
+    img: Image,
+    radius: float,
+    inc: float = 0.0,
+    PA: float = 0.0,
+    beam_factor: float = 0.5,
+    stokes: int = 0,
+    chunk_size: int = 64,
+    exact: bool = False,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Extract azimuthal cuts of all channels of an image.
+
+    The annulus and the bins are the same as `azimuthal_cut` and computed once for all channels.
+    The channels are processed (and read from the file for lazily loaded data) in chunks of `chunk_size`.
+
+    Args:
+        img (Image): The Image object.
+        radius (float): The radius in arcsec.
+        inc (float, optional): The inclination angle in degrees. Defaults to 0.0.
+        PA (float, optional): The position angle in degrees. Defaults to 0.0.
+        beam_factor (float, optional): Sampling size based on the beam size. Defaults to 0.5.
+        stokes (int, optional): Stokes parameter index. Defaults to 0.
+        chunk_size (int, optional): Number of channels processed at a time. Defaults to 64.
+        exact (bool, optional): If True, the pixels are weighted by the exact fraction of their area in the bins.
+            See `azimuthal_cut`. Defaults to False.
+
+    Returns:
+        tuple: A tuple of four numpy arrays:
+            - The azimuthal angle (in degrees) bins with the shape (nbins,).
+            - The mean intensity with the shape (nchan, nbins).
+            - The standard deviation of the intensity with the shape (nchan, nbins).
+            - The number of pixels in each bin with the shape (nchan, nbins).
+              If exact is True, the sum of the fractional weights of the finite pixels.
+    """
+    if img.data is None:
+        raise ValueError("Image data is None.")
+    if chunk_size <= 0:
+        raise ValueError("chunk_size must be a positive integer.")
+    if exact:
+        line_azm, weights = _exact_weights(img, radius, inc, PA, beam_factor)
+    else:
+        line_azm, in_annulus, idx = _azimuthal_bins(img, radius, inc, PA, beam_factor)
+    nbins = len(line_azm)
+    nchan = img.data.shape[-3] if img.data.ndim >= 3 else 1
+
+    line_mean = np.empty((nchan, nbins))
+    line_std = np.empty((nchan, nbins))
+    line_count = np.empty((nchan, nbins), dtype=float if exact else np.int64)
+    for start in range(0, nchan, chunk_size):
+        stop = min(start + chunk_size, nchan)
+        data = img.get_channels(stokes, start, stop)
+        if exact:
+            stats = (a[:, 0] for a in weights.stats(data.reshape(stop - start, -1)))
+        else:
+            stats = _binned_stats(data[:, in_annulus], idx, nbins, ignore_nan=False)
+        (
+            line_mean[start:stop],
+            line_std[start:stop],
+            line_count[start:stop],
+        ) = stats
+
+    return line_azm, line_mean, line_std, line_count
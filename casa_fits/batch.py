@@ -0,0 +1,104 @@
+import os
+import time
+from collections.abc import Sequence
+from concurrent.futures import ProcessPoolExecutor
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from .io import load_fits, load_image
+from .imshow import imshow
+
+
+def _render(task: tuple[str, str, dict, dict]) -> dict:
+    """
+    Loads an image and saves its plot with a figure of the Agg backend (without pyplot).
+    """
+    imagename, output, load_kwargs, plot_kwargs = task
+    plot_kwargs = dict(plot_kwargs)
+    figsize = plot_kwargs.pop("figsize", None)
+    dpi = plot_kwargs.pop("dpi", 100)
+
+    start = time.perf_counter()
+    if imagename.lower().endswith((".fits", ".fit", ".fts")):
+        # Only the window and the plane to plot are read
+        stokes = plot_kwargs.pop("stokes", 0)
+        chan = plot_kwargs.pop("chan", 0)
+        img = load_fits(imagename, stokes=stokes, chan=chan, **load_kwargs)
+    else:
+        img = load_image(imagename, **load_kwargs)
+    loaded = time.perf_counter()
+
+    fig = Figure(figsize=figsize, dpi=dpi)
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot()
+    imshow(ax, img, **plot_kwargs)
+    drawn = time.perf_counter()
+    fig.savefig(output)
+    saved = time.perf_counter()
+    return {
+        "imagename": imagename,
+        "output": output,
+        "load_time": loaded - start,
+        "plot_time": drawn - loaded,
+        "save_time": saved - drawn,
+        "total_time": saved - start,
+    }
+
+
+def render_images(
+    imagenames: Sequence[str],
+    outputs: Sequence[str] | None = None,
+    plot_kwargs: dict | Sequence[dict] | None = None,
+    width: int | None = None,
+    height: int | None = None,
+    center_radec: tuple[float, float] | None = None,
+    workers: int | None = None,
+) -> list[dict]:
+    """
+    Render many images to files in parallel processes.
+
+    Each worker loads its image (only the window of `width`, `height` and `center_radec`,
+    and for FITS files only the plane of `stokes` and `chan` of the plot options), plots it with `imshow`
+    on a figure of the Agg backend without pyplot, and saves it. No data is sent between the processes.
+    For FITS files only the plotted plane is read, so the color scale is the range of the plane unless
+    `vmin` and `vmax` are given.
+
+    Args:
+        imagenames (Sequence[str]): Paths to the FITS files or CASA images.
+        outputs (Sequence[str] | None, optional): Output file names. If None, the image name with '.png'.
+        plot_kwargs (dict | Sequence[dict] | None, optional): Keyword arguments of `imshow` (e.g. stokes, chan, cmap,
+            vmin, vmax) for all images, or a list of them for each image. 'figsize' and 'dpi' are used for the figure.
+        width (int | None, optional): Width of the window to load. If None, the full width.
+        height (int | None, optional): Height of the window to load. If None, the full height.
+        center_radec (tuple[float, float] | None, optional): Center of the window in RA, Dec. If None, the center of the image.
+        workers (int | None, optional): Number of processes. If None, the number of CPUs.
+            If 1, the images are rendered in this process.
+
+    Returns:
+        list[dict]: For each image in order, the image name ('imagename'), the output file name ('output'),
+            and the time in seconds to load ('load_time'), plot ('plot_time') and save ('save_time') it and the total ('total_time').
+    """
+    imagenames = list(imagenames)
+    if outputs is None:
+        outputs = [f"{os.path.splitext(name.rstrip('/'))[0]}.png" for name in imagenames]
+    outputs = list(outputs)
+    if len(outputs) != len(imagenames):
+        raise ValueError(f"The number of outputs ({len(outputs)}) must be that of the images ({len(imagenames)}).")
+    if plot_kwargs is None or isinstance(plot_kwargs, dict):
+        plot_kwargs = [plot_kwargs or {}] * len(imagenames)
+    plot_kwargs = list(plot_kwargs)
+    if len(plot_kwargs) != len(imagenames):
+        raise ValueError(
+            f"The number of plot_kwargs ({len(plot_kwargs)}) must be that of the images ({len(imagenames)})."
+        )
+    load_kwargs = {"width": width, "height": height, "center_radec": center_radec}
+    tasks = [
+        (name, output, load_kwargs, kwargs) for name, output, kwargs in zip(imagenames, outputs, plot_kwargs)
+    ]
+    if workers is None:
+        workers = os.cpu_count() or 1
+
+    if workers == 1 or len(tasks) <= 1:
+        return [_render(task) for task in tasks]
+    with ProcessPoolExecutor(max_workers=min(workers, len(tasks))) as executor:
+        chunksize = max(len(tasks) // (4 * workers), 1)
+        return list(executor.map(_render, tasks, chunksize=chunksize))
@@ -0,0 +1,253 @@
+import numpy as np
+import matplotlib.pyplot as plt
+from matplotlib.figure import Figure
+from .Image import Image
+from .imshow import draw_beam
+from .matplotlib_helper import set_cbar, set_axes_options
+from .moments import velocity_axis
+from .utilities import unitDict
+
+
+def _read_planes(img: Image, stokes: int, chans: list[int]) -> np.ndarray:
+    """
+    Returns the 2D planes of the channels as a 3D array.
+    Consecutive channels are read at once.
+    """
+    if chans == list(range(chans[0], chans[-1] + 1)):
+        return img.get_channels(stokes, chans[0], chans[-1] + 1)
+    return np.stack([img.get_channels(stokes, chan, chan + 1)[0] for chan in chans])
+
+
+def _channel_labels(img: Image, restfreq: float | None) -> list[str]:
+    """
+    Returns the label of each channel: the velocity if available, otherwise the channel index.
+    """
+    nchan = img.data.shape[-3] if img.data.ndim >= 3 else 1
+    try:
+        velocity, _, unit = velocity_axis(img, restfreq)
+    except ValueError:
+        return [f"ch {chan}" for chan in range(nchan)]
+    return [f"{v:.2f} {unit}" for v in velocity]
+
+
+class ChannelMap:
+    """
+    Channel maps of a cube on a grid of panels.
+
+    The figure, the images, the ticks, the beam and the colorbar are created once with the normalization
+    shared by all channels. The panels have the same limits and ticks, and only the outer panels of each page are labeled.
+    Each page of `nrows * ncols` channels is drawn by replacing the data of the images.
+
+    Attributes:
+        img (Image): The Image object of the cube.
+        fig (matplotlib.figure.Figure): The figure.
+        axes (np.ndarray): The Axes objects with the shape (nrows, ncols).
+        images (list[matplotlib.image.AxesImage]): The image of each panel.
+        labels (list[matplotlib.text.Text]): The label of the channel of each panel.
+        beams (list[matplotlib.patches.Ellipse | None]): The beam of each panel, shown only in the lowest panel of the first column.
+        chans (list[int]): Channel indices to plot.
+        vmin (float): Minimum of the color scale.
+        vmax (float): Maximum of the color scale.
+        page (int): The page currently drawn.
+    """
+
+    def __init__(
+        self,
+        img: Image,
+        nrows: int = 3,
+        ncols: int = 4,
+        chans: list[int] | None = None,
+        stokes: int = 0,
+        vmin: float | None = None,
+        vmax: float | None = None,
+        cmap: str = "jet",
+        width: int | None = None,
+        height: int | None = None,
+        axisunit: str | None = None,
+        restfreq: float | None = None,
+        fig: Figure | None = None,
+        figsize: tuple[float, float] | None = None,
+        xtickspan: int = 1,
+        ytickspan: int = 1,
+        ticksfmt: str = ":.1f",
+        cbeam: str = "white",
+        label_color: str = "white",
+        cbar_label: str = "",
+        cbar_unit: str | None = None,
+        rescale: str = "milli",
+        cbar_fmt: str = ":.2f",
+        chunk_size: int = 64,
+    ):
+        """
+        Args:
+            img (Image): The Image object of the cube.
+            nrows (int, optional): Number of rows of panels. Defaults to 3.
+            ncols (int, optional): Number of columns of panels. Defaults to 4.
+            chans (list[int] | None, optional): Channel indices to plot. If None, all channels.
+            stokes (int, optional): Stokes parameter index. Defaults to 0.
+            vmin (float | None, optional): Minimum of the color scale. If None, the minimum of the channels.
+            vmax (float | None, optional): Maximum of the color scale. If None, the maximum of the channels.
+            cmap (str, optional): Colormap. Defaults to 'jet'.
+            width (int | None, optional): Width in pixels of the region around the center to show. If None, the full width.
+            height (int | None, optional): Height in pixels of the region around the center to show. If None, the full height.
+            axisunit (str | None, optional): Unit of the axes. If None, the unit of the image.
+            restfreq (float | None, optional): Rest frequency in Hz for the velocity labels of a frequency axis.
+            fig (matplotlib.figure.Figure | None, optional): The figure to draw on. If None, a new figure is created.
+            figsize (tuple[float, float] | None, optional): Size of the new figure. If None, 2.2 inches per panel.
+            xtickspan (int, optional): Span of ticks of x-axis. Defaults to 1.
+            ytickspan (int, optional): Span of ticks of y-axis. Defaults to 1.
+            ticksfmt (str, optional): Format of tick labels. Defaults to ':.1f'.
+            cbeam (str, optional): Color of the beam drawn in the bottom left panel. Defaults to 'white'.
+            label_color (str, optional): Color of the channel labels. Defaults to 'white'.
+            cbar_label (str, optional): Label of the colorbar. Defaults to ''.
+            cbar_unit (str | None, optional): Unit of the colorbar. If None, the unit of the data.
+            rescale (str, optional): SI prefix to rescale the colorbar. Defaults to 'milli'.
+            cbar_fmt (str, optional): Format of the colorbar labels. Defaults to ':.2f'.
+            chunk_size (int, optional): Number of channels read at a time to find the color scale. Defaults to 64.
+        """
+        if img.data is None:
+            raise ValueError("Image data is None.")
+        if nrows <= 0 or ncols <= 0:
+            raise ValueError("nrows and ncols must be positive integers.")
+        if chunk_size <= 0:
+            raise ValueError("chunk_size must be a positive integer.")
+        if axisunit:
+            img.convert_axes_unit(axisunit)
+        if img.unit_x is None or img.unit_y is None:
+            raise ValueError("Image unit_x or unit_y is None.")
+        nchan = img.data.shape[-3] if img.data.ndim >= 3 else 1
+        if chans is None:
+            chans = range(nchan)
+        self.chans = [int(c) for c in chans]
+        if not self.chans:
+            raise ValueError("No channel to plot.")
+        for chan in self.chans:
+            img._check_stokes_chan(stokes, chan)
+        self.img = img
+        self.stokes = stokes
+        self.per_page = nrows * ncols
+        self.page = 0
+
+        # Shared normalization
+        if vmin is None or vmax is None:
+            data_min, data_max = np.inf, -np.inf
+            for start in range(0, len(self.chans), chunk_size):
+                planes = _read_planes(img, stokes, self.chans[start : start + chunk_size])
+                data_min = min(data_min, np.nanmin(planes))
+                data_max = max(data_max, np.nanmax(planes))
+            vmin = data_min if vmin is None else vmin
+            vmax = data_max if vmax is None else vmax
+        self.vmin, self.vmax = vmin, vmax
+
+        self._label = _channel_labels(img, restfreq)
+
+        if fig is None:
+            fig = plt.figure(figsize=figsize or (2.2 * ncols + 1.2, 2.2 * nrows))
+        self.fig = fig
+        # The axes are not shared because sharing makes each change of the limits visit all panels
+        self.axes = fig.subplots(nrows, ncols, squeeze=False)
+
+        # Artists, limits and ticks are created once and only the data is updated by draw
+        full_height, full_width = img.data.shape[-2:]
+        x_lim = (-0.5, full_width - 0.5)
+        y_lim = (-0.5, full_height - 0.5)
+        if width:
+            x_mid = (full_width - 1) // 2
+            x_lim = (x_mid - width // 2, x_mid + width // 2)
+        if height:
+            y_mid = (full_height - 1) // 2
+            y_lim = (y_mid - height // 2, y_mid + height // 2)
+        ticks = img.get_ticks(xtickspan, ytickspan, True, ticksfmt, width, height)
+        blank = np.full((full_height, full_width), np.nan)
+        self.images = []
+        self.labels = []
+        self.beams = []
+        for ax in self.axes.ravel():
+            self.images.append(
+                ax.imshow(blank, cmap=cmap, aspect="equal", vmin=vmin, vmax=vmax, origin="lower")
+            )
+            self.labels.append(
+                ax.text(0.05, 0.95, "", transform=ax.transAxes, color=label_color, va="top", ha="left")
+            )
+            ax.set_xlim(x_lim)
+            ax.set_ylim(y_lim)
+            set_axes_options(ax, "", "", "", *ticks)
+            # Shown only in the lowest visible panel of the first column (see draw)
+            if img.beam is not None:
+                draw_beam(ax=ax, img=img, color=cbeam)
+                self.beams.append(ax.patches[-1])
+            else:
+                self.beams.append(None)
+        self._axis_labels = (f"RA [{unitDict[img.unit_x]}]", f"DEC [{unitDict[img.unit_y]}]")
+        set_cbar(
+            self.images[0],
+            cbar_label,
+            cbar_unit if cbar_unit is not None else img.unit_data,
+            rescale,
+            cbar_fmt,
+            ":.2f",
+            ax=self.axes.ravel().tolist(),
+        )
+        self.draw(0)
+
+    @property
+    def npages(self) -> int:
+        """
+        Number of pages.
+        """
+        return -(-len(self.chans) // self.per_page)
+
+    def draw(self, page: int) -> None:
+        """
+        Draws the channels of a page by replacing the data of the images.
+        The panels after the last channel are hidden.
+
+        Args:
+            page (int): Page index.
+        """
+        if not 0 <= page < self.npages:
+            raise IndexError(f"Page {page} is out of range [0, {self.npages}).")
+        chans = self.chans[page * self.per_page : (page + 1) * self.per_page]
+        planes = _read_planes(self.img, self.stokes, chans)
+        for index, (ax, im, label) in enumerate(zip(self.axes.ravel(), self.images, self.labels)):
+            if index < len(chans):
+                im.set_data(planes[index])
+                label.set_text(self._label[chans[index]])
+                ax.set_visible(True)
+            else:
+                ax.set_visible(False)
+        # Outer labels on the lowest visible panel of each column and the leftmost column
+        ncols = self.axes.shape[1]
+        for index, ax in enumerate(self.axes.ravel()):
+            col = index % ncols
+            bottom = index < len(chans) and index + ncols >= len(chans)
+            corner = bottom and col == 0
+            ax.tick_params(labelbottom=bottom, labelleft=col == 0)
+            ax.set_xlabel(self._axis_labels[0] if corner else "")
+            ax.set_ylabel(self._axis_labels[1] if corner else "")
+            if self.beams[index] is not None:
+                self.beams[index].set_visible(corner)
+        self.page = page
+
+    def save(self, filename: str, **kwargs) -> list[str]:
+        """
+        Draws and saves all pages.
+
+        Args:
+            filename (str): File name of the pages. `{page}` in the name is replaced with the page index.
+                If it does not contain `{page}`, the index is inserted before the extension for multiple pages.
+            **kwargs: Keyword arguments of `matplotlib.figure.Figure.savefig`.
+
+        Returns:
+            list[str]: The saved file names.
+        """
+        if "{page}" not in filename and self.npages > 1:
+            stem, dot, ext = filename.rpartition(".")
+            filename = f"{stem}-{{page}}.{ext}" if dot else f"{filename}-{{page}}"
+        names = []
+        for page in range(self.npages):
+            self.draw(page)
+            name = filename.format(page=page)
+            self.fig.savefig(name, **kwargs)
+            names.append(name)
+        return names
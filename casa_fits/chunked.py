@@ -0,0 +1,366 @@
+import itertools
+import warnings
+from collections.abc import Callable, Iterator
+from functools import partial
+import numpy as np
+from numpy.lib.mixins import NDArrayOperatorsMixin
+from .lazy_data import LazyFitsData
+
+# Default chunk sizes along (Stokes, channel, y, x)
+DEFAULT_CHUNKS = (1, 16, 512, 512)
+
+
+def _normalize_chunks(chunks: tuple[int, ...] | None, shape: tuple[int, ...]) -> tuple[int, ...]:
+    """
+    Returns the chunk size of each axis. -1 or None means the whole axis.
+    """
+    if chunks is None:
+        chunks = DEFAULT_CHUNKS[len(DEFAULT_CHUNKS) - len(shape) :] if len(shape) <= 4 else shape
+    if len(chunks) != len(shape):
+        raise ValueError(f"chunks must have {len(shape)} elements, but got {len(chunks)}.")
+    ret = []
+    for c, n in zip(chunks, shape):
+        if c is None or c == -1:
+            c = n
+        if c <= 0:
+            raise ValueError("Chunk sizes must be positive integers or -1.")
+        ret.append(max(min(int(c), n), 1))
+    return tuple(ret)
+
+
+class ChunkedArray(NDArrayOperatorsMixin):
+    """
+    Lazy array evaluated chunk by chunk.
+
+    The array is a recipe which computes any block of the array from its source (a numpy array,
+    `LazyFitsData` or a reader function) and the operations applied to it. Slicing and elementwise
+    operations (arithmetic operators and numpy ufuncs) return new lazy arrays without reading any data.
+    Reductions (`nanmin`, `nanmax`, `nansum`, `sum`, `min`, `max`, `mean`, `nanmean`) read one chunk at a time,
+    so the memory is bounded by the chunk size and the size of the result.
+    `np.asarray` or `compute` materializes the whole array.
+    """
+
+    def __init__(
+        self,
+        source: np.ndarray | LazyFitsData,
+        chunks: tuple[int, ...] | None = None,
+    ):
+        """
+        Args:
+            source (np.ndarray | LazyFitsData): The data.
+            chunks (tuple[int, ...] | None, optional): Chunk size of each axis (-1 for the whole axis).
+                If None, 1 Stokes, 16 channels and 512 x 512 pixels.
+        """
+        if isinstance(source, LazyFitsData):
+            reader = source.read_block
+        else:
+            source = np.asarray(source)
+            reader = source.__getitem__
+        self._init(tuple(source.shape), np.dtype(source.dtype), chunks, reader)
+
+    def _init(
+        self,
+        shape: tuple[int, ...],
+        dtype: np.dtype,
+        chunks: tuple[int, ...] | None,
+        reader: Callable[[tuple[slice, ...]], np.ndarray],
+    ) -> None:
+        self.shape = shape
+        self.dtype = dtype
+        self.chunks = _normalize_chunks(chunks, shape)
+        self._reader = reader
+
+    @classmethod
+    def from_reader(
+        cls,
+        shape: tuple[int, ...],
+        dtype: np.dtype,
+        reader: Callable[[tuple[slice, ...]], np.ndarray],
+        chunks: tuple[int, ...] | None = None,
+    ) -> "ChunkedArray":
+        """
+        Create an array whose blocks are computed by a function.
+
+        Args:
+            shape (tuple[int, ...]): Shape of the array.
+            dtype (np.dtype): Data type of the array.
+            reader (Callable[[tuple[slice, ...]], np.ndarray]): Function returning the block of the given slices
+                (one slice with step 1 per axis).
+            chunks (tuple[int, ...] | None, optional): Chunk size of each axis. See `ChunkedArray`.
+
+        Returns:
+            ChunkedArray: The array.
+        """
+        ret = cls.__new__(cls)
+        ret._init(tuple(shape), np.dtype(dtype), chunks, reader)
+        return ret
+
+    @property
+    def ndim(self) -> int:
+        return len(self.shape)
+
+    @property
+    def size(self) -> int:
+        return int(np.prod(self.shape))
+
+    @property
+    def nbytes(self) -> int:
+        return self.size * self.dtype.itemsize
+
+    def __len__(self) -> int:
+        return self.shape[0]
+
+    def __repr__(self) -> str:
+        return f"ChunkedArray(shape={self.shape}, dtype={self.dtype}, chunks={self.chunks})"
+
+    def read(self, slices: tuple[slice, ...]) -> np.ndarray:
+        """
+        Compute a block of the array.
+
+        Args:
+            slices (tuple[slice, ...]): One slice with step 1 per axis.
+
+        Returns:
+            np.ndarray: The block.
+        """
+        return np.asarray(self._reader(slices))
+
+    def iter_blocks(self) -> Iterator[tuple[tuple[slice, ...], np.ndarray]]:
+        """
+        Iterates over the chunks of the array.
+
+        Yields:
+            tuple[tuple[slice, ...], np.ndarray]: The slices of the chunk and its data.
+        """
+        starts = [range(0, n, c) for n, c in zip(self.shape, self.chunks)]
+        for start in itertools.product(*starts):
+            slices = tuple(
+                slice(s, min(s + c, n)) for s, c, n in zip(start, self.chunks, self.shape)
+            )
+            yield slices, self.read(slices)
+
+    def compute(self) -> np.ndarray:
+        """
+        Materialize the whole array.
+
+        Returns:
+            np.ndarray: The data.
+        """
+        return self.read(tuple(slice(0, n) for n in self.shape))
+
+    def __array__(self, dtype=None, copy=None) -> np.ndarray:
+        data = self.compute()
+        if dtype is not None:
+            data = data.astype(dtype)
+        return data
+
+    def rechunk(self, chunks: tuple[int, ...]) -> "ChunkedArray":
+        """
+        Returns the same array with other chunk sizes.
+        """
+        return ChunkedArray.from_reader(self.shape, self.dtype, self._reader, chunks)
+
+    def astype(self, dtype) -> "ChunkedArray":
+        """
+        Returns the array converted lazily to the data type.
+        """
+        return ChunkedArray.from_reader(
+            self.shape, dtype, lambda slices: self.read(slices).astype(dtype), self.chunks
+        )
+
+    # Slicing
+
+    def __getitem__(self, key) -> "ChunkedArray":
+        if not isinstance(key, tuple):
+            key = (key,)
+        if any(k is Ellipsis for k in key):
+            i = next(i for i, k in enumerate(key) if k is Ellipsis)
+            fill = (slice(None),) * (self.ndim - len(key) + 1)
+            key = key[:i] + fill + key[i + 1 :]
+        if len(key) > self.ndim:
+            raise IndexError(f"Too many indices for an array with {self.ndim} dimensions.")
+        key = key + (slice(None),) * (self.ndim - len(key))
+
+        # (start, step) of each kept axis and the fixed index of each dropped axis
+        axes = []
+        shape = []
+        chunks = []
+        for k, n, c in zip(key, self.shape, self.chunks):
+            if isinstance(k, (int, np.integer)):
+                index = int(k) + n if k < 0 else int(k)
+                if index < 0 or index >= n:
+                    raise IndexError(f"Index {k} is out of bounds for axis with size {n}.")
+                axes.append(index)
+            elif isinstance(k, slice):
+                start, stop, step = k.indices(n)
+                if step <= 0:
+                    raise IndexError("Only positive slice steps are supported.")
+                length = len(range(start, stop, step))
+                axes.append((start, step))
+                shape.append(length)
+                chunks.append(max(min(c // step, length), 1) if length else 1)
+            else:
+                raise IndexError("Only integers, slices and Ellipsis are supported.")
+
+        def reader(slices):
+            parent = []
+            it = iter(slices)
+            for a in axes:
+                if isinstance(a, tuple):
+                    start, step = a
+                    s = next(it)
+                    stop = start + (s.stop - 1) * step + 1 if s.stop > s.start else start + s.start * step
+                    parent.append(slice(start + s.start * step, stop))
+                else:
+                    parent.append(slice(a, a + 1))
+            block = self.read(tuple(parent))
+            # Apply the steps of the slices
+            block = block[tuple(slice(None, None, a[1]) if isinstance(a, tuple) else slice(None) for a in axes)]
+            return block.reshape([n for n, a in zip(block.shape, axes) if isinstance(a, tuple)])
+
+        return ChunkedArray.from_reader(tuple(shape), self.dtype, reader, tuple(chunks) or None)
+
+    # Elementwise operations
+
+    def __array_ufunc__(self, ufunc, method, *inputs, **kwargs):
+        if method != "__call__" or "out" in kwargs or ufunc.nout != 1:
+            return NotImplemented
+        for x in inputs:
+            if isinstance(x, ChunkedArray):
+                if x.shape != self.shape:
+                    raise ValueError(
+                        f"Operands must have the same shape, but got {x.shape} and {self.shape}."
+                    )
+            elif np.ndim(x) != 0:
+                return NotImplemented
+        # Data type of the result
+        samples = [np.empty(0, dtype=x.dtype) if isinstance(x, ChunkedArray) else x for x in inputs]
+        dtype = ufunc(*samples, **kwargs).dtype
+
+        def reader(slices):
+            args = [x.read(slices) if isinstance(x, ChunkedArray) else x for x in inputs]
+            return ufunc(*args, **kwargs)
+
+        return ChunkedArray.from_reader(self.shape, dtype, reader, self.chunks)
+
+    # Reductions
+
+    def _reduce(
+        self,
+        func: Callable,
+        combine: Callable,
+        axis: int | tuple[int, ...] | None,
+        keepdims: bool,
+        dtype=None,
+    ) -> np.ndarray:
+        """
+        Reduce the array chunk by chunk. The result has the shape of the array with the reduced axes of size 1,
+        which are removed unless keepdims is True.
+        Each element of the result starts from the reduction of its first chunk, so no identity value
+        (which may not exist for the dtype) is needed.
+        """
+        if axis is None:
+            axes = tuple(range(self.ndim))
+        else:
+            axes = tuple(a % self.ndim for a in np.atleast_1d(axis))
+        shape = tuple(1 if i in axes else n for i, n in enumerate(self.shape))
+        if dtype is None:
+            dtype = func(np.zeros(1, dtype=self.dtype)).dtype
+        result = np.empty(shape, dtype=dtype)
+        seen = np.zeros(shape, dtype=bool)
+        with warnings.catch_warnings():
+            # All-NaN chunks
+            warnings.simplefilter("ignore", RuntimeWarning)
+            for slices, block in self.iter_blocks():
+                out = tuple(slice(0, 1) if i in axes else s for i, s in enumerate(slices))
+                reduced = func(block, axis=axes, keepdims=True)
+                result[out] = np.where(seen[out], combine(result[out], reduced), reduced)
+                seen[out] = True
+        if not keepdims:
+            result = result.reshape([n for i, n in enumerate(shape) if i not in axes])
+            if result.ndim == 0:
+                result = result[()]
+        return result
+
+    def nanmax(self, axis=None, keepdims: bool = False):
+        return self._reduce(np.nanmax, np.fmax, axis, keepdims)
+
+    def nanmin(self, axis=None, keepdims: bool = False):
+        return self._reduce(np.nanmin, np.fmin, axis, keepdims)
+
+    def max(self, axis=None, keepdims: bool = False):
+        return self._reduce(np.max, np.maximum, axis, keepdims)
+
+    def min(self, axis=None, keepdims: bool = False):
+        return self._reduce(np.min, np.minimum, axis, keepdims)
+
+    def nansum(self, axis=None, keepdims: bool = False):
+        return self._reduce(partial(np.nansum, dtype=np.float64), np.add, axis, keepdims, np.float64)
+
+    def sum(self, axis=None, keepdims: bool = False):
+        return self._reduce(partial(np.sum, dtype=np.float64), np.add, axis, keepdims, np.float64)
+
+    def _count(self, axis, keepdims: bool, finite: bool):
+        def count(block, axis, keepdims):
+            valid = ~np.isnan(block) if finite else np.ones(block.shape, dtype=bool)
+            return np.sum(valid, axis=axis, keepdims=keepdims)
+
+        return self._reduce(count, np.add, axis, keepdims, np.int64)
+
+    def nanmean(self, axis=None, keepdims: bool = False):
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return self.nansum(axis, keepdims) / self._count(axis, keepdims, True)
+
+    def mean(self, axis=None, keepdims: bool = False):
+        return self.sum(axis, keepdims) / self._count(axis, keepdims, False)
+
+    def __array_function__(self, func, types, args, kwargs):
+        if func.__name__ not in _REDUCTIONS or args[0] is not self:
+            return NotImplemented
+        return getattr(self, func.__name__)(*args[1:], **kwargs)
+
+
+_REDUCTIONS = {"nanmax", "nanmin", "max", "min", "amax", "amin", "nansum", "sum", "nanmean", "mean"}
+ChunkedArray.amax = ChunkedArray.max
+ChunkedArray.amin = ChunkedArray.min
+
+
+def downsample_chunked(
+    data: ChunkedArray,
+    sample_size: int,
+    y_start: int,
+    x_start: int,
+    height_new: int,
+    width_new: int,
+    pool: Callable | None = None,
+) -> ChunkedArray:
+    """
+    Lazy block average over sample_size x sample_size pixels of the last two axes (see `utilities.downsample_data`).
+    The chunks of the result are the chunks of the data divided by sample_size.
+    If given, `pool` reduces the blocks instead of the average. It takes the data reshaped to
+    (..., height_new, sample_size, width_new, sample_size) and returns (..., height_new, width_new).
+    """
+    if pool is None:
+        pool = partial(np.mean, axis=(-3, -1))
+    shape = data.shape[:-2] + (height_new, width_new)
+    chunks = data.chunks[:-2] + tuple(
+        max(c // sample_size, 1) for c in data.chunks[-2:]
+    )
+
+    def reader(slices):
+        ys, xs = slices[-2:]
+        block = data.read(
+            slices[:-2]
+            + (
+                slice(y_start + ys.start * sample_size, y_start + ys.stop * sample_size),
+                slice(x_start + xs.start * sample_size, x_start + xs.stop * sample_size),
+            )
+        )
+        return pool(
+            block.reshape(
+                block.shape[:-2] + (ys.stop - ys.start, sample_size, xs.stop - xs.start, sample_size)
+            )
+        )
+
+    dtype = pool(np.zeros((1, 1, 1, 1), dtype=data.dtype)).dtype
+    return ChunkedArray.from_reader(shape, dtype, reader, chunks)
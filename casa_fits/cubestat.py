@@ -0,0 +1,240 @@
+from collections.abc import Iterator
+import numpy as np
+from .Image import Image
+from .lazy_data import LazyFitsData
+
+
+class RunningStats:
+    """
+    Welford-style accumulator of statistics for an array of planes.
+
+    Each element of the accumulator holds the statistics of one (Stokes, channel) plane.
+    Chunks of data are merged with the parallel algorithm of Chan et al.,
+    so the statistics are obtained with a single read of the data.
+    NaN and infinite values are ignored.
+    """
+
+    def __init__(self, shape: tuple[int, ...] = ()):
+        """
+        Args:
+            shape (tuple[int, ...], optional): Shape of the accumulator, e.g. (nstokes, nchan). Defaults to ().
+        """
+        self.npts = np.zeros(shape, dtype=np.int64)
+        self.mean = np.zeros(shape, dtype=np.float64)
+        self.m2 = np.zeros(shape, dtype=np.float64)
+        self.sum = np.zeros(shape, dtype=np.float64)
+        self.sumsq = np.zeros(shape, dtype=np.float64)
+        self.max = np.full(shape, -np.inf, dtype=np.float64)
+        self.min = np.full(shape, np.inf, dtype=np.float64)
+
+    def _merge(self, index, npts, mean, m2, total, sumsq, vmax, vmin) -> None:
+        if npts == 0:
+            return
+        n_a = self.npts[index]
+        n = n_a + npts
+        delta = mean - self.mean[index]
+        self.mean[index] += delta * npts / n
+        self.m2[index] += m2 + delta**2 * n_a * npts / n
+        self.npts[index] = n
+        self.sum[index] += total
+        self.sumsq[index] += sumsq
+        self.max[index] = max(self.max[index], vmax)
+        self.min[index] = min(self.min[index], vmin)
+
+    def update(self, index: tuple[int, ...], values: np.ndarray, where: np.ndarray | None = None) -> None:
+        """
+        Accumulate a chunk of data into the element at `index`.
+
+        Args:
+            index (tuple[int, ...]): Index of the element, e.g. (stokes, chan).
+            values (np.ndarray): Chunk of data. It is not modified.
+            where (np.ndarray, optional): Boolean array. Only values where True are accumulated. Defaults to None.
+        """
+        valid = np.isfinite(values)
+        if where is not None:
+            valid &= where
+        npts = int(np.count_nonzero(valid))
+        if npts == 0:
+            return
+        total = np.sum(values, where=valid, dtype=np.float64)
+        mean = total / npts
+        m2 = np.sum(np.square(np.subtract(values, mean, dtype=np.float64)), where=valid)
+        sumsq = np.sum(np.square(values, dtype=np.float64), where=valid)
+        vmax = np.max(values, where=valid, initial=-np.inf)
+        vmin = np.min(values, where=valid, initial=np.inf)
+        self._merge(index, npts, mean, m2, total, sumsq, vmax, vmin)
+
+    def total(self) -> "RunningStats":
+        """
+        Combine all elements into a single accumulator.
+
+        Returns:
+            RunningStats: The accumulator with shape ().
+        """
+        ret = RunningStats()
+        for index in np.ndindex(self.npts.shape):
+            ret._merge(
+                (),
+                self.npts[index],
+                self.mean[index],
+                self.m2[index],
+                self.sum[index],
+                self.sumsq[index],
+                self.max[index],
+                self.min[index],
+            )
+        return ret
+
+    def result(self) -> dict[str, np.ndarray]:
+        """
+        Returns the statistics.
+        Elements without valid pixels are NaN (`npts` is 0).
+
+        Returns:
+            dict[str, np.ndarray]: Dictionary with keys 'npts', 'max', 'min', 'sum', 'sumsq', 'mean', 'var', 'std' and 'rms'.
+                `var` and `std` are the unbiased variance and standard deviation (ddof=1).
+        """
+        empty = self.npts == 0
+        with np.errstate(divide="ignore", invalid="ignore"):
+            var = np.where(self.npts > 1, self.m2 / (self.npts - 1), np.nan)
+            ret = {
+                "npts": self.npts.copy(),
+                "max": np.where(empty, np.nan, self.max),
+                "min": np.where(empty, np.nan, self.min),
+                "sum": np.where(empty, np.nan, self.sum),
+                "sumsq": np.where(empty, np.nan, self.sumsq),
+                "mean": np.where(empty, np.nan, self.mean),
+                "var": var,
+                "std": np.sqrt(var),
+                "rms": np.sqrt(self.sumsq / self.npts),
+            }
+        return ret
+
+
+def _plane_mask(mask: np.ndarray, ndim: int, stokes: int, chan: int) -> np.ndarray:
+    """
+    Returns the 2D mask of a plane from a 2D mask or a mask with the shape of the data.
+    """
+    if mask.ndim == 2:
+        return mask
+    if mask.ndim == 4 and ndim == 4:
+        return mask[stokes, chan]
+    if mask.ndim == 3 and ndim == 3:
+        return mask[chan]
+    raise ValueError(
+        f"Mask must be 2D or have the same dimensions as the data, but got {mask.ndim}D."
+    )
+
+
+def iter_chunks(
+    image: Image, chunk_rows: int = 256
+) -> Iterator[tuple[int, int, slice, np.ndarray]]:
+    """
+    Iterates over the image data by chunks of rows of each plane.
+    The chunks are read-only views of the data.
+    For the lazily loaded data, each chunk is read from the file without caching.
+
+    Args:
+        image (Image): Image object.
+        chunk_rows (int, optional): Number of rows in a chunk. Defaults to 256.
+
+    Yields:
+        tuple[int, int, slice, np.ndarray]: Stokes index, channel index, row slice and the chunk of data.
+    """
+    data = image.data
+    if data is None:
+        raise ValueError("Image data is None.")
+    if chunk_rows <= 0:
+        raise ValueError("chunk_rows must be a positive integer.")
+    nstokes = data.shape[0] if data.ndim == 4 else 1
+    nchan = data.shape[-3] if data.ndim >= 3 else 1
+    height, width = data.shape[-2:]
+    for stokes in range(nstokes):
+        for chan in range(nchan):
+            if isinstance(data, LazyFitsData):
+                for row in range(0, height, chunk_rows):
+                    rows = slice(row, min(row + chunk_rows, height))
+                    yield stokes, chan, rows, data.read_window(
+                        stokes, chan, (0, width, rows.start, rows.stop)
+                    )
+            else:
+                plane = image.get_two_dim_data(stokes, chan).view()
+                plane.flags.writeable = False
+                for row in range(0, height, chunk_rows):
+                    rows = slice(row, min(row + chunk_rows, height))
+                    yield stokes, chan, rows, plane[rows]
+
+
+def accumulate_stats(
+    image: Image,
+    mask: np.ndarray | None = None,
+    inverse_mask: bool = False,
+    chunk_rows: int = 256,
+) -> tuple[RunningStats, RunningStats | None]:
+    """
+    Accumulate per-plane statistics of the whole and the masked data in a single pass.
+
+    Args:
+        image (Image): Image object. Its data is not modified.
+        mask (np.ndarray, optional): 2D mask or mask with the same shape as the data. Defaults to None.
+        inverse_mask (bool, optional): If True, the mask is inverted. Defaults to False.
+        chunk_rows (int, optional): Number of rows read at a time. Defaults to 256.
+
+    Returns:
+        tuple[RunningStats, RunningStats | None]: Accumulators of the whole data and the masked data (None if mask is not given).
+    """
+    if image.data is None:
+        raise ValueError("Image data is None.")
+    ndim = image.data.ndim
+    shape = (
+        image.data.shape[0] if ndim == 4 else 1,
+        image.data.shape[-3] if ndim >= 3 else 1,
+    )
+    stats_all = RunningStats(shape)
+    stats_masked = None
+    if mask is not None:
+        # Normalize the mask to True/False
+        mask = np.asarray(mask)
+        if mask.dtype != bool:
+            mask = mask.astype(bool)
+        if inverse_mask:
+            mask = ~mask
+        stats_masked = RunningStats(shape)
+    for stokes, chan, rows, chunk in iter_chunks(image, chunk_rows):
+        stats_all.update((stokes, chan), chunk)
+        if stats_masked is not None:
+            stats_masked.update(
+                (stokes, chan), chunk, _plane_mask(mask, ndim, stokes, chan)[rows]
+            )
+    return stats_all, stats_masked
+
+
+def cubestat(
+    image: Image,
+    mask: np.ndarray | None = None,
+    inverse_mask: bool = False,
+    chunk_rows: int = 256,
+) -> dict:
+    """
+    Statistics of each (Stokes, channel) plane computed in a single pass over the data.
+
+    Args:
+        image (Image): Image object. Its data is not modified.
+        mask (np.ndarray, optional): If specified, statistics are also calculated using only the data within the mask.
+            The mask is 2D (applied to all planes) or has the same shape as the data. Defaults to None.
+        inverse_mask (bool, optional): If True, the specified mask region is inverted. Defaults to False.
+        chunk_rows (int, optional): Number of rows read at a time. Defaults to 256.
+
+    Returns:
+        dict: Dictionary with the keys 'all' and, if mask is given, 'masked' and 'psnr'.
+            'all' and 'masked' are dictionaries of statistics (see `RunningStats.result`),
+            each of which is an array of shape (nstokes, nchan).
+            'psnr' is the peak of each plane divided by the rms in the mask.
+    """
+    stats_all, stats_masked = accumulate_stats(image, mask, inverse_mask, chunk_rows)
+    ret = {"unit": image.unit_data, "all": stats_all.result()}
+    if stats_masked is not None:
+        ret["masked"] = stats_masked.result()
+        with np.errstate(divide="ignore", invalid="ignore"):
+            ret["psnr"] = ret["all"]["max"] / ret["masked"]["rms"]
+    return ret
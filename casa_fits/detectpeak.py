@@ -1,40 +1,150 @@
+from concurrent.futures import ThreadPoolExecutor
 import numpy as np
+from scipy.ndimage import maximum_filter, minimum_filter
 from .Image import Image
 
+peak_dtype = np.dtype(
+    [
+        ("chan", np.int32),
+        ("stokes", np.int32),
+        ("x", np.int32),
+        ("y", np.int32),
+        ("value", np.float64),
+    ]
+)
+
+
+def _beam_footprint(img: Image, footprint: str = "box") -> np.ndarray:
+    """
+    Returns the search cell of the peak detection as a boolean footprint.
+
+    Args:
+        img (Image): The image object. The axes unit should be arcsec.
+        footprint (str): 'beam' for the elliptical beam shape or 'box' for the rectangular cell covering the beam.
+
+    Returns:
+        np.ndarray: The 2D boolean footprint with odd sizes.
+    """
+    if img.beam is None:
+        raise ValueError("The image does not have a beam size.")
+    if img.incr_x is None or img.incr_y is None:
+        raise ValueError("Image increment x or y is None.")
+    beam_x = img.beam[0] / abs(img.incr_x)
+    beam_y = img.beam[1] / abs(img.incr_y)
+    beam_ang = (90 + img.beam[2]) * np.pi / 180
+    if footprint == "box":
+        cell_width = int(
+            np.sqrt((beam_x * np.cos(beam_ang)) ** 2 + (beam_x * np.sin(beam_ang)) ** 2) + 1
+        )
+        cell_height = int(
+            np.sqrt((beam_x * np.sin(beam_ang)) ** 2 + (beam_y * np.cos(beam_ang)) ** 2) + 1
+        )
+        return np.ones((cell_height // 2 * 2 + 1, cell_width // 2 * 2 + 1), dtype=bool)
+    elif footprint == "beam":
+        # Ellipse with the FWHM of the beam, rotated in the same way as draw_beam
+        semi_x = beam_x / 2
+        semi_y = beam_y / 2
+        half = int(np.ceil(max(semi_x, semi_y)))
+        yy, xx = np.mgrid[-half : half + 1, -half : half + 1]
+        u = xx * np.cos(beam_ang) + yy * np.sin(beam_ang)
+        v = -xx * np.sin(beam_ang) + yy * np.cos(beam_ang)
+        fp = (u / semi_x) ** 2 + (v / semi_y) ** 2 <= 1
+        # Trim empty rows and columns symmetrically
+        rows = np.nonzero(fp.any(axis=1))[0]
+        cols = np.nonzero(fp.any(axis=0))[0]
+        trim_y = min(rows[0], 2 * half - rows[-1])
+        trim_x = min(cols[0], 2 * half - cols[-1])
+        return fp[trim_y : fp.shape[0] - trim_y, trim_x : fp.shape[1] - trim_x]
+    else:
+        raise ValueError("Arg `footprint` must be `'box'` or `'beam'`.")
+
+
+def _extremum_filter(data: np.ndarray, footprint: np.ndarray, find_max: bool) -> np.ndarray:
+    """
+    Maximum (or minimum) filter where NaN values win, so that a NaN within the footprint prevents a peak.
+    """
+    if find_max:
+        filled = np.where(np.isnan(data), np.inf, data)
+        return maximum_filter(filled, footprint=footprint, mode="nearest")
+    else:
+        filled = np.where(np.isnan(data), -np.inf, data)
+        return minimum_filter(filled, footprint=footprint, mode="nearest")
+
+
+def _peak_indices(
+    data: np.ndarray, extremum: np.ndarray, threshold: float, footprint: np.ndarray
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Returns the y and x indices (in row-major order) of the pixels above the threshold which equal the extremum.
+    Pixels closer to the edge than half of the footprint are not considered.
+    """
+    half_y = footprint.shape[-2] // 2
+    half_x = footprint.shape[-1] // 2
+    is_peak = (data > threshold) & (data == extremum)
+    # Exclude the edges
+    is_peak[:half_y] = False
+    is_peak[is_peak.shape[0] - half_y :] = False
+    is_peak[:, :half_x] = False
+    is_peak[:, is_peak.shape[1] - half_x :] = False
+    return np.nonzero(is_peak)
+
+
+def _find_peaks(
+    data: np.ndarray, footprint: np.ndarray, threshold: float, find_max: bool
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Finds the pixels above the threshold which are the extremum within the footprint.
+    Pixels closer to the edge than half of the footprint are not considered,
+    and a NaN within the footprint prevents the pixel from being a peak.
+
+    Args:
+        data (np.ndarray): The 2D data.
+        footprint (np.ndarray): The boolean footprint with odd sizes.
+        threshold (float): Only pixels greater than the threshold are considered.
+        find_max (bool): If True, finds the maxima. Otherwise, finds the minima.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: y and x indices of the peaks in row-major order.
+    """
+    extremum = _extremum_filter(data, footprint, find_max)
+    return _peak_indices(data, extremum, threshold, footprint)
+
 
 def detectpeak(
-    img: Image, rms: float, threshold_rms: int = 5, find_max: bool = True
+    img: Image,
+    rms: float,
+    threshold_rms: int = 5,
+    find_max: bool = True,
+    footprint: str = "box",
+    tile_size: int | None = None,
+    workers: int | None = 1,
 ) -> list[tuple[int, int, float]]:
     """
     Detects peaks in an image.
 
+    A pixel is a peak if it is the maximum (or minimum) within the search cell centered on it.
+    The search is done with a maximum (minimum) filter over the whole image.
+
+    If `tile_size` is given, the image is processed in square tiles with a halo of half the search cell,
+    so that only a tile (read from the file for lazily loaded data) is in memory at a time.
+    The result is the same as without tiles.
+
     Args:
         img (Image): The image object.
         rms (float): The RMS noise level for peak detection. Only pixels with intensity greater than threshold_rms * rms will be considered.
         threshold_rms (int): The threshold in terms of RMS to consider a pixel as a peak. Default is 5.
         find_max (bool): If True, the function will find the maximum peaks. Otherwise, it will find the minimum peaks.
+        footprint (str): Shape of the search cell. 'box' uses the rectangle covering the beam (the cell of the original loop)
+            and 'beam' uses the beam ellipse. Default is 'box'.
+        tile_size (int | None): Size of the tiles in pixels. If None, the whole image is processed at once. Default is None.
+        workers (int | None): Number of threads processing tiles concurrently. If None, the default of ThreadPoolExecutor is used. Default is 1.
 
     Returns:
         list[tuple[int, int, float]]: The list of detected peaks. Each peak is represented as a tuple (x, y, value).
     """
     # beam and search cell size
     img.convert_axes_unit("arcsec")
-    if img.beam is None:
-        raise ValueError("The image does not have a beam size.")
-    if img.incr_x is None or img.incr_y is None:
-        raise ValueError("Image increment x or y is None.")
-    beam_x = img.beam[0] / abs(img.incr_x)
-    beam_y = img.beam[1] / abs(img.incr_y)
-    beam_ang = (90 + img.beam[2]) * np.pi / 180
-    cell_width = int(
-        np.sqrt((beam_x * np.cos(beam_ang)) ** 2 + (beam_x * np.sin(beam_ang)) ** 2) + 1
-    )
-    cell_height = int(
-        np.sqrt((beam_x * np.sin(beam_ang)) ** 2 + (beam_y * np.cos(beam_ang)) ** 2) + 1
-    )
-
-    # detect peaks
-    peak: list[tuple[int, int, float]] = []
+    fp = _beam_footprint(img, footprint)
 
     if img.height is None or img.width is None:
         raise ValueError("Image height or width is None.")
@@ -42,20 +152,156 @@ def detectpeak(
         raise ValueError("Image data is None.")
 
     threshold = threshold_rms * rms
+    if tile_size is not None:
+        peaks = _detect_tiled(img, fp, threshold, find_max, tile_size, workers)
+        return [(int(x), int(y), v) for x, y, v in zip(*peaks)]
+
     data = img.get_two_dim_data()
 
-    for i in range(cell_height // 2, img.height - cell_height // 2, 1):
-        for j in range(cell_width // 2, img.width - cell_width // 2, 1):
-            if data[i][j] > threshold:
-                region = data[
-                    i - cell_height // 2 : i + cell_height // 2 + 1,
-                    j - cell_width // 2 : j + cell_width // 2 + 1,
-                ]
-                if find_max:
-                    if data[i][j] == np.max(region):
-                        peak.append((j, i, data[i][j]))
-                else:
-                    if data[i][j] == np.min(region):
-                        peak.append((j, i, data[i][j]))
-
-    return peak
+    ys, xs = _find_peaks(data, fp, threshold, find_max)
+    return [(int(x), int(y), data[y, x]) for y, x in zip(ys, xs)]
+
+
+def _detect_tile(
+    img: Image,
+    window: tuple[int, int, int, int],
+    footprint: np.ndarray,
+    threshold: float,
+    find_max: bool,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Detects peaks in the tile `window` using the data with a halo around it.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray, np.ndarray]: x and y indices in the whole image and the values of the peaks in the tile.
+    """
+    left, right, bottom, top = window
+    half_y = footprint.shape[0] // 2
+    half_x = footprint.shape[1] // 2
+    halo_left = max(left - half_x, 0)
+    halo_bottom = max(bottom - half_y, 0)
+    data = img.get_two_dim_window(
+        0,
+        0,
+        (halo_left, min(right + half_x, img.width), halo_bottom, min(top + half_y, img.height)),
+    )
+    ys, xs = _find_peaks(data, footprint, threshold, find_max)
+    values = data[ys, xs]
+    xs = xs + halo_left
+    ys = ys + halo_bottom
+    # Keep only the peaks owned by this tile, so that no peak is counted twice
+    own = (left <= xs) & (xs < right) & (bottom <= ys) & (ys < top)
+    return xs[own], ys[own], values[own]
+
+
+def _detect_tiled(
+    img: Image,
+    footprint: np.ndarray,
+    threshold: float,
+    find_max: bool,
+    tile_size: int,
+    workers: int | None,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Detects peaks tile by tile and returns x, y and values sorted in row-major order.
+    """
+    if tile_size <= 0:
+        raise ValueError("tile_size must be a positive integer.")
+    windows = [
+        (x, min(x + tile_size, img.width), y, min(y + tile_size, img.height))
+        for y in range(0, img.height, tile_size)
+        for x in range(0, img.width, tile_size)
+    ]
+    with ThreadPoolExecutor(workers) as executor:
+        results = list(
+            executor.map(
+                lambda w: _detect_tile(img, w, footprint, threshold, find_max), windows
+            )
+        )
+    xs = np.concatenate([r[0] for r in results])
+    ys = np.concatenate([r[1] for r in results])
+    values = np.concatenate([r[2] for r in results])
+    order = np.lexsort((xs, ys))
+    return xs[order], ys[order], values[order]
+
+
+def _detect_plane(
+    img: Image,
+    stokes: int,
+    chan: int,
+    footprint: np.ndarray,
+    threshold: float,
+    find_max: bool,
+    three_dim: bool,
+) -> np.ndarray:
+    """
+    Detects peaks in a (Stokes, channel) plane and returns them as a structured array.
+    If three_dim is True, the neighboring channels are included in the local extremum test.
+    """
+    data = img.get_two_dim_data(stokes, chan)
+    if three_dim:
+        nchan = img.data.shape[-3] if img.data.ndim >= 3 else 1
+        chans = range(max(chan - 1, 0), min(chan + 2, nchan))
+        stack = np.stack([img.get_two_dim_data(stokes, c) for c in chans])
+        fp = np.broadcast_to(footprint, (3,) + footprint.shape)
+        extremum = _extremum_filter(stack, fp, find_max)[chan - chans.start]
+        ys, xs = _peak_indices(data, extremum, threshold, footprint)
+    else:
+        ys, xs = _find_peaks(data, footprint, threshold, find_max)
+    peaks = np.empty(len(ys), dtype=peak_dtype)
+    peaks["chan"] = chan
+    peaks["stokes"] = stokes
+    peaks["x"] = xs
+    peaks["y"] = ys
+    peaks["value"] = data[ys, xs]
+    return peaks
+
+
+def detectpeak_cube(
+    img: Image,
+    rms: float | np.ndarray,
+    threshold_rms: int = 5,
+    find_max: bool = True,
+    footprint: str = "box",
+    three_dim: bool = False,
+    workers: int | None = None,
+) -> np.ndarray:
+    """
+    Detects peaks in all (Stokes, channel) planes of an image.
+
+    The planes are processed in parallel with a thread pool.
+
+    Args:
+        img (Image): The image object.
+        rms (float | np.ndarray): The RMS noise level. A scalar, or an array broadcastable to (nstokes, nchan) such as the 'rms' of `cubestat`.
+        threshold_rms (int): The threshold in terms of RMS to consider a pixel as a peak. Default is 5.
+        find_max (bool): If True, the function will find the maximum peaks. Otherwise, it will find the minimum peaks.
+        footprint (str): Shape of the search cell. 'box' or 'beam' (see `detectpeak`). Default is 'box'.
+        three_dim (bool): If True, a peak must also be the extremum over the neighboring channels. Default is False.
+        workers (int | None): Number of threads. If None, the default of ThreadPoolExecutor is used.
+
+    Returns:
+        np.ndarray: Structured array of the peaks with the fields (chan, stokes, x, y, value),
+            sorted by channel, Stokes and position.
+    """
+    img.convert_axes_unit("arcsec")
+    fp = _beam_footprint(img, footprint)
+    if img.data is None:
+        raise ValueError("Image data is None.")
+    nstokes = img.data.shape[0] if img.data.ndim == 4 else 1
+    nchan = img.data.shape[-3] if img.data.ndim >= 3 else 1
+    threshold = np.broadcast_to(threshold_rms * np.asarray(rms), (nstokes, nchan))
+
+    planes = [(stokes, chan) for chan in range(nchan) for stokes in range(nstokes)]
+    with ThreadPoolExecutor(workers) as executor:
+        results = list(
+            executor.map(
+                lambda sc: _detect_plane(
+                    img, sc[0], sc[1], fp, threshold[sc], find_max, three_dim
+                ),
+                planes,
+            )
+        )
+    if not results:
+        return np.empty(0, dtype=peak_dtype)
+    return np.concatenate(results)
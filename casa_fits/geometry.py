@@ -0,0 +1,568 @@
+import threading
+from collections import OrderedDict
+from collections.abc import Callable, Hashable
+from math import cos, radians, sin, sqrt
+import numpy as np
+from scipy import sparse
+
+
+class DiskGeometry:
+    """
+    Deprojected polar coordinates of the pixels of an inclined disk.
+
+    The coordinates are rotated by -PA and the y-axis is deprojected by 1 / cos(inc).
+    All maps are read-only arrays with the shape of the image.
+
+    Attributes:
+        r (np.ndarray): Deprojected radius in pixels.
+        theta (np.ndarray): Deprojected azimuth angle in degrees [0, 360), measured from the x-axis of the rotated frame.
+        bin_index (np.ndarray): Radial bin index of unit width, i.e. int(r).
+        pixel_scale (float): Size of a pixel (e.g. in arcsec).
+    """
+
+    def __init__(
+        self,
+        shape: tuple[int, int],
+        center: tuple[float, float],
+        inc: float,
+        PA: float,
+        pixel_scale: float = 1.0,
+    ):
+        """
+        Args:
+            shape (tuple[int, int]): Shape of the image (height, width).
+            center (tuple[float, float]): Center (x, y) of the disk in pixels.
+            inc (float): Inclination angle in degrees.
+            PA (float): Position angle in degrees.
+            pixel_scale (float, optional): Size of a pixel. Defaults to 1.0.
+        """
+        self.shape = shape
+        self.center = center
+        self.inc = inc
+        self.PA = PA
+        self.pixel_scale = pixel_scale
+
+        inc_rad = radians(inc)
+        PA_rad = radians(PA)
+        dx = np.arange(shape[1]) - center[0]
+        dy = np.arange(shape[0])[:, np.newaxis] - center[1]
+        # Rotate by -PA
+        x_rot = dx * cos(-PA_rad) - dy * sin(-PA_rad)
+        y_rot = dx * sin(-PA_rad) + dy * cos(-PA_rad)
+        # Deproject y
+        y_deproj = y_rot / cos(inc_rad)
+
+        self.r = np.sqrt(x_rot**2 + y_deproj**2)
+        self.theta = np.degrees(np.arctan2(y_deproj, x_rot) % (2 * np.pi))
+        self.bin_index = self.r.astype(np.int32)
+        for arr in (self.r, self.theta, self.bin_index):
+            arr.flags.writeable = False
+
+    @property
+    def nbytes(self) -> int:
+        return self.r.nbytes + self.theta.nbytes + self.bin_index.nbytes
+
+
+class CutGeometry:
+    """
+    Assignment of pixels to the cells of radial line cuts.
+
+    Each cut starts from the center and moves outward along its azimuth by `sampling_size` pixels per step
+    until the step center leaves the image. A cell is the rectangle of length `sampling_size` and width `width`
+    centered on the (truncated) step center, limited to the search box of the step.
+
+    Attributes:
+        pixel_index (np.ndarray): Flattened index of the pixel in each (cell, pixel) pair.
+        cell_index (np.ndarray): Cell index (azimuth index * nsteps_max + step) of each pair.
+        nsteps (np.ndarray): Number of steps of each azimuth.
+        nsteps_max (int): Maximum number of steps.
+    """
+
+    def __init__(
+        self,
+        shape: tuple[int, int],
+        center: tuple[int, int],
+        azimuths: tuple[float, ...],
+        sampling_size: int,
+        width: float,
+    ):
+        """
+        Args:
+            shape (tuple[int, int]): Shape of the image (height, width).
+            center (tuple[int, int]): Center (x, y) of the cuts in pixels.
+            azimuths (tuple[float, ...]): Azimuth angles in degrees measured from the north.
+            sampling_size (int): Step (and cell length) in pixels.
+            width (float): Width of the cells in pixels.
+        """
+        height, full_width = shape
+        search_range = int(sqrt(sampling_size**2 + sampling_size**2) / 2 + 1)
+        offset = np.arange(-search_range, search_range + 1)
+        off_x, off_y = (a.ravel() for a in np.meshgrid(offset, offset))
+
+        pixels = []
+        cells = []
+        nsteps = []
+        for azimuth in azimuths:
+            azimuth_rad = radians(azimuth - 270)
+            direction = np.array([cos(azimuth_rad), sin(azimuth_rad)])
+            v_para = direction * sampling_size * 0.5
+            v_perp = np.array([-direction[1], direction[0]]) * width * 0.5
+
+            # Centers of the steps inside the image
+            centers = []
+            step = 0
+            while True:
+                x = int(center[0] + step * direction[0])
+                y = int(center[1] + step * direction[1])
+                if x < 0 or x >= full_width or y < 0 or y >= height:
+                    break
+                centers.append((x, y))
+                step += sampling_size
+            nsteps.append(len(centers))
+            rect_center = np.array(centers, dtype=float).reshape(-1, 1, 2)
+
+            # Pixels in the search box of each step, tested against the rectangle of the step
+            px = rect_center[:, :, 0].astype(int) + off_x
+            py = rect_center[:, :, 1].astype(int) + off_y
+            verts = [
+                rect_center + v_para + v_perp,
+                rect_center + v_para - v_perp,
+                rect_center - v_para - v_perp,
+                rect_center - v_para + v_perp,
+            ]
+            inside = (0 <= px) & (px < full_width) & (0 <= py) & (py < height)
+            for k in range(4):
+                edge = verts[(k + 1) % 4] - verts[k]
+                vp_x = px - verts[k][:, :, 0]
+                vp_y = py - verts[k][:, :, 1]
+                inside &= edge[:, :, 0] * vp_y - edge[:, :, 1] * vp_x <= 0
+            cell = np.broadcast_to(np.arange(len(centers))[:, np.newaxis], px.shape)
+            pixels.append(py[inside] * full_width + px[inside])
+            cells.append((len(nsteps) - 1, cell[inside]))
+
+        self.nsteps = np.array(nsteps, dtype=int)
+        self.nsteps_max = int(self.nsteps.max()) if len(nsteps) else 0
+        self.pixel_index = np.concatenate(pixels) if pixels else np.empty(0, dtype=int)
+        self.cell_index = (
+            np.concatenate([i * self.nsteps_max + c for i, c in cells])
+            if cells
+            else np.empty(0, dtype=int)
+        )
+        for arr in (self.pixel_index, self.cell_index, self.nsteps):
+            arr.flags.writeable = False
+
+    @property
+    def nbytes(self) -> int:
+        return self.pixel_index.nbytes + self.cell_index.nbytes + self.nsteps.nbytes
+
+
+def _cross(p: np.ndarray, q: np.ndarray) -> np.ndarray:
+    return p[..., 0] * q[..., 1] - p[..., 1] * q[..., 0]
+
+
+def _clip_half_plane(poly: np.ndarray, normal: np.ndarray) -> np.ndarray:
+    """
+    Clips convex polygons by the half-plane normal . p >= 0 through the origin.
+
+    The polygons keep a fixed number of vertices: missing vertices are filled with
+    the previous vertex, which only adds edges of zero length.
+
+    Args:
+        poly (np.ndarray): Counter-clockwise polygons with the shape (n, m, 2).
+        normal (np.ndarray): Normal vector of the half-plane.
+
+    Returns:
+        np.ndarray: Clipped polygons with the shape (n, 2m, 2). Empty polygons have all vertices at the origin.
+    """
+    n, m, _ = poly.shape
+    nxt = np.roll(poly, -1, axis=1)
+    dp = poly @ normal
+    dq = nxt @ normal
+    keep = dp >= 0
+    crossing = keep != (dq >= 0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        t = dp / (dp - dq)
+        intersection = poly + t[..., np.newaxis] * (nxt - poly)
+    vertices = np.stack([poly, intersection], axis=2).reshape(n, 2 * m, 2)
+    valid = np.stack([keep, crossing], axis=2).reshape(n, 2 * m)
+    # Fill the invalid vertices with the previous valid one (the first one for the leading vertices)
+    idx = np.maximum.accumulate(np.where(valid, np.arange(2 * m), -1), axis=1)
+    idx = np.where(idx < 0, np.argmax(valid, axis=1)[:, np.newaxis], idx)
+    vertices = np.take_along_axis(vertices, idx[..., np.newaxis], axis=1)
+    vertices[~valid.any(axis=1)] = 0
+    return vertices
+
+
+def _polygon_area(poly: np.ndarray) -> np.ndarray:
+    """
+    Area of counter-clockwise polygons with the shape (n, m, 2).
+    """
+    return 0.5 * _cross(poly, np.roll(poly, -1, axis=1)).sum(axis=1)
+
+
+def _polygon_disk_area(poly: np.ndarray, radius: np.ndarray) -> np.ndarray:
+    """
+    Exact area of the intersection of counter-clockwise polygons and disks centered at the origin.
+
+    The area is the sum over the edges of the signed area of the triangle (origin, p, q) within the disk:
+    the part of the edge inside the disk gives a triangle and the parts outside give circular sectors.
+
+    Args:
+        poly (np.ndarray): Polygons with the shape (n, m, 2).
+        radius (np.ndarray): Radius of the disk of each polygon with the shape (n,).
+
+    Returns:
+        np.ndarray: The areas with the shape (n,).
+    """
+    p = poly
+    d = np.roll(poly, -1, axis=1) - p
+    r2 = (radius**2)[:, np.newaxis]
+    a = np.sum(d * d, axis=-1)
+    b = np.sum(p * d, axis=-1)
+    c = np.sum(p * p, axis=-1) - r2
+    disc = b * b - a * c
+    s = np.sqrt(np.maximum(disc, 0))
+    no_chord = (disc <= 0) | (a == 0)
+    safe_a = np.where(a > 0, a, 1)
+    # Parameters of the part of the edge inside the disk
+    t1 = np.where(no_chord, 1, np.clip((-b - s) / safe_a, 0, 1))[..., np.newaxis]
+    t2 = np.where(no_chord, 1, np.clip((-b + s) / safe_a, 0, 1))[..., np.newaxis]
+    p1 = p + t1 * d
+    p2 = p + t2 * d
+    q = p + d
+
+    def angle(u, v):
+        return np.arctan2(_cross(u, v), np.sum(u * v, axis=-1))
+
+    area = 0.5 * r2 * (angle(p, p1) + angle(p2, q)) + 0.5 * _cross(p1, p2)
+    return area.sum(axis=1)
+
+
+class AnnulusWeights:
+    """
+    Exact fractional area of each pixel within each (annulus, wedge) cell of an inclined disk.
+
+    Each pixel is a parallelogram in the deprojected frame. It is clipped by the wedges
+    and intersected with the circles of the annulus edges exactly, without pre-binning
+    or supersampling. The profile of any plane is then a sparse matrix-vector product.
+
+    Attributes:
+        matrix (scipy.sparse.csr_matrix): Weights with the shape (nr * nwedge, npix).
+            The row of the annulus k and the wedge j is k * nwedge + j. A weight is the fraction of the pixel in the cell.
+        area (np.ndarray): Sum of the weights of each cell (in pixels) with the shape (nr, nwedge).
+        shape (tuple[int, int]): Shape (nr, nwedge) of the cells.
+    """
+
+    def __init__(
+        self,
+        shape: tuple[int, int],
+        center: tuple[float, float],
+        inc: float,
+        PA: float,
+        r_edges: tuple[float, ...],
+        theta_ranges: tuple[tuple[float, float], ...] | None = None,
+        chunk_pixels: int = 1 << 16,
+    ):
+        """
+        Args:
+            shape (tuple[int, int]): Shape of the image (height, width).
+            center (tuple[float, float]): Center (x, y) of the disk in pixels.
+            inc (float): Inclination angle in degrees.
+            PA (float): Position angle in degrees.
+            r_edges (tuple[float, ...]): Increasing edges of the annuli in deprojected pixels.
+            theta_ranges (tuple[tuple[float, float], ...] | None, optional): (start, stop) of the wedges in degrees,
+                measured counter-clockwise from the x-axis of the rotated frame like `DiskGeometry.theta`.
+                If None, a single wedge of the whole circle. Defaults to None.
+            chunk_pixels (int, optional): Number of pixels processed at a time. Defaults to 65536.
+        """
+        height, width = shape
+        edges = np.asarray(r_edges, dtype=float)
+        nr = len(edges) - 1
+        if nr < 1 or np.any(np.diff(edges) <= 0):
+            raise ValueError("r_edges must have at least two increasing values.")
+        if theta_ranges is None:
+            theta_ranges = ((0.0, 360.0),)
+        nwedge = len(theta_ranges)
+        self.shape = (nr, nwedge)
+
+        # Deprojection: rotate by -PA and stretch y by 1 / cos(inc)
+        inc_rad = radians(inc)
+        PA_rad = radians(PA)
+        deproject = np.array(
+            [
+                [cos(-PA_rad), -sin(-PA_rad)],
+                [sin(-PA_rad) / cos(inc_rad), cos(-PA_rad) / cos(inc_rad)],
+            ]
+        )
+        # Corners of a pixel relative to its center in the deprojected frame
+        corner = np.array([[-0.5, -0.5], [0.5, -0.5], [0.5, 0.5], [-0.5, 0.5]]) @ deproject.T
+        pixel_area = _polygon_area(corner[np.newaxis])[0]
+        half_diag = np.max(np.hypot(corner[:, 0], corner[:, 1]))
+
+        # Only the pixels which may overlap the annuli, selected from the radius of the pixel centers
+        candidates = []
+        dx = np.arange(width) - center[0]
+        rows_per_chunk = max(chunk_pixels // width, 1)
+        for y0 in range(0, height, rows_per_chunk):
+            dy = np.arange(y0, min(y0 + rows_per_chunk, height))[:, np.newaxis] - center[1]
+            r_center = np.hypot(
+                deproject[0, 0] * dx + deproject[0, 1] * dy,
+                deproject[1, 0] * dx + deproject[1, 1] * dy,
+            )
+            near = (r_center + half_diag > edges[0]) & (r_center - half_diag < edges[-1])
+            candidates.append(np.flatnonzero(near) + y0 * width)
+        candidates = np.concatenate(candidates)
+
+        # Wedges wider than 180 degrees are split, so that each one is the intersection of two half-planes
+        wedges = []
+        for j, (start, stop) in enumerate(theta_ranges):
+            span = stop - start
+            if span >= 360:
+                wedges.append((j, None))
+                continue
+            if span <= 0:
+                continue
+            n_split = 1 if span <= 180 else 2
+            for k in range(n_split):
+                t0 = radians(start + span * k / n_split)
+                t1 = radians(start + span * (k + 1) / n_split)
+                normals = (np.array([-sin(t0), cos(t0)]), np.array([sin(t1), -cos(t1)]))
+                wedges.append((j, normals))
+
+        rows = []
+        cols = []
+        values = []
+        for first in range(0, len(candidates), chunk_pixels):
+            pix = candidates[first : first + chunk_pixels]
+            # Corner polygons of the pixels of the chunk
+            yy, xx = np.divmod(pix, width)
+            centers = np.stack([xx - center[0], yy - center[1]], axis=-1) @ deproject.T
+            pixels = centers[:, np.newaxis, :] + corner
+            for j, normals in wedges:
+                poly = pixels
+                if normals is not None:
+                    for normal in normals:
+                        poly = _clip_half_plane(poly, normal)
+                self._add_cells(poly, pix, j, nwedge, edges, rows, cols, values)
+
+        weights = np.concatenate(values) / pixel_area if values else np.empty(0)
+        self.matrix = sparse.csr_matrix(
+            (
+                weights,
+                (
+                    np.concatenate(rows) if rows else np.empty(0, dtype=int),
+                    np.concatenate(cols) if cols else np.empty(0, dtype=int),
+                ),
+            ),
+            shape=(nr * nwedge, height * width),
+        )
+        # Rounding errors of the differences of the areas
+        self.matrix.data[np.abs(self.matrix.data) < 1e-12] = 0
+        self.matrix.eliminate_zeros()
+        self.area = np.asarray(self.matrix.sum(axis=1)).reshape(self.shape)
+
+    @staticmethod
+    def _add_cells(poly, pix, j, nwedge, edges, rows, cols, values) -> None:
+        """
+        Appends the areas of the (clipped) pixel polygons in the annuli of the wedge j.
+
+        The area within the annulus k is A(r_{k+1}) - A(r_k), where A(r) is the area within the radius r.
+        A(r) is 0 below the minimum distance of the polygon and the full area above the maximum distance,
+        so it is computed exactly only for the edges crossing the polygon.
+        """
+        nr = len(edges) - 1
+        full = _polygon_area(poly)
+        # Minimum and maximum distance of the polygons from the origin
+        r_max = np.max(np.hypot(poly[..., 0], poly[..., 1]), axis=1)
+        d = np.roll(poly, -1, axis=1) - poly
+        a = np.sum(d * d, axis=-1)
+        t = np.clip(-np.sum(poly * d, axis=-1) / np.where(a > 0, a, 1), 0, 1)
+        nearest = poly + t[..., np.newaxis] * d
+        r_min = np.min(np.hypot(nearest[..., 0], nearest[..., 1]), axis=1)
+        inside = np.all(_cross(poly, poly + d) >= 0, axis=1)
+        r_min[inside] = 0
+        lo = np.searchsorted(edges, r_min, side="right")
+        hi = np.searchsorted(edges, r_max, side="left")
+
+        # Edges crossing the polygons
+        n_cross = np.maximum(hi - lo, 0)
+        owner = np.repeat(np.arange(len(pix)), n_cross)
+        edge = lo[owner] + np.arange(len(owner)) - np.repeat(np.cumsum(n_cross) - n_cross, n_cross)
+        partial = _polygon_disk_area(poly[owner], edges[edge])
+
+        # A(r_e) is added to the annulus e - 1 and subtracted from the annulus e,
+        # and the full area is added to the annulus hi - 1
+        annulus = np.concatenate([edge - 1, edge, hi - 1])
+        area = np.concatenate([partial, -partial, full])
+        pixel = np.concatenate([pix[owner], pix[owner], pix])
+        valid = (annulus >= 0) & (annulus < nr) & (area != 0)
+        rows.append(annulus[valid] * nwedge + j)
+        cols.append(pixel[valid])
+        values.append(area[valid])
+
+    @property
+    def nbytes(self) -> int:
+        m = self.matrix
+        return m.data.nbytes + m.indices.nbytes + m.indptr.nbytes + self.area.nbytes
+
+    def stats(self, values: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Weighted mean, standard deviation and sum of the weights of the finite pixels in each cell.
+
+        Args:
+            values (np.ndarray): Flattened planes with the shape (nplane, npix).
+
+        Returns:
+            tuple: Mean, standard deviation and sum of the weights with the shape (nplane, nr, nwedge).
+                Cells without finite pixels are NaN.
+        """
+        finite = np.isfinite(values)
+        x = np.where(finite, values, 0).astype(float).T
+        wsum = self.matrix @ finite.T.astype(float)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            mean = (self.matrix @ x) / wsum
+            var = np.maximum((self.matrix @ (x * x)) / wsum - mean**2, 0)
+        shape = (values.shape[0],) + self.shape
+        return (
+            mean.T.reshape(shape),
+            np.sqrt(var).T.reshape(shape),
+            wsum.T.reshape(shape),
+        )
+
+
+class GeometryCache:
+    """
+    LRU cache of geometry objects bounded by the total number of bytes.
+    """
+
+    def __init__(self, max_bytes: int):
+        """
+        Args:
+            max_bytes (int): Maximum total size of the cached objects in bytes.
+        """
+        self.max_bytes = max_bytes
+        self._cache: OrderedDict[Hashable, object] = OrderedDict()
+        self._nbytes = 0
+        self._lock = threading.Lock()
+
+    @property
+    def nbytes(self) -> int:
+        return self._nbytes
+
+    def __len__(self) -> int:
+        return len(self._cache)
+
+    def get(self, key: Hashable, factory: Callable[[], object]) -> object:
+        """
+        Returns the cached object for `key`, creating it with `factory` if it is not cached.
+        The object must have the `nbytes` attribute. Objects larger than `max_bytes` are not cached.
+
+        Args:
+            key (Hashable): The key.
+            factory (Callable[[], object]): Function creating the object.
+
+        Returns:
+            object: The cached or created object.
+        """
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                return self._cache[key]
+        value = factory()
+        with self._lock:
+            if key in self._cache or value.nbytes > self.max_bytes:
+                return value
+            self._cache[key] = value
+            self._nbytes += value.nbytes
+            while self._nbytes > self.max_bytes:
+                _, old = self._cache.popitem(last=False)
+                self._nbytes -= old.nbytes
+        return value
+
+    def clear(self) -> None:
+        """
+        Drop all cached objects.
+        """
+        with self._lock:
+            self._cache.clear()
+            self._nbytes = 0
+
+
+# Shared cache of the geometry maps (1 GiB by default)
+geometry_cache = GeometryCache(1 << 30)
+
+
+def get_disk_geometry(
+    shape: tuple[int, int],
+    center: tuple[float, float],
+    inc: float = 0.0,
+    PA: float = 0.0,
+    pixel_scale: float = 1.0,
+    sample_size: int = 1,
+) -> DiskGeometry:
+    """
+    Returns the deprojected geometry maps, reusing the cached maps for the same geometry.
+
+    Args:
+        shape (tuple[int, int]): Shape of the (downsampled) image (height, width).
+        center (tuple[float, float]): Center (x, y) of the disk in pixels of the (downsampled) image.
+        inc (float, optional): Inclination angle in degrees. Defaults to 0.0.
+        PA (float, optional): Position angle in degrees. Defaults to 0.0.
+        pixel_scale (float, optional): Size of a pixel of the original image. Defaults to 1.0.
+        sample_size (int, optional): Downsampling factor of the image. Defaults to 1.
+
+    Returns:
+        DiskGeometry: The geometry maps.
+    """
+    key = ("disk", tuple(shape), tuple(center), inc, PA, pixel_scale, sample_size)
+    return geometry_cache.get(
+        key,
+        lambda: DiskGeometry(shape, center, inc, PA, pixel_scale * sample_size),
+    )
+
+
+def get_cut_geometry(
+    shape: tuple[int, int],
+    center: tuple[int, int],
+    azimuths: tuple[float, ...],
+    sampling_size: int,
+    width: float,
+) -> CutGeometry:
+    """
+    Returns the pixel assignment of radial line cuts, reusing the cached one for the same geometry.
+
+    Args:
+        shape (tuple[int, int]): Shape of the image (height, width).
+        center (tuple[int, int]): Center (x, y) of the cuts in pixels.
+        azimuths (tuple[float, ...]): Azimuth angles in degrees measured from the north.
+        sampling_size (int): Step (and cell length) in pixels.
+        width (float): Width of the cells in pixels.
+
+    Returns:
+        CutGeometry: The pixel assignment.
+    """
+    key = ("cut", tuple(shape), tuple(center), tuple(azimuths), sampling_size, width)
+    return geometry_cache.get(
+        key, lambda: CutGeometry(shape, center, azimuths, sampling_size, width)
+    )
+
+
+def get_annulus_weights(
+    shape: tuple[int, int],
+    center: tuple[float, float],
+    inc: float,
+    PA: float,
+    r_edges: tuple[float, ...],
+    theta_ranges: tuple[tuple[float, float], ...] | None = None,
+) -> AnnulusWeights:
+    """
+    Returns the exact (annulus, wedge) weights, reusing the cached ones for the same geometry.
+    See `AnnulusWeights` for the arguments.
+    """
+    r_edges = tuple(float(r) for r in r_edges)
+    if theta_ranges is not None:
+        theta_ranges = tuple((float(a), float(b)) for a, b in theta_ranges)
+    key = ("annulus", tuple(shape), tuple(center), inc, PA, r_edges, theta_ranges)
+    return geometry_cache.get(
+        key, lambda: AnnulusWeights(shape, center, inc, PA, r_edges, theta_ranges)
+    )
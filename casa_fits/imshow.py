@@ -2,11 +2,12 @@ import numpy as np
 from matplotlib.patches import Ellipse
 import matplotlib.pyplot as plt
 from matplotlib.axes import Axes
-from scipy.ndimage import zoom
 from .Image import Image
 
 # from .PlotConfig import PlotConfig
-from .utilities import unitDict  # , get_pret_dir_name
+from .utilities import unitDict, downsample_data  # , get_pret_dir_name
+from .scaling import data_range, percentile_range, asinh_norm
+from .reproject import reproject_image
 from .matplotlib_helper import set_cbar, set_axes_options
 
 # from .prepare_image import prepare_image
@@ -49,6 +50,55 @@ def draw_beam(
     ax.add_patch(ellipse)
 
 
+def _visible_window(full: int, size: int | None) -> tuple[int, int]:
+    """
+    Returns the pixel range [start, stop) visible along an axis of `full` pixels cropped to `size` by imshow.
+    """
+    if not size:
+        return 0, full
+    mid = (full - 1) // 2
+    return max(int(np.floor(mid - size // 2 + 0.5)), 0), min(int(np.ceil(mid + size // 2 + 0.5)), full)
+
+
+def _decimated_plane(
+    ax: Axes,
+    img: Image,
+    stokes: int,
+    chan: int,
+    width: int | None,
+    height: int | None,
+    method: str,
+    max_pixels: tuple[int, int] | None,
+) -> tuple[np.ndarray, tuple[float, float, float, float]] | None:
+    """
+    Reads the visible window of the plane and downsamples it to about the resolution of the axes.
+
+    Returns:
+        tuple | None: The downsampled data and its extent in the pixel coordinates of the full plane,
+            or None if the window is not larger than the axes.
+    """
+    full_height, full_width = img.data.shape[-2:]
+    left, right = _visible_window(full_width, width)
+    bottom, top = _visible_window(full_height, height)
+    if max_pixels is None:
+        bbox = ax.get_window_extent()
+        max_pixels = (max(int(bbox.width), 1), max(int(bbox.height), 1))
+    factor = min((right - left) // max_pixels[0], (top - bottom) // max_pixels[1])
+    if factor <= 1:
+        return None
+    data = downsample_data(img.get_two_dim_window(stokes, chan, (left, right, bottom, top)), factor, method)
+    # downsample_data crops the remainder keeping the center
+    x0 = left + ((right - left) % factor) // 2
+    y0 = bottom + ((top - bottom) % factor) // 2
+    extent = (
+        x0 - 0.5,
+        x0 + data.shape[1] * factor - 0.5,
+        y0 - 0.5,
+        y0 + data.shape[0] * factor - 0.5,
+    )
+    return data, extent
+
+
 def imshow(ax: Axes, img: Image, **kwargs):
     """
     Rasterizes an image on given Axes object with matplotlib from a CASA style image file.
@@ -58,6 +108,20 @@ def imshow(ax: Axes, img: Image, **kwargs):
         img (Image): The Image object.
         config (PlotConfig): The PlotConfig object.
 
+    Keyword Args:
+        decimate (str | bool | None): If given, only the visible window (see `width` and `height`) is read and
+            downsampled to about the resolution of the axes before plotting, which makes huge images fast to draw.
+            The method of `utilities.downsample_data` ('mean', 'max', 'min' or 'minmax'), or True for 'mean'.
+            The axes keep the pixel coordinates of the full image, so the ticks, beam and contours are unchanged.
+        max_pixels (tuple[int, int] | None): Target (width, height) in pixels of the decimated image.
+            If None, the size of the axes on the figure.
+        scale (str): 'linear' (default), 'percentile' or 'asinh'. With 'percentile', vmin and vmax default to
+            the percentiles `percentile` estimated from a random sample of the data (see `scaling.percentile_range`).
+            With 'asinh', the colors follow `matplotlib.colors.AsinhNorm` (see `scaling.asinh_norm`).
+            The statistics of the whole data are cached in the Image (with the default `cbar='common'`).
+        percentile (tuple[float, float]): Lower and upper percentiles for `scale='percentile'`. Defaults to (0.5, 99.5).
+        linear_width (float | None): Width of the linear region for `scale='asinh'`. If None, the noise level of the data.
+
     Returns:
         matplotlib.image.AxesImage: The AxesImage object.
     """
@@ -78,16 +142,59 @@ def imshow(ax: Axes, img: Image, **kwargs):
     if img.data is None:
         raise ValueError("Image data is None.")
 
-    if kwargs.get("cbar", "common") == "common":
+    scale = kwargs.get("scale", "linear")
+    if scale not in ("linear", "percentile", "asinh"):
+        raise ValueError(f"Unknown scale: {scale}. Use 'linear', 'percentile' or 'asinh'.")
+    percentile = kwargs.get("percentile", (0.5, 99.5))
+
+    # The range of the whole data is cached in the Image, so plotting many channels scans the data once
+    common = kwargs.get("cbar", "common") == "common"
+    if common and (vmin is None or vmax is None):
+        if scale == "percentile":
+            data_min, data_max = percentile_range(img, *percentile)
+        else:
+            data_min, data_max = data_range(img)
         if vmin is None:
-            vmin = np.nanmin(img.data)
+            vmin = data_min
         if vmax is None:
-            vmax = np.nanmax(img.data)
+            vmax = data_max
 
     # Specify the stokes and channel
     stokes = kwargs.get("stokes", 0)
     chan = kwargs.get("chan", 0)
-    data = img.get_two_dim_data(stokes=stokes, chan=chan)
+    width = kwargs.get("width")
+    height = kwargs.get("height")
+    decimated = None
+    if decimate := kwargs.get("decimate"):
+        decimated = _decimated_plane(
+            ax,
+            img,
+            stokes,
+            chan,
+            width,
+            height,
+            "mean" if decimate is True else decimate,
+            kwargs.get("max_pixels"),
+        )
+    if decimated is None:
+        data, extent = img.get_two_dim_data(stokes=stokes, chan=chan), None
+    else:
+        data, extent = decimated
+
+    # Scale of the plane for the non-common colorbar
+    if scale == "percentile" and (vmin is None or vmax is None):
+        low, high = np.nanpercentile(data, percentile)
+        vmin = low if vmin is None else vmin
+        vmax = high if vmax is None else vmax
+    norm = None
+    if scale == "asinh":
+        norm = asinh_norm(
+            img,
+            np.nanmin(data) if vmin is None else vmin,
+            np.nanmax(data) if vmax is None else vmax,
+            kwargs.get("linear_width"),
+        )
+        vmin = vmax = None
 
     im = ax.imshow(
         data,
@@ -95,14 +202,21 @@ def imshow(ax: Axes, img: Image, **kwargs):
         aspect="equal",
         vmin=vmin,
         vmax=vmax,
+        norm=norm,
         origin="lower",
+        extent=extent,
     )
+    if decimated is not None:
+        # Limits of the full image as without decimation
+        full_height, full_width = img.data.shape[-2:]
+        ax.set_xlim(-0.5, full_width - 0.5)
+        ax.set_ylim(-0.5, full_height - 0.5)
     # Crop the image if specified with width or height
-    if width := kwargs.get("width"):
+    if width:
         x_lim = ax.get_xlim()
         x_mid = (x_lim[0] + x_lim[1]) // 2
         ax.set_xlim(x_mid - width // 2, x_mid + width // 2)
-    if height := kwargs.get("height"):
+    if height:
         y_lim = ax.get_ylim()
         y_mid = (y_lim[0] + y_lim[1]) // 2
         ax.set_ylim(y_mid - height // 2, y_mid + height // 2)
@@ -157,81 +271,59 @@ def overlay_contour(
     """
     Overlays contours on the image.
 
+    The contour image is resampled onto the pixel grid of the background image (see `reproject_image`):
+    on the sky if both images have `center_radec` and `center_pix`, otherwise by aligning their centers.
+    Only the visible window of the axes is resampled, and the mapping is cached,
+    so overlaying many images (e.g. lines) on the same background is fast.
     To plot with correct scaling, both Image objects should have `incr_x` and `incr_y` attributes.
 
     Args:
         ax (plt.Axes): The Axes object.
         img_base (Image): Image plotted as background (This should have been already plotted).
         img (Image): Image to be plotted as contours.
+        stokes (int): The Stokes index to be plotted. Default is 0.
+        chan (int): The channel number to be plotted. Default is 0.
         fill (bool): If `True`, the contours will be filled. Default is `False`.
-        nchan (int): The channel number to be plotted. If img is a cube, this should be specified.
         **kwargs: Contour configuration keywords of matplotlib.pyplot.contour.
     """
     try:
         im_arr = ax.get_images()[0].get_array()
         if im_arr is None:
             raise ValueError("The axes is not plotted yet.")
-        height, width = im_arr.shape
     except IndexError:
         print(
             "The background image is not plotted yet. Please plot the background image first."
         )
         return
 
-    # if img.is_cube and nchan is None:
-    #     print('The channel number should be specified for the cube image.')
-    #     return
-
-    stokes = kwargs.get("stokes", 0)
-    chan = kwargs.get("chan", 0)
-
-    if img_base.unit_x is None:
-        raise ValueError("Base image unit_x is None.")
-    img.convert_axes_unit(img_base.unit_x)
-
+    if img_base.data is None:
+        raise ValueError("Base image data is None.")
     if img.data is None:
         raise ValueError("Image data is None.")
-
-    match img.data.ndim:
-        case 4:  # Stokes and channel
-            data = img.data[stokes, chan]
-        case 2:
-            data = img.data
-        case _:
-            raise ValueError(
-                f"Unsupported data dimension: {img.data.ndim}. Expected 2D or 4D data."
-            )
-
     if img.incr_x is None or img.incr_y is None:
         raise ValueError("Image increment x or y is None.")
     if img_base.incr_x is None or img_base.incr_y is None:
         raise ValueError("Base image increment x or y is None.")
 
-    ratio = (abs(img.incr_x / img_base.incr_x), abs(img.incr_y / img_base.incr_y))
-    data = zoom(data, ratio, order=1)
-    # trim the data to the size of the background image by the center
-    if data.shape[0] > height:
-        diff = data.shape[0] - height
-        data = data[diff // 2 : diff // 2 + height]
-    if data.shape[1] > width:
-        diff = data.shape[1] - width
-        data = data[:, diff // 2 : diff // 2 + width]
-
-    # xlim = ax.get_xlim()
-    # ylim = ax.get_ylim()
-    # extent = ax.get_images()[0].get_extent()
-
-    # x = np.linspace(extent[0], extent[1], data.shape[1])
-    # y = np.linspace(extent[2], extent[3], data.shape[0])
-    # X, Y = np.meshgrid(x, y)
-
+    # Visible window of the background in its pixels
+    height, width = img_base.data.shape[-2:]
+    x_lim = sorted(ax.get_xlim())
+    y_lim = sorted(ax.get_ylim())
+    left = min(max(int(np.floor(x_lim[0] + 0.5)), 0), width - 1)
+    right = max(min(int(np.ceil(x_lim[1] + 0.5)), width), left + 1)
+    bottom = min(max(int(np.floor(y_lim[0] + 0.5)), 0), height - 1)
+    top = max(min(int(np.ceil(y_lim[1] + 0.5)), height), bottom + 1)
+    # Contours need at least 2 x 2 points
+    right = max(right, min(left + 2, width))
+    top = max(top, min(bottom + 2, height))
+
+    data = reproject_image(img, img_base, (left, right, bottom, top), stokes, chan)
+    # Positions of the first and last points
+    extent = (left, right - 1, bottom, top - 1)
     if fill:
-        ax.contourf(data, origin="lower", **kwargs)
+        ax.contourf(data, origin="lower", extent=extent, **kwargs)
     else:
-        ax.contour(data, origin="lower", **kwargs)
-    # ax.contour(data, **kwargs)
-    # ax.set_xlim(xlim)
-    # ax.set_ylim(ylim)
+        ax.contour(data, origin="lower", extent=extent, **kwargs)
 
 
 # def lazy_raster(imagename: str, **kwargs) -> None:
@@ -1,5 +1,6 @@
 import numpy as np
 from .Image import Image
+from .cubestat import accumulate_stats
 
 
 def imstat(
@@ -12,6 +13,10 @@ def imstat(
     """
     Alternative version of imstat.
 
+    The statistics are accumulated in a single pass over read-only views of the data
+    (NaN values are ignored), and the unit area is applied to the results.
+    The Image object is not modified, so it can be shared between threads.
+
     Args:
         image (Image): Image object.
         uncertainty (float): Flux uncertainty.
@@ -19,49 +24,41 @@ def imstat(
         mask (np.ndarray, optional): If specified, statistics are calculated using only the data within the mask. Defaults to None.
         inverse_mask (bool, optional): If True, the specified mask region is inverted. Defaults to False.
     """
-    data = image.data
-    image.convert_axes_unit("arcsec")
+    if image.beam is None:
+        raise ValueError("The image does not have a beam size.")
+    # The beam size is always in arcsec
     if unit == "beam":
         unit_area = 1
     elif unit == "arcsec":
         unit_area = np.pi * image.beam[0] * image.beam[1]
     else:
         raise ValueError("Arg `unit` must be `'beam'` or `'arcsec'`.")
-    data /= unit_area
+    stats_all, stats_masked = accumulate_stats(image, mask, inverse_mask)
     ret = {}
     ret["unit"] = image.unit_data
     ret["restoring beam"] = {}
     ret["restoring beam"]["x"] = image.beam[0]
     ret["restoring beam"]["y"] = image.beam[1]
     ret["restoring beam"]["ang"] = image.beam[2]
-    ret["all"] = {}
-    ret["all"]["max"] = np.max(data)
+    ret["all"] = _normalize(stats_all.total().result(), unit_area)
     ret["all"]["max_sigma"] = ret["all"]["max"] * uncertainty
-    ret["all"]["min"] = np.min(data)
-    ret["all"]["sum"] = np.sum(data)
-    ret["all"]["sumsq"] = np.sum(np.square(data))
-    ret["all"]["mean"] = np.mean(data)
-    ret["all"]["sigma"] = np.var(data, ddof=1)
-    ret["all"]["rms"] = np.sqrt(ret["all"]["sumsq"] / data.size)
-    # process mask
-    if mask is not None:
-        # Normalize the mask to True/False
-        if mask.dtype != bool:
-            mask = mask.astype(bool)
-        if inverse_mask:
-            mask = ~mask
-        # Mask the data as np.nan
-        data = np.where(mask, data, np.nan)
-        # count the number of unmasked pixels
-        num_unmasked = np.sum(mask)
-        ret["masked"] = {}
-        ret["masked"]["max"] = np.nanmax(data)
-        ret["masked"]["min"] = np.nanmin(data)
-        ret["masked"]["sum"] = np.nansum(data)
-        ret["masked"]["sumsq"] = np.nansum(np.square(data))
-        ret["masked"]["mean"] = np.nanmean(data)
-        ret["masked"]["sigma"] = np.nanvar(data, ddof=1)
-        ret["masked"]["rms"] = np.sqrt(ret["masked"]["sumsq"] / num_unmasked)
+    if stats_masked is not None:
+        ret["masked"] = _normalize(stats_masked.total().result(), unit_area)
         ret["psnr"] = ret["all"]["max"] / ret["masked"]["rms"]
         ret["psnr_sigma"] = ret["all"]["max_sigma"] / ret["masked"]["rms"]
     return ret
+
+
+def _normalize(stats: dict[str, np.ndarray], unit_area: float) -> dict[str, float]:
+    """
+    Divide the accumulated statistics by the unit area.
+    """
+    return {
+        "max": float(stats["max"]) / unit_area,
+        "min": float(stats["min"]) / unit_area,
+        "sum": float(stats["sum"]) / unit_area,
+        "sumsq": float(stats["sumsq"]) / unit_area**2,
+        "mean": float(stats["mean"]) / unit_area,
+        "sigma": float(stats["var"]) / unit_area**2,
+        "rms": float(stats["rms"]) / unit_area,
+    }
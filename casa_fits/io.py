@@ -4,6 +4,87 @@ from astropy.wcs import WCS
 from astropy.coordinates import SkyCoord
 from astropy import units as u
 from .Image import Image
+from .chunked import ChunkedArray
+from .lazy_data import LazyFitsData, _axis_slice
+
+
+def _crop_window(
+    center_x: float, center_y: float, width: int, height: int, full_width: int, full_height: int
+) -> tuple[int, int, int, int]:
+    """
+    Calculate the pixel window of the cropped image.
+    If the window exceeds the image, it is shrunk while keeping its center.
+
+    Args:
+        center_x (float): X pixel coordinate of the center of the window.
+        center_y (float): Y pixel coordinate of the center of the window.
+        width (int): Width of the window.
+        height (int): Height of the window.
+        full_width (int): Width of the full image.
+        full_height (int): Height of the full image.
+
+    Returns:
+        tuple[int, int, int, int]: (left, right, bottom, top) of the window. `right` and `top` are exclusive.
+    """
+    left = int(round(center_x - width / 2))
+    right = int(round(center_x + width / 2))
+    bottom = int(round(center_y - height / 2))
+    top = int(round(center_y + height / 2))
+    # Ensure the new dimensions are within bounds
+    if left < 0:
+        right += left
+        left = 0
+    if right > full_width:
+        left += right - full_width
+        right = full_width
+    if bottom < 0:
+        top += bottom
+        bottom = 0
+    if top > full_height:
+        bottom += top - full_height
+        top = full_height
+    return left, right, bottom, top
+
+
+def read_fits_window(
+    hdu: fits.PrimaryHDU,
+    window: tuple[int, int, int, int] | None = None,
+    stokes: int | tuple[int, int] | None = None,
+    chan: int | tuple[int, int] | None = None,
+) -> tuple[np.ndarray, int]:
+    """
+    Read a window of the primary HDU without loading the whole data array.
+
+    The data layout is assumed to be (Stokes, Channel, Y, X) for 4D, (Channel, Y, X) for 3D and (Y, X) for 2D data.
+    Only the requested part is read from the file through the section interface.
+
+    Args:
+        hdu (fits.PrimaryHDU): The HDU to read. The HDU list should be opened with `memmap=True`.
+        window (tuple[int, int, int, int], optional): (left, right, bottom, top) pixel window. If None, the full plane is read.
+        stokes (int | tuple[int, int], optional): Stokes index or (start, stop) range. If None, all Stokes are read. Ignored for 2D and 3D data.
+        chan (int | tuple[int, int], optional): Channel index or (start, stop) range. If None, all channels are read. Ignored for 2D data.
+
+    Returns:
+        tuple[np.ndarray, int]: The data with the same number of dimensions as the file, and the number of bytes read.
+    """
+    header = hdu.header
+    naxis = header["NAXIS"]
+    if window is None:
+        window = (0, header["NAXIS1"], 0, header["NAXIS2"])
+    left, right, bottom, top = window
+    slices: tuple[slice, ...] = (slice(bottom, top), slice(left, right))
+    if naxis == 4:
+        slices = (
+            _axis_slice(stokes, header["NAXIS4"], "Stokes"),
+            _axis_slice(chan, header["NAXIS3"], "Channel"),
+        ) + slices
+    elif naxis == 3:
+        slices = (_axis_slice(chan, header["NAXIS3"], "Channel"),) + slices
+    elif naxis != 2:
+        raise ValueError(f"Unsupported data dimension: {naxis}. Expected 2D, 3D or 4D data.")
+    data = hdu.section[slices]
+    nbytes = data.size * abs(header["BITPIX"]) // 8
+    return data, nbytes
 
 
 def load_fits(
@@ -11,15 +92,33 @@ def load_fits(
     width: int = None,
     height: int = None,
     center_radec: tuple[float, float] = None,
+    stokes: int | tuple[int, int] | None = None,
+    chan: int | tuple[int, int] | None = None,
+    lazy: bool = False,
+    max_planes: int = 8,
+    chunks: tuple[int, ...] | bool | None = None,
 ) -> Image:
     """
     Create an Image object from a FITS file.
 
+    The file is memory-mapped and only the requested window, Stokes and channels are read.
+    The number of bytes read is stored in `Image.nbytes_read`.
+    If `lazy` is True, no data is read here. Instead, `Image.data` is a `LazyFitsData`
+    which reads each (Stokes, channel) plane on first access and caches up to `max_planes` planes.
+    If `chunks` is given, no data is read here either and `Image.data` is a `ChunkedArray`
+    on which slicing, arithmetic and reductions are evaluated chunk by chunk.
+
     Args:
         fits_file (str): Path to the FITS file.
         width (int, optional): Width of the cropped image. If None, uses the full width.
         height (int, optional): Height of the cropped image. If None, uses the full height.
         center_radec (tuple[float, float], optional): Center coordinates in RA, Dec format. If None, uses the center of the image.
+        stokes (int | tuple[int, int], optional): Stokes index or (start, stop) range to load. If None, loads all Stokes.
+        chan (int | tuple[int, int], optional): Channel index or (start, stop) range to load. If None, loads all channels.
+        lazy (bool, optional): If True, the data is read plane by plane on demand. Defaults to False.
+        max_planes (int, optional): Maximum number of planes cached by the lazy data. Defaults to 8.
+        chunks (tuple[int, ...] | bool | None, optional): Chunk size of each axis of the `ChunkedArray` (-1 for the whole axis),
+            or True for the default chunks. Defaults to None.
 
     Returns:
         Image: An Image object.
@@ -30,18 +129,20 @@ def load_fits(
     image.imagename = fits_file.rsplit(".", 1)[0]
     # Load the FITS file and extract the data and header information
     try:
-        with fits.open(fits_file) as hdul:
-            image.data = hdul[0].data
+        with fits.open(fits_file, memmap=True) as hdul:
             header = hdul[0].header
             image.width = header["NAXIS1"]
             image.height = header["NAXIS2"]
             image.nchan = header.get("NAXIS3", 1)
             image.center_radec = (header["CRVAL1"], header["CRVAL2"])
             image.center_pix = (header["CRPIX1"] - 1, header["CRPIX2"] - 1)
-            image.freq0 = header.get("CRVAL3", 0.0)
             image.incr_x = header["CDELT1"]
             image.incr_y = header["CDELT2"]
             image.incr_hz = header.get("CDELT3", 0.0)
+            # Spectral value of the first channel
+            image.freq0 = header.get("CRVAL3", 0.0) + (1 - header.get("CRPIX3", 1.0)) * image.incr_hz
+            image.unit_freq = header.get("CUNIT3")
+            image.restfreq = header.get("RESTFRQ", header.get("RESTFREQ"))
             image.unit_x = header.get("CUNIT1", "deg")
             image.unit_y = header.get("CUNIT2", "deg")
             image.unit_data = header.get("BUNIT", "Jy/beam")
@@ -58,62 +159,49 @@ def load_fits(
                 image.beam = None
 
             # Cropping
+            crop_center = image.center_pix
             if center_radec is not None:
-                wcs = WCS(header)
+                wcs = WCS(header).celestial
                 center_coord = SkyCoord(
                     center_radec[0],
                     center_radec[1],
                     unit=(u.hourangle, u.deg),
                     frame="icrs",
                 )
-                image.center_pix = wcs.world_to_pixel(center_coord)
-                # Debug
-                # print(
-                #     f"New center pixel coordinates: {image.center_pix[0]}, {image.center_pix[1]}"
-                # )
+                crop_center = wcs.world_to_pixel(center_coord)
             # new width and height
             if width is None:
                 width = image.width
             if height is None:
                 height = image.height
-            # Calculate new left, right, top, bottom based on the new center
-            # print(image.center_pix, width, height)
-            left = int(round(image.center_pix[0] - width / 2))
-            right = int(round(image.center_pix[0] + width / 2))
-            bottom = int(round(image.center_pix[1] - height / 2))
-            top = int(round(image.center_pix[1] + height / 2))
-            # Ensure the new dimensions are within bounds
-            if left < 0:
-                right += left
-                left = 0
-            if right > image.width:
-                left += right - image.width
-                right = image.width
-            if bottom < 0:
-                top += bottom
-                bottom = 0
-            if top > image.height:
-                bottom += top - image.height
-                top = image.height
-            # Debugging output
-            # print(
-            #     f"Cropping to: left={left}, right={right}, bottom={bottom}, top={top}"
-            # )
-            # Crop the data
-            image.data = image.data[bottom:top, left:right]
-
-            # For debugging purposes, print all attributes
-            # print(f"Loaded FITS file '{fits_file}':")
-            # print(f"  Width: {image.width}, Height: {image.height}, Channels: {image.nchan}")
-            # print(f"  Center (RA, Dec): {image.center_radec}")
-            # print(f"  Center (X, Y): {image.center_pix}")
-            # print(f"  Freq0: {image.freq0}")
-            # print(f"  Incr X: {image.incr_x}, Incr Y: {image.incr_y}, Incr Hz: {image.incr_hz}")
-            # print(f"  Units: X={image.unit_x}, Y={image.unit_y}, Data={image.unit_data}")
-            # if image.beam:
-            #     print(f"  Beam: Major={image.beam[0]}, Minor={image.beam[1]}, Angle={image.beam[2]}")
-            # else:
-            #     print("  No beam information available.")
+            left, right, bottom, top = _crop_window(
+                crop_center[0], crop_center[1], width, height, image.width, image.height
+            )
+
+            # Read only the window (and the selected Stokes and channels)
+            if chunks is not None and chunks is not False:
+                image.data = ChunkedArray(
+                    LazyFitsData(fits_file, (left, right, bottom, top), stokes, chan, max_planes),
+                    None if chunks is True else chunks,
+                )
+                image.nbytes_read = 0
+            elif lazy:
+                image.data = LazyFitsData(
+                    fits_file, (left, right, bottom, top), stokes, chan, max_planes
+                )
+                image.nbytes_read = 0
+            else:
+                image.data, image.nbytes_read = read_fits_window(
+                    hdul[0], (left, right, bottom, top), stokes, chan
+                )
+            image.width = right - left
+            image.height = top - bottom
+            if image.data.ndim >= 3:
+                image.nchan = image.data.shape[-3]
+                if chan is not None:
+                    image.freq0 += _axis_slice(chan, header["NAXIS3"], "Channel").start * image.incr_hz
+            # The reference pixel in the cropped frame
+            image.center_pix = (image.center_pix[0] - left, image.center_pix[1] - bottom)
     except Exception as e:
         raise ValueError(f"Failed to open FITS file '{fits_file}': {e}")
 
@@ -125,6 +213,7 @@ def load_image(
     width: int = None,
     height: int = None,
     center_radec: tuple[float, float] = None,
+    chunks: tuple[int, ...] | bool | None = None,
 ) -> Image:
     """
     Create an Image object from a CASA image file.
@@ -134,6 +223,9 @@ def load_image(
         width (int, optional): Width of the cropped image. If None, uses the full width.
         height (int, optional): Height of the cropped image. If None, uses the full height.
         center_radec (tuple[float, float], optional): Center coordinates in RA, Dec format. If None, uses the center of the image.
+        chunks (tuple[int, ...] | bool | None, optional): If given, the data is not read here and `Image.data` is
+            a `ChunkedArray` with the chunk size of each axis (-1 for the whole axis), or the default chunks for True.
+            Each chunk is read from the image when it is evaluated. Defaults to None.
 
     Returns:
         Image: An Image object.
@@ -158,11 +250,15 @@ def load_image(
 
     image.x0 = inform["refval"][0]
     image.y0 = inform["refval"][1]
-    image.freq0 = inform["refval"][3]
 
     image.incr_x = inform["incr"][0]
     image.incr_y = inform["incr"][1]
     image.incr_hz = inform["incr"][3]
+    # Spectral value of the first channel (refpix is 0-based; all channels are loaded)
+    image.freq0 = inform["refval"][3] - inform["refpix"][3] * image.incr_hz
+    image.unit_freq = inform["axisunits"][3]
+    restfreq = inform.get("restfreq")
+    image.restfreq = float(np.atleast_1d(restfreq)[0]) if restfreq is not None else None
     try:
         if inform["restoringbeam"]["positionangle"]["unit"] == "rad":
             pa = np.rad2deg(
@@ -226,12 +322,36 @@ def load_image(
     trc = [trc_x, trc_y]
     image.height = trc_y - blc_y
     image.width = trc_x - blc_x
+    if chunks is not None and chunks is not False:
+        ia.close()
+
+        def read(slices):
+            s, c, y, x = slices
+            ia_chunk = casa_image()
+            ia_chunk.open(imagename)
+            try:
+                chunk = ia_chunk.getchunk(
+                    blc=[blc_x + x.start, blc_y + y.start, s.start, c.start],
+                    trc=[blc_x + x.stop - 1, blc_y + y.stop - 1, s.stop - 1, c.stop - 1],
+                )
+            finally:
+                ia_chunk.close()
+            return chunk.transpose(2, 3, 1, 0)
+
+        shape = (inform["shape"][2], image.nchan, image.height, image.width)
+        image.data = ChunkedArray.from_reader(
+            shape, np.float32, read, None if chunks is True else chunks
+        )
+        image.nbytes_read = 0
+        image.convert_axes_unit("arcsec")
+        return image
     rawdata = ia.getchunk(blc=blc, trc=trc)
     ia.close()
 
     # Need to reconsider the shape of image.img
     rawdata = rawdata.transpose(2, 3, 1, 0)
     image.data = rawdata
+    image.nbytes_read = rawdata.nbytes
 
     # Convert RA/DEC units to arcsec
     image.convert_axes_unit("arcsec")
@@ -0,0 +1,292 @@
+import threading
+from collections import OrderedDict
+import numpy as np
+from astropy.io import fits
+
+
+def _axis_slice(select: int | tuple[int, int] | None, length: int, name: str) -> slice:
+    """
+    Convert a Stokes or channel selection to a slice.
+
+    Args:
+        select (int | tuple[int, int] | None): Index, (start, stop) range or None for the full axis.
+        length (int): Length of the axis.
+        name (str): Name of the axis used in error messages.
+
+    Returns:
+        slice: The slice of the axis.
+    """
+    if select is None:
+        return slice(0, length)
+    if isinstance(select, tuple):
+        start, stop = select
+    else:
+        start, stop = select, select + 1
+    if start < 0 or stop > length or start >= stop:
+        raise IndexError(f"{name} range {select} is out of bounds for axis of length {length}.")
+    return slice(start, stop)
+
+
+class LazyFitsData:
+    """
+    Data of a FITS image which is read from the file on demand.
+
+    Two-dimensional (Stokes, channel) planes are read when they are first accessed
+    and kept in a bounded LRU cache, so only a few planes are in memory at a time.
+    The object behaves like a read-only array for `shape`, `ndim`, `dtype` and indexing.
+    """
+
+    def __init__(
+        self,
+        fits_file: str,
+        window: tuple[int, int, int, int] | None = None,
+        stokes: int | tuple[int, int] | None = None,
+        chan: int | tuple[int, int] | None = None,
+        max_planes: int = 8,
+    ):
+        """
+        Args:
+            fits_file (str): Path to the FITS file.
+            window (tuple[int, int, int, int], optional): (left, right, bottom, top) pixel window. If None, the full plane is used.
+            stokes (int | tuple[int, int], optional): Stokes index or (start, stop) range. If None, all Stokes are used.
+            chan (int | tuple[int, int], optional): Channel index or (start, stop) range. If None, all channels are used.
+            max_planes (int, optional): Maximum number of planes kept in the cache. Defaults to 8.
+        """
+        if max_planes <= 0:
+            raise ValueError("max_planes must be a positive integer.")
+        self.fits_file = fits_file
+        self.max_planes = max_planes
+        self.nbytes_read = 0
+        with fits.open(fits_file, memmap=True) as hdul:
+            header = hdul[0].header
+            naxis = header["NAXIS"]
+            if naxis not in (2, 3, 4):
+                raise ValueError(
+                    f"Unsupported data dimension: {naxis}. Expected 2D, 3D or 4D data."
+                )
+            if window is None:
+                window = (0, header["NAXIS1"], 0, header["NAXIS2"])
+            self._stokes = _axis_slice(stokes if naxis == 4 else None, header.get("NAXIS4", 1), "Stokes")
+            self._chan = _axis_slice(chan if naxis >= 3 else None, header.get("NAXIS3", 1), "Channel")
+            # Read a single pixel to know the dtype after scaling
+            self.dtype = hdul[0].section[(0,) * (naxis - 1) + (slice(0, 1),)].dtype
+        self.window = window
+        left, right, bottom, top = window
+        plane_shape = (top - bottom, right - left)
+        if naxis == 4:
+            self.shape = (
+                self._stokes.stop - self._stokes.start,
+                self._chan.stop - self._chan.start,
+            ) + plane_shape
+        elif naxis == 3:
+            self.shape = (self._chan.stop - self._chan.start,) + plane_shape
+        else:
+            self.shape = plane_shape
+        self._hdul: fits.HDUList | None = None
+        self._cache: OrderedDict[tuple[int, int], np.ndarray] = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def ndim(self) -> int:
+        return len(self.shape)
+
+    @property
+    def size(self) -> int:
+        return int(np.prod(self.shape))
+
+    def __len__(self) -> int:
+        return self.shape[0]
+
+    def __repr__(self) -> str:
+        return f"LazyFitsData('{self.fits_file}', shape={self.shape}, dtype={self.dtype})"
+
+    def _read(
+        self, stokes: int, chan: int, window: tuple[int, int, int, int]
+    ) -> np.ndarray:
+        """
+        Read a window of a plane from the file. Indices are relative to the selected ranges.
+        The caller must hold the lock.
+        """
+        if self._hdul is None:
+            self._hdul = fits.open(self.fits_file, memmap=True)
+        left, right, bottom, top = window
+        x0, _, y0, _ = self.window
+        slices: tuple[int | slice, ...] = (slice(y0 + bottom, y0 + top), slice(x0 + left, x0 + right))
+        if self.ndim == 4:
+            slices = (self._stokes.start + stokes, self._chan.start + chan) + slices
+        elif self.ndim == 3:
+            slices = (self._chan.start + chan,) + slices
+        data = self._hdul[0].section[slices]
+        self.nbytes_read += data.nbytes
+        return data
+
+    def read_window(
+        self, stokes: int, chan: int, window: tuple[int, int, int, int]
+    ) -> np.ndarray:
+        """
+        Read a window of a plane from the file without caching it.
+
+        Args:
+            stokes (int): Stokes index.
+            chan (int): Channel index.
+            window (tuple[int, int, int, int]): (left, right, bottom, top) pixel window relative to this data.
+
+        Returns:
+            np.ndarray: The 2D data of the window.
+        """
+        if self.ndim < 4:
+            stokes = 0
+        if self.ndim < 3:
+            chan = 0
+        with self._lock:
+            if (stokes, chan) in self._cache:
+                left, right, bottom, top = window
+                return self._cache[(stokes, chan)][bottom:top, left:right]
+            return self._read(stokes, chan, window)
+
+    def read_channels(
+        self, stokes: int, start: int, stop: int, window: tuple[int, int, int, int] | None = None
+    ) -> np.ndarray:
+        """
+        Read a range of channels of a Stokes from the file with a single read, without caching.
+
+        Args:
+            stokes (int): Stokes index. Ignored for 2D and 3D data.
+            start (int): First channel index.
+            stop (int): Channel index after the last one.
+            window (tuple[int, int, int, int], optional): (left, right, bottom, top) pixel window relative to this data.
+                If None, the full plane.
+
+        Returns:
+            np.ndarray: The 3D data (channel, y, x).
+        """
+        x0, _, y0, _ = self.window
+        if window is None:
+            height, width = self.shape[-2:]
+            window = (0, width, 0, height)
+        left, right, bottom, top = window
+        slices: tuple[int | slice, ...] = (slice(y0 + bottom, y0 + top), slice(x0 + left, x0 + right))
+        if self.ndim == 4:
+            slices = (self._stokes.start + stokes, slice(self._chan.start + start, self._chan.start + stop)) + slices
+        elif self.ndim == 3:
+            slices = (slice(self._chan.start + start, self._chan.start + stop),) + slices
+        with self._lock:
+            if self._hdul is None:
+                self._hdul = fits.open(self.fits_file, memmap=True)
+            data = self._hdul[0].section[slices]
+            self.nbytes_read += data.nbytes
+        if self.ndim == 2:
+            data = data[np.newaxis]
+        return data
+
+    def read_block(self, slices: tuple[slice, ...]) -> np.ndarray:
+        """
+        Read a block of the data from the file with a single read, without caching.
+
+        Args:
+            slices (tuple[slice, ...]): One slice with step 1 per axis, relative to this data.
+
+        Returns:
+            np.ndarray: The block with the same number of dimensions as this data.
+        """
+        x0, _, y0, _ = self.window
+        *lead, ys, xs = slices
+        parent: tuple[slice, ...] = (
+            slice(y0 + ys.start, y0 + ys.stop),
+            slice(x0 + xs.start, x0 + xs.stop),
+        )
+        if self.ndim == 4:
+            parent = (
+                slice(self._stokes.start + lead[0].start, self._stokes.start + lead[0].stop),
+                slice(self._chan.start + lead[1].start, self._chan.start + lead[1].stop),
+            ) + parent
+        elif self.ndim == 3:
+            parent = (slice(self._chan.start + lead[0].start, self._chan.start + lead[0].stop),) + parent
+        with self._lock:
+            if self._hdul is None:
+                self._hdul = fits.open(self.fits_file, memmap=True)
+            data = self._hdul[0].section[parent]
+            self.nbytes_read += data.nbytes
+        return data
+
+    def get_plane(self, stokes: int = 0, chan: int = 0) -> np.ndarray:
+        """
+        Returns a 2D plane, reading it from the file if it is not cached.
+        The returned array is read-only.
+
+        Args:
+            stokes (int, optional): Stokes index. Ignored for 2D and 3D data. Defaults to 0.
+            chan (int, optional): Channel index. Ignored for 2D data. Defaults to 0.
+
+        Returns:
+            np.ndarray: The 2D data.
+        """
+        if self.ndim < 4:
+            stokes = 0
+        if self.ndim < 3:
+            chan = 0
+        key = (stokes, chan)
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                return self._cache[key]
+            height, width = self.shape[-2:]
+            plane = self._read(stokes, chan, (0, width, 0, height))
+            plane.flags.writeable = False
+            self._cache[key] = plane
+            if len(self._cache) > self.max_planes:
+                self._cache.popitem(last=False)
+            return plane
+
+    def clear_cache(self) -> None:
+        """
+        Drop all cached planes.
+        """
+        with self._lock:
+            self._cache.clear()
+
+    def close(self) -> None:
+        """
+        Close the file and drop all cached planes.
+        """
+        with self._lock:
+            self._cache.clear()
+            if self._hdul is not None:
+                self._hdul.close()
+                self._hdul = None
+
+    def __getitem__(self, key) -> np.ndarray:
+        if not isinstance(key, tuple):
+            key = (key,)
+        nlead = self.ndim - 2
+        lead = key[:nlead]
+        if len(lead) == nlead and all(isinstance(k, (int, np.integer)) for k in lead):
+            # Plane access (e.g. data[stokes, chan]) reads a single plane
+            index = [int(k) if k >= 0 else int(k) + n for k, n in zip(lead, self.shape)]
+            for i, n in zip(index, self.shape):
+                if i < 0 or i >= n:
+                    raise IndexError(f"Index {key} is out of bounds for data with shape {self.shape}.")
+            if self.ndim == 4:
+                plane = self.get_plane(*index)
+            elif self.ndim == 3:
+                plane = self.get_plane(0, index[0])
+            else:
+                plane = self.get_plane()
+            return plane[key[nlead:]].copy()
+        return np.asarray(self)[key]
+
+    def __array__(self, dtype=None, copy=None) -> np.ndarray:
+        data = np.empty(self.shape, dtype=self.dtype)
+        height, width = self.shape[-2:]
+        with self._lock:
+            for index in np.ndindex(self.shape[:-2]):
+                if self.ndim == 4:
+                    plane = self._read(index[0], index[1], (0, width, 0, height))
+                elif self.ndim == 3:
+                    plane = self._read(0, index[0], (0, width, 0, height))
+                else:
+                    plane = self._read(0, 0, (0, width, 0, height))
+                data[index] = plane
+        if dtype is not None:
+            data = data.astype(dtype)
+        return data
@@ -4,7 +4,7 @@ import matplotlib.ticker as ticker
 from .utilities import get_si_prefix_base10, get_si_prefix_symbol
 
 
-def set_cbar(im: matplotlib.image.AxesImage, observable: str, unit: str, rescale: str, fmt: str, fmt_default: str) -> None:
+def set_cbar(im: matplotlib.image.AxesImage, observable: str, unit: str, rescale: str, fmt: str, fmt_default: str, ax=None) -> None:
     """
     Sets the colorbar for the given figure and image axes.
 
@@ -15,13 +15,16 @@ def set_cbar(im: matplotlib.image.AxesImage, observable: str, unit: str, rescale
         rescale (str): The SI prefix to rescale the colorbar.
         fmt (str): The format string for the colorbar labels.
         fmt_default (str): The default format string for the colorbar labels.
+        ax (matplotlib.axes.Axes | list, optional): The axes from which space for the colorbar is taken.
+            If None, the axes of the image.
     """
     def fn_fmt(x, pos):
         try:
             return ('{' + fmt + '}').format(x * get_si_prefix_base10(rescale))
         except ValueError:
             return ('{' + fmt_default + '}').format(x * get_si_prefix_base10(rescale))
-    cbar = plt.colorbar(im, format=ticker.FuncFormatter(fn_fmt))
+    # The figure of the image instead of the current pyplot figure, so that figures without pyplot work
+    cbar = im.axes.figure.colorbar(im, ax=ax if ax is not None else im.axes, format=ticker.FuncFormatter(fn_fmt))
     if observable is None:
         label_observable = 'Intensity'
     else:
@@ -0,0 +1,240 @@
+import copy
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from .Image import Image
+
+# Speed of light in km/s
+_C_KMS = 299792.458
+
+# Suffix of the image name of each moment (same as CASA immoments)
+_MOMENT_SUFFIX = {
+    0: "integrated",
+    1: "weighted_coord",
+    2: "weighted_dispersion_coord",
+    8: "maximum",
+    9: "maximum_coord",
+}
+
+
+def velocity_axis(img: Image, restfreq: float | None = None) -> tuple[np.ndarray, float, str]:
+    """
+    Returns the velocity of each channel of the image.
+
+    Velocity axes in m/s are converted to km/s, and frequency axes are converted to the radio velocity in km/s
+    using the rest frequency. Other spectral axes are returned as they are.
+
+    Args:
+        img (Image): The Image object.
+        restfreq (float | None, optional): Rest frequency in Hz. If None, `img.restfreq` is used.
+
+    Returns:
+        tuple: The velocity of each channel, the channel width (positive) and the unit.
+    """
+    if img.data is None:
+        raise ValueError("Image data is None.")
+    if img.freq0 is None or img.incr_hz is None:
+        raise ValueError("Image spectral axis (freq0 or incr_hz) is None.")
+    nchan = img.data.shape[-3] if img.data.ndim >= 3 else 1
+    spec = img.freq0 + np.arange(nchan) * img.incr_hz
+    unit = img.unit_freq or ""
+    if unit == "m/s":
+        return spec / 1e3, abs(img.incr_hz) / 1e3, "km/s"
+    if unit == "km/s":
+        return spec, abs(img.incr_hz), "km/s"
+    if unit == "Hz":
+        if restfreq is None:
+            restfreq = img.restfreq
+        if not restfreq:
+            raise ValueError("Rest frequency is required to convert the frequency axis to velocity.")
+        return _C_KMS * (1 - spec / restfreq), _C_KMS * abs(img.incr_hz) / restfreq, "km/s"
+    return spec, abs(img.incr_hz), unit
+
+
+class _MomentSums:
+    """
+    Per-pixel sums of a tile accumulated over chunks of channels.
+    The velocity is measured from a reference velocity to keep the second moment accurate.
+    """
+
+    def __init__(self, shape: tuple[int, int]):
+        self.npts = np.zeros(shape, dtype=np.int64)
+        self.s0 = np.zeros(shape)
+        self.s1 = np.zeros(shape)
+        self.s2 = np.zeros(shape)
+        self.peak = np.full(shape, -np.inf)
+        self.peak_chan = np.zeros(shape, dtype=np.int64)
+
+    def update(self, data: np.ndarray, valid: np.ndarray, dv: np.ndarray, start: int) -> None:
+        """
+        Accumulate a chunk of channels.
+
+        Args:
+            data (np.ndarray): 3D (channel, y, x) data.
+            valid (np.ndarray): Boolean array of the pixels to use with the same shape as data.
+            dv (np.ndarray): Velocity of the channels relative to the reference velocity.
+            start (int): Index of the first channel of the chunk.
+        """
+        values = np.where(valid, data, 0).astype(np.float64)
+        self.npts += np.count_nonzero(valid, axis=0)
+        self.s0 += values.sum(axis=0)
+        weighted = np.tensordot(dv, values, axes=(0, 0))
+        self.s1 += weighted
+        self.s2 += np.tensordot(dv**2, values, axes=(0, 0))
+        masked = np.where(valid, data, -np.inf)
+        chan = np.argmax(masked, axis=0)
+        peak = np.take_along_axis(masked, chan[np.newaxis], axis=0)[0]
+        better = peak > self.peak
+        self.peak[better] = peak[better]
+        self.peak_chan[better] = chan[better] + start
+
+
+def _channel_mask(
+    mask: np.ndarray, ndim: int, stokes: int, start: int, stop: int, rows: slice, cols: slice
+) -> np.ndarray:
+    """
+    Returns the mask of a chunk of channels from a 2D, (channel, y, x) or data-shaped mask.
+    """
+    if mask.ndim == 2:
+        return mask[rows, cols]
+    if mask.ndim == 3:
+        return mask[start:stop, rows, cols]
+    if mask.ndim == 4 and ndim == 4:
+        return mask[stokes, start:stop, rows, cols]
+    raise ValueError(
+        f"Mask must be 2D, 3D (channel, y, x) or have the same dimensions as the data, but got {mask.ndim}D."
+    )
+
+
+def _accumulate_tile(
+    img: Image,
+    stokes: int,
+    window: tuple[int, int, int, int],
+    dv: np.ndarray,
+    threshold: float | None,
+    mask: np.ndarray | None,
+    chunk_size: int,
+) -> _MomentSums:
+    """
+    Accumulate the sums of a tile streaming over chunks of channels.
+    """
+    left, right, bottom, top = window
+    rows, cols = slice(bottom, top), slice(left, right)
+    sums = _MomentSums((top - bottom, right - left))
+    nchan = len(dv)
+    for start in range(0, nchan, chunk_size):
+        stop = min(start + chunk_size, nchan)
+        data = img.get_channels(stokes, start, stop, window)
+        valid = np.isfinite(data)
+        if threshold is not None:
+            valid &= data >= threshold
+        if mask is not None:
+            valid &= _channel_mask(mask, img.data.ndim, stokes, start, stop, rows, cols)
+        sums.update(data, valid, dv[start:stop], start)
+    return sums
+
+
+def _moment_image(img: Image, data: np.ndarray, moment: int, unit: str | None) -> Image:
+    """
+    Returns a new 2D Image with the spatial metadata of img.
+    """
+    ret = copy.copy(img)
+    ret.imagename = f"{img.imagename}.{_MOMENT_SUFFIX[moment]}"
+    ret.data = data
+    ret.nchan = 1
+    ret.unit_data = unit
+    ret.nbytes_read = None
+    return ret
+
+
+def immoments(
+    img: Image,
+    moments: tuple[int, ...] = (0,),
+    stokes: int = 0,
+    threshold: float | None = None,
+    mask: np.ndarray | None = None,
+    restfreq: float | None = None,
+    chunk_size: int = 64,
+    tile_size: int | None = None,
+    workers: int = 1,
+) -> dict[int, Image]:
+    """
+    Calculate moment maps of a cube in a single pass over the channels.
+
+    The channels are read in chunks of `chunk_size` (from the file for lazily loaded data)
+    and the weighted sums of all requested moments are accumulated at once.
+    The supported moments are the same as CASA immoments:
+    0 (integrated intensity), 1 (intensity weighted velocity), 2 (intensity weighted velocity dispersion),
+    8 (peak intensity) and 9 (velocity of the peak).
+    NaN values are ignored and pixels without any valid channel are NaN.
+
+    Args:
+        img (Image): The Image object of the cube.
+        moments (tuple[int, ...], optional): Moments to calculate. Defaults to (0,).
+        stokes (int, optional): Stokes parameter index. Defaults to 0.
+        threshold (float | None, optional): Only the values >= threshold are used. Defaults to None.
+        mask (np.ndarray | None, optional): Only the pixels where the mask is True are used.
+            The mask is 2D (applied to all channels), 3D (channel, y, x) or has the same shape as the data. Defaults to None.
+        restfreq (float | None, optional): Rest frequency in Hz for a frequency axis. If None, `img.restfreq` is used.
+        chunk_size (int, optional): Number of channels read at a time. Defaults to 64.
+        tile_size (int | None, optional): If given, the image is processed in square tiles of this size. Defaults to None.
+        workers (int, optional): Number of threads processing the tiles in parallel. Defaults to 1.
+
+    Returns:
+        dict[int, Image]: 2D Image of each moment. The velocity is in km/s for velocity and frequency axes.
+    """
+    if img.data is None:
+        raise ValueError("Image data is None.")
+    for moment in moments:
+        if moment not in _MOMENT_SUFFIX:
+            raise ValueError(
+                f"Unsupported moment: {moment}. Supported moments are {list(_MOMENT_SUFFIX)}."
+            )
+    if chunk_size <= 0:
+        raise ValueError("chunk_size must be a positive integer.")
+    if tile_size is not None and tile_size <= 0:
+        raise ValueError("tile_size must be a positive integer.")
+    if mask is not None:
+        mask = np.asarray(mask, dtype=bool)
+    velocity, width, unit = velocity_axis(img, restfreq)
+    v_ref = velocity.mean()
+    dv = velocity - v_ref
+
+    height, full_width = img.data.shape[-2:]
+    if tile_size is None:
+        windows = [(0, full_width, 0, height)]
+    else:
+        windows = [
+            (x, min(x + tile_size, full_width), y, min(y + tile_size, height))
+            for y in range(0, height, tile_size)
+            for x in range(0, full_width, tile_size)
+        ]
+
+    def work(window):
+        return window, _accumulate_tile(img, stokes, window, dv, threshold, mask, chunk_size)
+
+    maps = {moment: np.full((height, full_width), np.nan) for moment in moments}
+    with ThreadPoolExecutor(max_workers=max(workers, 1)) as executor:
+        for (left, right, bottom, top), sums in executor.map(work, windows):
+            empty = sums.npts == 0
+            with np.errstate(divide="ignore", invalid="ignore"):
+                mean = sums.s1 / sums.s0
+                results = {
+                    0: sums.s0 * width,
+                    1: mean + v_ref,
+                    2: np.sqrt(np.maximum(sums.s2 / sums.s0 - mean**2, 0)),
+                    8: sums.peak,
+                    9: velocity[sums.peak_chan],
+                }
+            for moment in moments:
+                result = results[moment]
+                result[empty] = np.nan
+                maps[moment][bottom:top, left:right] = result
+
+    units = {
+        0: f"{img.unit_data}.{unit}" if img.unit_data else unit,
+        1: unit,
+        2: unit,
+        8: img.unit_data,
+        9: unit,
+    }
+    return {moment: _moment_image(img, maps[moment], moment, units[moment]) for moment in moments}
@@ -0,0 +1,237 @@
+import queue
+import subprocess
+import threading
+import numpy as np
+import matplotlib
+import matplotlib.pyplot as plt
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from PIL import Image as PILImage
+from PIL import GifImagePlugin
+from .Image import Image
+from .imshow import imshow, _decimated_plane
+from .channel_map import _channel_labels
+
+
+class _GifStream:
+    """
+    Animated GIF written frame by frame.
+    All frames are quantized to one palette made of the given colors (e.g. of the colormap)
+    and the colors of the first frame, so no frame is kept in memory.
+    """
+
+    def __init__(self, filename: str, fps: float, colors: np.ndarray, loop: int = 0):
+        self.file = open(filename, "wb")
+        self.duration = int(round(1000 / fps))
+        self.colors = colors
+        self.loop = loop
+        self.palette = None
+
+    def write(self, rgba: np.ndarray) -> None:
+        frame = PILImage.fromarray(np.ascontiguousarray(rgba[..., :3]))
+        first = self.palette is None
+        if first:
+            # Colors of the static parts (axes, labels, ...) and the given colors
+            static = frame.quantize(256 - len(self.colors)).getpalette()
+            self.palette = PILImage.new("P", (1, 1))
+            self.palette.putpalette(static + self.colors.ravel().tolist())
+        frame = frame.quantize(palette=self.palette, dither=PILImage.Dither.NONE)
+        if first:
+            header, _ = GifImagePlugin.getheader(frame, info={"loop": self.loop, "duration": self.duration})
+            for block in header:
+                self.file.write(block)
+        for block in GifImagePlugin.getdata(frame, duration=self.duration):
+            self.file.write(block)
+
+    def close(self) -> None:
+        self.file.write(b";")
+        self.file.close()
+
+
+class _FFMpegStream:
+    """
+    Movie encoded by ffmpeg from raw RGBA frames written to its standard input.
+    """
+
+    def __init__(self, filename: str, fps: float, size: tuple[int, int]):
+        command = [
+            matplotlib.rcParams["animation.ffmpeg_path"],
+            "-y",
+            "-loglevel", "error",
+            "-f", "rawvideo",
+            "-pix_fmt", "rgba",
+            "-s", f"{size[0]}x{size[1]}",
+            "-r", str(fps),
+            "-i", "pipe:",
+            # yuv420p needs even width and height
+            "-vf", "pad=ceil(iw/2)*2:ceil(ih/2)*2",
+            "-pix_fmt", "yuv420p",
+            filename,
+        ]
+        try:
+            self.proc = subprocess.Popen(command, stdin=subprocess.PIPE)
+        except FileNotFoundError:
+            raise RuntimeError(
+                "ffmpeg is not found. Install it (or set rcParams['animation.ffmpeg_path']), or save as GIF."
+            ) from None
+
+    def write(self, rgba: np.ndarray) -> None:
+        self.proc.stdin.write(np.ascontiguousarray(rgba).tobytes())
+
+    def close(self) -> None:
+        self.proc.stdin.close()
+        if self.proc.wait() != 0:
+            raise RuntimeError(f"ffmpeg exited with code {self.proc.returncode}.")
+
+
+def _put(planes: queue.Queue, item: tuple, stop: threading.Event) -> bool:
+    """
+    Puts the item in the queue, waiting while it is full until `stop` is set.
+    Returns False if stopped before the item is put.
+    """
+    while not stop.is_set():
+        try:
+            planes.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def _prefetch(read, chans: list[int], planes: queue.Queue, stop: threading.Event) -> None:
+    """
+    Reads the planes of the channels in order and puts them in the queue.
+    The queue is bounded, so at most its size of planes are read ahead.
+    """
+    try:
+        for chan in chans:
+            if not _put(planes, (chan, read(chan), None), stop):
+                return
+    except Exception as error:
+        _put(planes, (None, None, error), stop)
+
+
+def save_movie(
+    img: Image,
+    filename: str,
+    stokes: int = 0,
+    chans: list[int] | None = None,
+    fps: float = 10,
+    dpi: float = 100,
+    figsize: tuple[float, float] | None = None,
+    prefetch: int = 4,
+    restfreq: float | None = None,
+    label_color: str = "white",
+    loop: int = 0,
+    **kwargs,
+) -> str:
+    """
+    Save a movie sweeping the channels of a cube.
+
+    The figure is drawn once with `imshow` (with a common color scale for all channels), and each frame
+    only redraws the image, the channel label and the overlays on the saved background (blitting).
+    The planes of the next channels are read in a background thread while the current frame is encoded,
+    and each frame is streamed to the file, so the memory does not grow with the number of channels.
+    GIF is written directly. Other formats (e.g. mp4) are encoded by ffmpeg.
+
+    Args:
+        img (Image): The Image object of the cube.
+        filename (str): Output file name. The format is chosen by the extension.
+        stokes (int, optional): Stokes parameter index. Defaults to 0.
+        chans (list[int] | None, optional): Channel indices of the frames. If None, all channels.
+        fps (float, optional): Frames per second. Defaults to 10.
+        dpi (float, optional): Resolution of the frames. Defaults to 100.
+        figsize (tuple[float, float] | None, optional): Size of the figure. If None, the default of matplotlib.
+        prefetch (int, optional): Number of planes read ahead. Defaults to 4.
+        restfreq (float | None, optional): Rest frequency in Hz for the velocity labels of a frequency axis.
+        label_color (str, optional): Color of the channel label. Defaults to 'white'.
+        loop (int, optional): Number of loops of a GIF (0 for forever). Defaults to 0.
+        **kwargs: Keyword arguments of `imshow` (e.g. cmap, vmin, vmax, width, height, decimate).
+
+    Returns:
+        str: The file name.
+    """
+    if img.data is None:
+        raise ValueError("Image data is None.")
+    if fps <= 0:
+        raise ValueError("fps must be positive.")
+    if prefetch <= 0:
+        raise ValueError("prefetch must be a positive integer.")
+    nchan = img.data.shape[-3] if img.data.ndim >= 3 else 1
+    if chans is None:
+        chans = range(nchan)
+    chans = [int(c) for c in chans]
+    if not chans:
+        raise ValueError("No channel to save.")
+    for chan in chans:
+        img._check_stokes_chan(stokes, chan)
+    labels = _channel_labels(img, restfreq)
+    kwargs.pop("chan", None)
+
+    fig, ax = plt.subplots(figsize=figsize, dpi=dpi)
+    try:
+        im = imshow(ax, img, stokes=stokes, chan=chans[0], **kwargs)
+        label = ax.text(0.05, 0.95, "", transform=ax.transAxes, color=label_color, va="top", ha="left")
+        # Draw everything but the animated artists once
+        im.set_animated(True)
+        label.set_animated(True)
+        canvas = FigureCanvasAgg(fig)
+        canvas.draw()
+        background = canvas.copy_from_bbox(ax.bbox)
+        # Drawn again on top of the image in each frame
+        overlays = [*ax.patches, *ax.collections, label, *ax.spines.values()]
+
+        # The planes must have the same shape as the first one drawn by imshow
+        decimate = kwargs.get("decimate")
+        size = im.get_array().shape
+        # The size of the axes is measured here, not in the reader thread
+        max_pixels = kwargs.get("max_pixels")
+        if decimate and max_pixels is None:
+            bbox = ax.get_window_extent()
+            max_pixels = (max(int(bbox.width), 1), max(int(bbox.height), 1))
+
+        def read(chan):
+            if decimate:
+                decimated = _decimated_plane(
+                    ax,
+                    img,
+                    stokes,
+                    chan,
+                    kwargs.get("width"),
+                    kwargs.get("height"),
+                    "mean" if decimate is True else decimate,
+                    max_pixels,
+                )
+                if decimated is not None and decimated[0].shape == size:
+                    return decimated[0]
+            return img.get_two_dim_data(stokes=stokes, chan=chan)
+
+        width, height = canvas.get_width_height()
+        if filename.lower().endswith(".gif"):
+            colors = (im.cmap(np.linspace(0, 1, 192))[:, :3] * 255).round().astype(np.uint8)
+            writer = _GifStream(filename, fps, colors, loop)
+        else:
+            writer = _FFMpegStream(filename, fps, (width, height))
+
+        planes = queue.Queue(maxsize=prefetch)
+        stop = threading.Event()
+        reader = threading.Thread(target=_prefetch, args=(read, chans, planes, stop), daemon=True)
+        reader.start()
+        try:
+            for _ in chans:
+                chan, plane, error = planes.get()
+                if error is not None:
+                    raise error
+                canvas.restore_region(background)
+                im.set_data(plane)
+                label.set_text(labels[chan])
+                ax.draw_artist(im)
+                for artist in overlays:
+                    ax.draw_artist(artist)
+                writer.write(np.asarray(canvas.buffer_rgba()))
+        finally:
+            stop.set()
+            reader.join()
+            writer.close()
+    finally:
+        plt.close(fig)
+    return filename
@@ -0,0 +1,132 @@
+import copy
+import os
+from collections.abc import Callable, Sequence
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+import numpy as np
+from .Image import Image
+
+# State of a worker process set by _init_worker
+_worker: dict = {}
+
+
+def _attach(name: str) -> shared_memory.SharedMemory:
+    """
+    Attach to an existing shared memory block. The block is unlinked by the parent process.
+    """
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        # Python < 3.13 registers the block to the resource tracker shared with the parent,
+        # which is unregistered when the parent unlinks it
+        return shared_memory.SharedMemory(name=name)
+
+
+def _plane_image(template: Image, data: np.ndarray, chan: int) -> Image:
+    """
+    Returns an Image of the channel `chan` with the 2D data.
+    """
+    plane = copy.copy(template)
+    plane.data = data
+    plane.nchan = 1
+    if template.freq0 is not None and template.incr_hz is not None:
+        plane.freq0 = template.freq0 + chan * template.incr_hz
+    return plane
+
+
+def _init_worker(name, shape, dtype, template, func, args, kwargs) -> None:
+    shm = _attach(name)
+    cube = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+    cube.flags.writeable = False
+    _worker.update(shm=shm, cube=cube, template=template, func=func, args=args, kwargs=kwargs)
+
+
+def _run_channel(task: tuple[int, int]):
+    index, chan = task
+    plane = _plane_image(_worker["template"], _worker["cube"][index], chan)
+    return _worker["func"](plane, *_worker["args"], **_worker["kwargs"])
+
+
+def map_channels(
+    img: Image,
+    func: Callable,
+    *args,
+    workers: int | None = None,
+    stokes: int = 0,
+    chans: Sequence[int] | None = None,
+    chunk_size: int = 64,
+    **kwargs,
+) -> list:
+    """
+    Apply a per-plane function to the channels of a cube in parallel processes.
+
+    The selected channels of the Stokes are copied once into a `multiprocessing.shared_memory` block
+    (read in chunks of `chunk_size` channels for lazily loaded data). Each worker receives the function
+    and the metadata once, and calls `func(plane, *args, **kwargs)` for its channels, where `plane`
+    is an Image of the single channel whose data is a read-only 2D view of the shared block (no copy).
+    Any function taking an Image of a plane, e.g. `imstat`, `detectpeak`, `radial_profile` or `radial_cut`, can be used.
+    The function and its arguments must be picklable (e.g. a module-level function or `functools.partial`).
+
+    Args:
+        img (Image): The Image object of the cube.
+        func (Callable): The function applied to each plane.
+        *args: Positional arguments passed to func after the plane.
+        workers (int | None, optional): Number of processes. If None, the number of CPUs.
+            If 1, the channels are processed in this process without shared memory.
+        stokes (int, optional): Stokes parameter index. Defaults to 0.
+        chans (Sequence[int] | None, optional): Channel indices to process. If None, all channels.
+        chunk_size (int, optional): Number of channels read at a time when copying the data. Defaults to 64.
+        **kwargs: Keyword arguments passed to func.
+
+    Returns:
+        list: The results of func for each channel in the order of chans.
+    """
+    if img.data is None:
+        raise ValueError("Image data is None.")
+    if chunk_size <= 0:
+        raise ValueError("chunk_size must be a positive integer.")
+    nchan = img.data.shape[-3] if img.data.ndim >= 3 else 1
+    if chans is None:
+        chans = range(nchan)
+    chans = [int(c) for c in chans]
+    for chan in chans:
+        img._check_stokes_chan(stokes, chan)
+    if workers is None:
+        workers = os.cpu_count() or 1
+    template = copy.copy(img)
+    template.data = None
+    template.nbytes_read = None
+
+    if workers == 1:
+        results = []
+        for chan in chans:
+            data = img.get_channels(stokes, chan, chan + 1)[0]
+            results.append(func(_plane_image(template, data, chan), *args, **kwargs))
+        return results
+
+    height, width = img.data.shape[-2:]
+    shape = (len(chans), height, width)
+    # Native byte order (FITS data is big-endian)
+    dtype = img.data.dtype.newbyteorder("=")
+    shm = shared_memory.SharedMemory(create=True, size=max(int(np.prod(shape)) * dtype.itemsize, 1))
+    try:
+        cube = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+        if chans == list(range(nchan)):
+            for start in range(0, nchan, chunk_size):
+                stop = min(start + chunk_size, nchan)
+                cube[start:stop] = img.get_channels(stokes, start, stop)
+        else:
+            for index, chan in enumerate(chans):
+                cube[index] = img.get_channels(stokes, chan, chan + 1)[0]
+        del cube
+        with ProcessPoolExecutor(
+            max_workers=min(workers, len(chans)) or 1,
+            initializer=_init_worker,
+            initargs=(shm.name, shape, dtype, template, func, args, kwargs),
+        ) as executor:
+            chunksize = max(len(chans) // (4 * workers), 1)
+            results = list(executor.map(_run_channel, enumerate(chans), chunksize=chunksize))
+    finally:
+        shm.close()
+        shm.unlink()
+    return results
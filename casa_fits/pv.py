@@ -0,0 +1,184 @@
+import numpy as np
+from scipy import sparse
+from .Image import Image
+from .moments import velocity_axis
+from .utilities import bilinear_operator
+
+
+class PVDiagram:
+    """
+    Position-velocity diagram of a cube along a path.
+
+    Attributes:
+        imagename (str | None): Name of the diagram.
+        data (np.ndarray): The data with the shape (nchan, noffset).
+        offset (np.ndarray): Offset along the path from its first vertex in arcsec.
+        velocity (np.ndarray): Velocity (or the spectral value) of each channel.
+        unit_offset (str): Unit of the offset.
+        unit_velocity (str): Unit of the velocity.
+        unit_data (str | None): Unit of the data.
+        beam (tuple[float, float, float] | None): Beam of the cube (major, minor, angle).
+    """
+
+    def __init__(
+        self,
+        data: np.ndarray,
+        offset: np.ndarray,
+        velocity: np.ndarray,
+        unit_velocity: str,
+        unit_data: str | None = None,
+        imagename: str | None = None,
+        beam: tuple[float, float, float] | None = None,
+    ):
+        self.imagename = imagename
+        self.data = data
+        self.offset = offset
+        self.velocity = velocity
+        self.unit_offset = "arcsec"
+        self.unit_velocity = unit_velocity
+        self.unit_data = unit_data
+        self.beam = beam
+
+    @property
+    def extent(self) -> tuple[float, float, float, float]:
+        """
+        Extent (left, right, bottom, top) of the pixel edges for `matplotlib.axes.Axes.imshow` with origin='lower'.
+        """
+        d_offset = self.offset[1] - self.offset[0] if len(self.offset) > 1 else 1.0
+        d_velocity = self.velocity[1] - self.velocity[0] if len(self.velocity) > 1 else 1.0
+        return (
+            self.offset[0] - d_offset / 2,
+            self.offset[-1] + d_offset / 2,
+            self.velocity[0] - d_velocity / 2,
+            self.velocity[-1] + d_velocity / 2,
+        )
+
+
+def _path_samples(
+    x: np.ndarray, y: np.ndarray, scale_x: float, scale_y: float, step: float, width: float
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Sample points along a polyline and across its width.
+
+    Args:
+        x (np.ndarray): X pixel coordinates of the vertices.
+        y (np.ndarray): Y pixel coordinates of the vertices.
+        scale_x (float): Size of a pixel along x in arcsec.
+        scale_y (float): Size of a pixel along y in arcsec.
+        step (float): Sampling interval in arcsec.
+        width (float): Width of the path in arcsec.
+
+    Returns:
+        tuple: The offsets along the path in arcsec with the shape (noffset,),
+            and the x and y pixel coordinates of the samples with the shape (noffset, nwidth).
+    """
+    # Vertices in arcsec
+    vx = x * scale_x
+    vy = y * scale_y
+    seg_len = np.hypot(np.diff(vx), np.diff(vy))
+    cum_len = np.concatenate([[0], np.cumsum(seg_len)])
+    offset = np.arange(0, cum_len[-1] + step / 2, step)
+    # Segment of each sample
+    seg = np.clip(np.searchsorted(cum_len, offset, side="right") - 1, 0, len(seg_len) - 1)
+    length = np.where(seg_len[seg] > 0, seg_len[seg], 1)
+    frac = (offset - cum_len[seg]) / length
+    px = vx[seg] + frac * (vx[seg + 1] - vx[seg])
+    py = vy[seg] + frac * (vy[seg + 1] - vy[seg])
+    # Unit normal of the segment
+    nx = -(vy[seg + 1] - vy[seg]) / length
+    ny = (vx[seg + 1] - vx[seg]) / length
+    nwidth = max(int(np.ceil(width / step)), 1)
+    across = (np.arange(nwidth) - (nwidth - 1) / 2) * (width / nwidth if width > 0 else 0)
+    sx = (px[:, np.newaxis] + nx[:, np.newaxis] * across) / scale_x
+    sy = (py[:, np.newaxis] + ny[:, np.newaxis] * across) / scale_y
+    return offset, sx, sy
+
+
+def pv_diagram(
+    img: Image,
+    x: np.ndarray,
+    y: np.ndarray,
+    width: float = 0.0,
+    step: float | None = None,
+    stokes: int = 0,
+    restfreq: float | None = None,
+    chunk_size: int = 64,
+) -> PVDiagram:
+    """
+    Extract a position-velocity diagram along a polyline.
+
+    The sample points along the path (and across its width) are computed once and combined into
+    a sparse bilinear interpolation operator averaging across the width. All channels of a chunk
+    are interpolated with a single sparse matrix product, and only the window around the path is read.
+
+    Args:
+        img (Image): The Image object of the cube.
+        x (np.ndarray): X pixel coordinates of the vertices of the polyline (at least 2).
+        y (np.ndarray): Y pixel coordinates of the vertices of the polyline.
+        width (float, optional): Width of the path in arcsec. The data is averaged across the width. Defaults to 0.0.
+        step (float | None, optional): Sampling interval along the path in arcsec. If None, the pixel size along x.
+        stokes (int, optional): Stokes parameter index. Defaults to 0.
+        restfreq (float | None, optional): Rest frequency in Hz for a frequency axis. If None, `img.restfreq` is used.
+        chunk_size (int, optional): Number of channels read at a time. Defaults to 64.
+
+    Returns:
+        PVDiagram: The diagram. Samples outside the image are NaN.
+    """
+    if img.data is None:
+        raise ValueError("Image data is None.")
+    if img.incr_x is None or img.incr_y is None:
+        raise ValueError("Image increment x or y is None.")
+    if chunk_size <= 0:
+        raise ValueError("chunk_size must be a positive integer.")
+    x = np.asarray(x, dtype=float).ravel()
+    y = np.asarray(y, dtype=float).ravel()
+    if x.size < 2 or x.size != y.size:
+        raise ValueError("The polyline must have at least 2 vertices with the same number of x and y.")
+    img.convert_axes_unit("arcsec")
+    scale_x, scale_y = abs(img.incr_x), abs(img.incr_y)
+    if step is None:
+        step = scale_x
+    if step <= 0:
+        raise ValueError("step must be positive.")
+    velocity, _, unit_velocity = velocity_axis(img, restfreq)
+
+    offset, sx, sy = _path_samples(x, y, scale_x, scale_y, step, width)
+    noffset, nwidth = sx.shape
+
+    # Window covering the samples
+    height, full_width = img.data.shape[-2:]
+    left = int(np.clip(np.floor(sx.min()), 0, full_width - 1))
+    right = int(np.clip(np.floor(sx.max()) + 2, left + 1, full_width))
+    bottom = int(np.clip(np.floor(sy.min()), 0, height - 1))
+    top = int(np.clip(np.floor(sy.max()) + 2, bottom + 1, height))
+    operator, valid = bilinear_operator((top - bottom, right - left), sx - left, sy - bottom)
+    # Samples outside the image must not be taken from the edge of the window
+    inside = (0 <= sx) & (sx <= full_width - 1) & (0 <= sy) & (sy <= height - 1)
+    valid &= inside.ravel()
+    # Average across the width
+    count = valid.reshape(noffset, nwidth).sum(axis=1)
+    weights = np.where(valid, 1 / np.repeat(np.maximum(count, 1), nwidth), 0)
+    rows = np.repeat(np.arange(noffset), nwidth)
+    average = sparse.csr_matrix(
+        (weights, (rows, np.arange(rows.size))), shape=(noffset, rows.size)
+    ) @ operator
+    average.eliminate_zeros()
+
+    nchan = len(velocity)
+    data = np.empty((nchan, noffset))
+    for start in range(0, nchan, chunk_size):
+        stop = min(start + chunk_size, nchan)
+        chunk = img.get_channels(stokes, start, stop, (left, right, bottom, top))
+        flat = chunk.reshape(stop - start, -1).T.astype(np.float64)
+        data[start:stop] = (average @ flat).T
+    data[:, count == 0] = np.nan
+
+    return PVDiagram(
+        data,
+        offset,
+        velocity,
+        unit_velocity,
+        img.unit_data,
+        f"{img.imagename}.pv" if img.imagename else None,
+        img.beam,
+    )
@@ -1,18 +1,27 @@
-from math import radians, cos, sin, ceil, sqrt
+from math import ceil
 import numpy as np
 from .Image import Image
-from .utilities import downsample_data
+from .geometry import get_cut_geometry
+from .utilities import _binned_stats
 
 
 def radial_cut(
-    img: Image, azimuth: float, beam_factor: float = 0.5, stokes: int = 0, chan: int = 0
+    img: Image,
+    azimuth: float | np.ndarray,
+    beam_factor: float = 0.5,
+    stokes: int = 0,
+    chan: int = 0,
 ) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
     """
     Radial line cut of the image along the specified azimuth angle from the center.
 
+    The cut proceeds from the center by steps of the sampling size. At each step,
+    the pixels within the rectangle (sampling size along the cut and the beam size across it) are averaged.
+    The assignment of the pixels to the steps is computed once for all azimuths and cached.
+
     Args:
         img (Image): The Image object.
-        azimuth (float): The azimuth angle in degrees.
+        azimuth (float | np.ndarray): The azimuth angle in degrees, or an array of azimuth angles.
         beam_factor (float, optional): Sampling size based on the beam size. Defaults to 0.5.
         stokes (int, optional): Stokes parameter index. Defaults to 0.
         chan (int, optional): Channel index. Defaults to 0.
@@ -20,14 +29,17 @@ def radial_cut(
     Returns:
         tuple: A tuple of three numpy arrays:
             - The radial distance from the center.
-            - The mean intensity.
-            - The standard deviation of the intensity.
+            - The mean intensity. NaN if there is no pixel in the step.
+            - The standard deviation of the intensity. NaN if there is no pixel in the step.
+            If an array of azimuths is given, the mean and standard deviation have the shape (nazimuth, nsteps),
+            where nsteps is the largest number of steps. Steps beyond the edge of the image are NaN.
     """
     # Calculate the center of the image
-    if img.width is None or img.height is None:
-        raise ValueError("Image width or height is None.")
-    center_x = img.width // 2
-    center_y = img.height // 2
+    if img.data is None:
+        raise ValueError("Image data is None.")
+    height, width = img.data.shape[-2:]
+    center_x = width // 2
+    center_y = height // 2
 
     # Calculate the beam size
     if img.beam is None:
@@ -42,78 +54,27 @@ def radial_cut(
     beam_size = max(beam_x, beam_y)
     sampling_size = ceil(beam_size * beam_factor)
 
-    # Convert azimuth angle to radians
-    # azimuth is measured from the north
-    azimuth_rad = radians(azimuth - 270)
+    azimuths = np.atleast_1d(np.asarray(azimuth, dtype=float))
+    geom = get_cut_geometry(
+        (height, width),
+        (center_x, center_y),
+        tuple(azimuths.tolist()),
+        sampling_size,
+        beam_size,
+    )
 
     data: np.ndarray = img.get_two_dim_data(stokes=stokes, chan=chan)
-    # data = downsample_data(data, sampling_size)
-
-    # Initialize the line cut
-    line_r = []
-    line_mean = []
-    line_std = []
-
-    # Define the unit direction vector for the given azimuth
-    direction_x = cos(azimuth_rad)
-    direction_y = sin(azimuth_rad)
-
-    # Loop over points along the line
-    step = 0
-    search_range = int(sqrt(sampling_size**2 + sampling_size**2) / 2 + 1)
-    while True:
-        # Calculate the current position
-        x = int(center_x + step * direction_x)
-        y = int(center_y + step * direction_y)
-        rect_center = np.array([x, y])
-
-        if x < 0 or x >= img.width or y < 0 or y >= img.height:
-            break
-
-        line_r.append(step * np.abs(img.incr_x))
-
-        v_para = np.array([direction_x, direction_y]) * sampling_size * 0.5
-        v_perp = np.array([-direction_y, direction_x]) * beam_size * 0.5
-        verts = [
-            rect_center + v_para + v_perp,
-            rect_center + v_para - v_perp,
-            rect_center - v_para - v_perp,
-            rect_center - v_para + v_perp,
-        ]
-        edges = [
-            verts[1] - verts[0],
-            verts[2] - verts[1],
-            verts[3] - verts[2],
-            verts[0] - verts[3],
-        ]
-
-        def cross(a, b):
-            return a[0] * b[1] - a[1] * b[0]
-
-        # Append the pixel value to the line
-        sample = []
-        # if step == 0: 0 else -search_range
-        for i in range(-search_range, search_range + 1):
-            for j in range(-search_range, search_range + 1):
-                px = x + i
-                py = y + j
-                inside = True
-                for k in range(4):
-                    edge = edges[k]
-                    vp = np.array([px, py]) - verts[k]
-                    if cross(edge, vp) > 0:
-                        inside = False
-                        break
-                if inside and 0 <= px < img.width and 0 <= py < img.height:
-                    sample.append(data[py, px])
-
-        if sample:
-            line_mean.append(np.mean(sample))
-            line_std.append(np.std(sample))
-        else:
-            line_mean.append(None)
-            line_std.append(None)
-
-        step += sampling_size
 
-    return np.array(line_r), np.array(line_mean), np.array(line_std)
+    # Mean and standard deviation of each (azimuth, step) cell. A NaN pixel makes its cell NaN.
+    ncell = len(azimuths) * geom.nsteps_max
+    values = data.ravel()[geom.pixel_index]
+    line_mean, line_std, _ = _binned_stats(
+        values[np.newaxis], geom.cell_index, ncell, empty=np.nan, ignore_nan=False
+    )
+    line_mean = line_mean.reshape(len(azimuths), geom.nsteps_max)
+    line_std = line_std.reshape(len(azimuths), geom.nsteps_max)
+    line_r = np.arange(geom.nsteps_max) * sampling_size * np.abs(img.incr_x)
+
+    if np.ndim(azimuth) == 0:
+        return line_r, line_mean[0], line_std[0]
+    return line_r, line_mean, line_std
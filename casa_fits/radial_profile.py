@@ -1,7 +1,130 @@
-from math import sqrt, ceil, cos, radians, sin
 import numpy as np
 from .Image import Image
-from .utilities import downsample_data
+from .geometry import AnnulusWeights, get_annulus_weights, get_disk_geometry
+from .utilities import _binned_stats, downsample_data
+
+
+def _radial_bins(
+    img: Image,
+    azimuth: tuple | None,
+    sample_size: int,
+    inc: float,
+    PA: float,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Returns the radial bins and the pixels of the downsampled image used for the profile.
+
+    Returns:
+        tuple: A tuple of three numpy arrays:
+            - The radial distance of the bins from the center.
+            - The boolean mask of the pixels in the azimuth range and within the bins.
+            - The bin index of each selected pixel.
+    """
+    if img.data is None:
+        raise ValueError("Image data is None.")
+    height, width = img.data.shape[-2:]
+    # Calculate the center of the image
+    center_x = width // 2
+    center_y = height // 2
+
+    # Calculate the beam size
+    if img.beam is None:
+        raise ValueError("The image does not have a beam size.")
+    if img.incr_x is None or img.incr_y is None:
+        raise ValueError("Image increment x or y is None.")
+    img.convert_axes_unit('arcsec')
+
+    # Convert azimuth angle to radians
+    # azimuth is measured from the north
+    if azimuth is None:
+        azimuth = (0, 359)
+    azimuth = ((azimuth[0] + 90) % 360, (azimuth[1] + 90) % 360)
+
+    # Initialize the line cut
+    line_r = np.arange(0, min(center_x, center_y), sample_size, dtype=float)
+    nbins = len(line_r)
+
+    # Shape and center of the downsampled data (see `downsample_data`)
+    height_new, width_new = height // sample_size, width // sample_size
+    center_x_new = width_new // 2
+    center_y_new = height_new // 2
+
+    # Deprojected radius and azimuth (cached for the same geometry)
+    geom = get_disk_geometry(
+        (height_new, width_new), (center_x_new, center_y_new), inc, PA, abs(img.incr_x), sample_size
+    )
+    rad = geom.theta
+    if azimuth[0] < azimuth[1]:
+        selected = (azimuth[0] <= rad) & (rad <= azimuth[1])
+    else:
+        selected = (azimuth[0] <= rad) | (rad <= azimuth[1])
+    selected &= geom.bin_index < nbins
+
+    return line_r * abs(img.incr_x), selected, geom.bin_index[selected]
+
+
+def _exact_weights(
+    img: Image,
+    azimuth: tuple | None,
+    sample_size: int,
+    inc: float,
+    PA: float,
+) -> tuple[np.ndarray, AnnulusWeights]:
+    """
+    Returns the radial bins and the exact fractional weights of the pixels of the full resolution image.
+    The annulus k covers [k * sample_size, (k + 1) * sample_size) pixels in the deprojected frame.
+    If azimuth is None, the annuli are the whole circles.
+
+    Returns:
+        tuple: The radial distance of the bins from the center and the weights.
+    """
+    if img.data is None:
+        raise ValueError("Image data is None.")
+    height, width = img.data.shape[-2:]
+    center_x = width // 2
+    center_y = height // 2
+    if img.beam is None:
+        raise ValueError("The image does not have a beam size.")
+    if img.incr_x is None or img.incr_y is None:
+        raise ValueError("Image increment x or y is None.")
+    img.convert_axes_unit('arcsec')
+
+    line_r = np.arange(0, min(center_x, center_y), sample_size, dtype=float)
+    r_edges = np.append(line_r, line_r[-1] + sample_size)
+    theta_ranges = None
+    if azimuth is not None:
+        # azimuth is measured from the north
+        start = (azimuth[0] + 90) % 360
+        span = azimuth[1] - azimuth[0]
+        if span < 0:
+            span += 360
+        theta_ranges = ((start, start + span),)
+    weights = get_annulus_weights(
+        (height, width), (center_x, center_y), inc, PA, tuple(r_edges), theta_ranges
+    )
+    return line_r * abs(img.incr_x), weights
+
+
+def _exact_stats(
+    weights: AnnulusWeights, data: np.ndarray
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Weighted mean, standard deviation and sum of the weights of the finite pixels in each bin of each plane.
+    Empty bins are 0 and bins with only NaN values are NaN.
+
+    Args:
+        weights (AnnulusWeights): The exact weights.
+        data (np.ndarray): The 3D (plane, y, x) data.
+
+    Returns:
+        tuple: Mean, standard deviation and sum of the weights with the shape (plane, nbins).
+    """
+    mean, std, wsum = (a[..., 0] for a in weights.stats(data.reshape(data.shape[0], -1)))
+    empty = weights.area[:, 0] == 0
+    mean[:, empty] = 0
+    std[:, empty] = 0
+    return mean, std, wsum
+
 
 def radial_profile(
     img: Image,
@@ -11,10 +134,14 @@ def radial_profile(
     PA: float = 0.0,          # position angle in degrees (east of north)
     stokes: int = 0,         # Stokes parameter index
     chan: int = 0,           # Channel index
+    exact: bool = False,
 ) -> tuple:
     """
     Extract a radial profile from an image.
 
+    The pixels in each annulus are averaged. For profiles of the interpolated image on a polar grid,
+    which is faster for many channels but weights the pixels differently, see `reproject_polar`.
+
     Args:
         img (Image): The Image object.
         azimuth (tuple): The azimuth range angle in degrees. If None, all azimuth angles are considered.
@@ -23,6 +150,9 @@ def radial_profile(
         PA (float, optional): The position angle in degrees. Defaults to 0.0.
         stokes (int, optional): Stokes parameter index. Defaults to 0.
         chan (int, optional): Channel index. Defaults to 0.
+        exact (bool, optional): If True, the data is not downsampled and each pixel is weighted by
+            the exact fraction of its area within the annulus of width `sample_size` and the azimuth range.
+            The weights are cached for the geometry. Defaults to False.
 
     Returns:
         tuple: A tuple of three numpy arrays:
@@ -30,86 +160,85 @@ def radial_profile(
             - The mean intensity.
             - The standard deviation of the intensity.
     """
-    if img.width is None or img.height is None:
-        raise ValueError("Image width or height is None.")
-    # Calculate the center of the image
-    center_x = img.width // 2
-    center_y = img.height // 2
+    if exact:
+        line_r, weights = _exact_weights(img, azimuth, sample_size, inc, PA)
+        line_mean, line_std, _ = _exact_stats(weights, img.get_two_dim_data(stokes, chan)[np.newaxis])
+        return line_r, line_mean[0], line_std[0]
 
-    # Calculate the beam size
-    if img.beam is None:
-        raise ValueError("The image does not have a beam size.")
-    if img.incr_x is None or img.incr_y is None:
-        raise ValueError("Image increment x or y is None.")
-    img.convert_axes_unit('arcsec')
-    beam_maj = img.beam[0] / np.abs(img.incr_x)
-    beam_min = img.beam[1] / np.abs(img.incr_y)
+    line_r, selected, idx = _radial_bins(img, azimuth, sample_size, inc, PA)
 
-    # Determine the larger beam size (to define the sampling step and width)
-    beam_size = max(beam_maj, beam_min)
-    # sampling_size = ceil(beam_size * beam_factor)
+    # extract the 2D data
+    data: np.ndarray = img.get_two_dim_data(stokes, chan)
 
-    # Convert azimuth angle to radians
-    # azimuth is measured from the north
-    if azimuth is None:
-        azimuth = (0, 359)
-    azimuth = ((azimuth[0] + 90) % 360, (azimuth[1] + 90) % 360)
+    # Downsample the data
+    data = downsample_data(data, sample_size)
 
-    def is_in_azimuth_range(angle, azimuth):
-        if azimuth[0] < azimuth[1]:
-            return azimuth[0] <= angle <= azimuth[1]
-        else:
-            return azimuth[0] <= angle or angle <= azimuth[1]
+    # Statistics of each bin (NaN values are ignored)
+    line_mean, line_std, _ = _binned_stats(data[np.newaxis, selected], idx, len(line_r), empty=0)
 
-    # Initialize the line cut
-    line_r = np.arange(0, min(center_x, center_y), sample_size, dtype=float)
-    line_mean = []
-    line_std = []
-    sample = [[] for _ in range(len(line_r))]
+    return line_r, line_mean[0], line_std[0]
 
-    # Convert inclination and PA to radians
-    inc_rad = radians(inc)
-    PA_rad = radians(PA)
 
-    # extract the 2D data
-    # get the dimensions of the image
-    data: np.ndarray = img.get_two_dim_data(stokes, chan)
+def radial_profile_cube(
+    img: Image,
+    azimuth: tuple | None = None,
+    sample_size: int = 5,
+    inc: float = 0.0,
+    PA: float = 0.0,
+    stokes: int = 0,
+    chunk_size: int = 64,
+    exact: bool = False,
+) -> tuple:
+    """
+    Extract radial profiles of all channels of an image.
 
-    # Downsample the data
-    data = downsample_data(data, sample_size)
-    center_x_new = data.shape[1] // 2
-    center_y_new = data.shape[0] // 2
-
-    for i in range(len(data)):
-        for j in range(len(data[0])):
-            # Shift to new center
-            dx = j - center_x_new
-            dy = i - center_y_new
-
-            # Rotate by -PA
-            x_rot = dx * cos(-PA_rad) - dy * sin(-PA_rad)
-            y_rot = dx * sin(-PA_rad) + dy * cos(-PA_rad)
-
-            # Deproject y
-            y_deproj = y_rot / cos(inc_rad)
-
-            # Deprojected radius
-            r = sqrt(x_rot**2 + y_deproj**2)
-
-            rad = np.degrees(np.arctan2(y_deproj, x_rot) % (2 * np.pi))
-            if is_in_azimuth_range(rad, azimuth):
-                idx = int(r)
-                if idx >= len(line_r):
-                    continue
-                sample[idx].append(data[i, j])
-
-    for i, s in enumerate(sample):
-        # print(f'Line {i}: {np.max(s)}')
-        if not s:
-            line_mean.append(0)
-            line_std.append(0)
-        else:
-            line_mean.append(np.nanmean(s))
-            line_std.append(np.nanstd(s))
+    The bins are the same as `radial_profile` and computed once for all channels.
+    The channels are processed (and read from the file for lazily loaded data) in chunks of `chunk_size`.
 
-    return np.array(line_r) * abs(img.incr_x), np.array(line_mean), np.array(line_std)
+    Args:
+        img (Image): The Image object.
+        azimuth (tuple): The azimuth range angle in degrees. If None, all azimuth angles are considered.
+        sample_size (int, optional): The number of samples to take along the radial line. Defaults to 5.
+        inc (float, optional): The inclination angle in degrees. Defaults to 0.0.
+        PA (float, optional): The position angle in degrees. Defaults to 0.0.
+        stokes (int, optional): Stokes parameter index. Defaults to 0.
+        chunk_size (int, optional): Number of channels processed at a time. Defaults to 64.
+        exact (bool, optional): If True, the pixels are weighted by the exact fraction of their area in the bins.
+            See `radial_profile`. Defaults to False.
+
+    Returns:
+        tuple: A tuple of four numpy arrays:
+            - The radial distance from the center with the shape (nbins,).
+            - The mean intensity with the shape (nchan, nbins).
+            - The standard deviation of the intensity with the shape (nchan, nbins).
+            - The number of pixels (excluding NaN) in each bin with the shape (nchan, nbins).
+              If exact is True, the sum of the fractional weights.
+    """
+    if img.data is None:
+        raise ValueError("Image data is None.")
+    if chunk_size <= 0:
+        raise ValueError("chunk_size must be a positive integer.")
+    if exact:
+        line_r, weights = _exact_weights(img, azimuth, sample_size, inc, PA)
+    else:
+        line_r, selected, idx = _radial_bins(img, azimuth, sample_size, inc, PA)
+    nbins = len(line_r)
+    nchan = img.data.shape[-3] if img.data.ndim >= 3 else 1
+
+    line_mean = np.empty((nchan, nbins))
+    line_std = np.empty((nchan, nbins))
+    line_count = np.empty((nchan, nbins), dtype=float if exact else np.int64)
+    for start in range(0, nchan, chunk_size):
+        stop = min(start + chunk_size, nchan)
+        data = img.get_channels(stokes, start, stop)
+        if exact:
+            stats = _exact_stats(weights, data)
+        else:
+            stats = _binned_stats(downsample_data(data, sample_size)[:, selected], idx, nbins, empty=0)
+        (
+            line_mean[start:stop],
+            line_std[start:stop],
+            line_count[start:stop],
+        ) = stats
+
+    return line_r, line_mean, line_std, line_count
@@ -0,0 +1,180 @@
+import numpy as np
+from .Image import Image
+from .geometry import geometry_cache
+from .utilities import bilinear_operator, unitConvDict
+
+
+def _sky_frame(img: Image) -> tuple:
+    """
+    Returns the hashable description of the sky coordinates of the pixels of an image:
+    (center_pix, center_radec, incr_x, incr_y) with the increments in degrees.
+    If the image does not have center_radec or center_pix, center_radec is None and center_pix is the center of the data.
+    """
+    if img.incr_x is None or img.incr_y is None or img.unit_x is None or img.unit_y is None:
+        raise ValueError("Image increment x or y (or its unit) is None.")
+    incr_x = img.incr_x * unitConvDict[(img.unit_x, "arcsec")] / 3600
+    incr_y = img.incr_y * unitConvDict[(img.unit_y, "arcsec")] / 3600
+    if img.center_radec is None or img.center_pix is None:
+        height, width = img.data.shape[-2:]
+        return ((width - 1) / 2, (height - 1) / 2), None, float(incr_x), float(incr_y)
+    center_radec = tuple(float(c) for c in img.center_radec)
+    return tuple(float(c) for c in img.center_pix), center_radec, float(incr_x), float(incr_y)
+
+
+def _pix_to_sky(frame: tuple, x: np.ndarray, y: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Returns the (RA, Dec) in radians of pixels with the orthographic (SIN) projection.
+    """
+    (cx, cy), (ra0, dec0), incr_x, incr_y = frame
+    ra0, dec0 = np.radians(ra0), np.radians(dec0)
+    l = np.radians((x - cx) * incr_x)
+    m = np.radians((y - cy) * incr_y)
+    n = np.sqrt(np.maximum(1 - l**2 - m**2, 0))
+    dec = np.arcsin(np.clip(m * np.cos(dec0) + n * np.sin(dec0), -1, 1))
+    ra = ra0 + np.arctan2(l, n * np.cos(dec0) - m * np.sin(dec0))
+    return ra, dec
+
+
+def _sky_to_pix(frame: tuple, ra: np.ndarray, dec: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Returns the pixel coordinates of (RA, Dec) in radians with the orthographic (SIN) projection.
+    """
+    (cx, cy), (ra0, dec0), incr_x, incr_y = frame
+    ra0, dec0 = np.radians(ra0), np.radians(dec0)
+    l = np.cos(dec) * np.sin(ra - ra0)
+    m = np.sin(dec) * np.cos(dec0) - np.cos(dec) * np.sin(dec0) * np.cos(ra - ra0)
+    return cx + np.degrees(l) / incr_x, cy + np.degrees(m) / incr_y
+
+
+class Reprojection:
+    """
+    Interpolation map from the pixels of an image to a window of the pixel grid of another (base) image.
+
+    If both images have `center_radec` (in degrees) at the reference pixel `center_pix`, the pixels are matched
+    on the sky with the orthographic (SIN) projection, the projection of radio interferometric images.
+    Otherwise the centers of both images are aligned and only the pixel sizes are matched.
+
+    Attributes:
+        window (tuple[int, int, int, int]): (left, right, bottom, top) window of the base grid. `right` and `top` are exclusive.
+        source_window (tuple[int, int, int, int]): Window of the image needed for the interpolation.
+        operator (scipy.sparse.csr_matrix): Bilinear interpolation matrix with the shape (npix of window, npix of source_window).
+        valid (np.ndarray): Boolean array with the shape of the window, False for the points outside the image.
+    """
+
+    def __init__(
+        self,
+        base_frame: tuple,
+        window: tuple[int, int, int, int],
+        frame: tuple,
+        shape: tuple[int, int],
+    ):
+        """
+        Args:
+            base_frame (tuple): Sky coordinates of the base image (see `_sky_frame`).
+            window (tuple[int, int, int, int]): (left, right, bottom, top) window of the base grid to resample onto.
+            frame (tuple): Sky coordinates of the image.
+            shape (tuple[int, int]): Shape of the image (height, width).
+        """
+        self.window = window
+        left, right, bottom, top = window
+        x = np.arange(left, right, dtype=float)
+        y = np.arange(bottom, top, dtype=float)[:, np.newaxis]
+        if base_frame[1] is not None and frame[1] is not None:
+            ra, dec = _pix_to_sky(base_frame, x, y)
+            src_x, src_y = _sky_to_pix(frame, ra, dec)
+        else:
+            (bcx, bcy), _, b_incr_x, b_incr_y = base_frame
+            (cx, cy), _, incr_x, incr_y = frame
+            src_x = cx + (x - bcx) * b_incr_x / incr_x
+            src_y = cy + (y - bcy) * b_incr_y / incr_y
+        src_x, src_y = np.broadcast_arrays(src_x, src_y)
+
+        # Read only the pixels around the points
+        height, width = shape
+        inside = (0 <= src_x) & (src_x <= width - 1) & (0 <= src_y) & (src_y <= height - 1)
+        if inside.any():
+            s_left = int(np.floor(src_x[inside].min()))
+            s_right = min(int(np.floor(src_x[inside].max())) + 2, width)
+            s_bottom = int(np.floor(src_y[inside].min()))
+            s_top = min(int(np.floor(src_y[inside].max())) + 2, height)
+        else:
+            s_left, s_right, s_bottom, s_top = 0, 1, 0, 1
+        self.source_window = (s_left, s_right, s_bottom, s_top)
+        self.operator, valid = bilinear_operator(
+            (s_top - s_bottom, s_right - s_left), src_x - s_left, src_y - s_bottom
+        )
+        self.valid = (valid & inside.ravel()).reshape(top - bottom, right - left)
+
+    @property
+    def nbytes(self) -> int:
+        op = self.operator
+        return op.data.nbytes + op.indices.nbytes + op.indptr.nbytes + self.valid.nbytes
+
+    def reproject(self, data: np.ndarray) -> np.ndarray:
+        """
+        Resamples the source window of 2D data onto the window of the base grid.
+
+        Args:
+            data (np.ndarray): 2D data of `source_window` of the image.
+
+        Returns:
+            np.ndarray: 2D data with the shape of the window. Points outside the image are NaN.
+        """
+        resampled = (self.operator @ data.ravel().astype(float)).reshape(self.valid.shape)
+        resampled[~self.valid] = np.nan
+        return resampled
+
+
+def get_reprojection(
+    base_frame: tuple,
+    window: tuple[int, int, int, int],
+    frame: tuple,
+    shape: tuple[int, int],
+) -> Reprojection:
+    """
+    Returns the reprojection, reusing the cached one for the same pair of images and window.
+    See `Reprojection` for the arguments.
+    """
+    key = ("reproject", base_frame, tuple(window), frame, tuple(shape))
+    return geometry_cache.get(key, lambda: Reprojection(base_frame, window, frame, shape))
+
+
+def reproject_image(
+    img: Image,
+    img_base: Image,
+    window: tuple[int, int, int, int] | None = None,
+    stokes: int = 0,
+    chan: int = 0,
+) -> np.ndarray:
+    """
+    Resample a plane of an image onto the pixel grid of another image.
+
+    The mapping between the pixels of the two images is cached, so resampling many images (or channels)
+    with the same geometry onto the same base is fast. Only the pixels of the image needed for the window are read.
+
+    Args:
+        img (Image): The Image object to resample.
+        img_base (Image): The Image object whose pixel grid is used.
+        window (tuple[int, int, int, int] | None, optional): (left, right, bottom, top) window of the base grid.
+            `right` and `top` are exclusive. If None, the whole base image.
+        stokes (int, optional): Stokes parameter index of img. Defaults to 0.
+        chan (int, optional): Channel index of img. Defaults to 0.
+
+    Returns:
+        np.ndarray: 2D data on the window of the base grid. Points outside the image are NaN.
+    """
+    if img.data is None:
+        raise ValueError("Image data is None.")
+    if img_base.data is None:
+        raise ValueError("Base image data is None.")
+    base_height, base_width = img_base.data.shape[-2:]
+    if window is None:
+        window = (0, base_width, 0, base_height)
+    left, right, bottom, top = window
+    if not (0 <= left < right <= base_width and 0 <= bottom < top <= base_height):
+        raise ValueError(f"Window {window} is out of the base image of the shape {(base_height, base_width)}.")
+    img._check_stokes_chan(stokes, chan)
+    reprojection = get_reprojection(
+        _sky_frame(img_base), tuple(int(w) for w in window), _sky_frame(img), img.data.shape[-2:]
+    )
+    return reprojection.reproject(img.get_two_dim_window(stokes, chan, reprojection.source_window))
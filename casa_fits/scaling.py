@@ -0,0 +1,169 @@
+import numpy as np
+from matplotlib.colors import AsinhNorm
+from .Image import Image
+
+
+def _blocks(img: Image, chunk_size: int = 16):
+    """
+    Yields the data in chunks of channels of each Stokes.
+    """
+    nstokes = img.data.shape[0] if img.data.ndim == 4 else 1
+    nchan = img.data.shape[-3] if img.data.ndim >= 3 else 1
+    for stokes in range(nstokes):
+        for start in range(0, nchan, chunk_size):
+            yield img.get_channels(stokes, start, min(start + chunk_size, nchan))
+
+
+def _scan_range(img: Image) -> tuple[float, float]:
+    data_min, data_max = np.inf, -np.inf
+    for block in _blocks(img):
+        finite = block[np.isfinite(block)]
+        if finite.size:
+            data_min = min(data_min, finite.min())
+            data_max = max(data_max, finite.max())
+    if data_min > data_max:
+        return np.nan, np.nan
+    return data_min, data_max
+
+
+def _scan_sample(img: Image, sample_size: int, seed: int, slice_size: int = 1 << 20) -> dict:
+    """
+    Reads the data once and draws a uniform random sample of the finite values without replacement.
+
+    Each value gets a random key and the values with the `sample_size` smallest keys are kept (reservoir sampling).
+    Only the keys below the largest kept key matter, so for each slice of values the number of such keys
+    is drawn from the binomial distribution and only that many values are picked and given keys.
+    The memory is bounded by the sample size, a slice of values and a chunk of channels.
+    The exact minimum, maximum and number of the finite values are obtained in the same pass.
+    """
+    rng = np.random.default_rng(seed)
+    sample = np.empty(0)
+    keys = np.empty(0)
+    data_min, data_max = np.inf, -np.inf
+    count = 0
+    for block in _blocks(img):
+        values = block[np.isfinite(block)]
+        if values.size == 0:
+            continue
+        count += values.size
+        data_min = min(data_min, values.min())
+        data_max = max(data_max, values.max())
+        for first in range(0, values.size, slice_size):
+            part = values[first : first + slice_size]
+            # Keys are uniform in [0, 1), so Binomial(n, bound) of them are below the bound
+            bound = keys.max() if keys.size == sample_size else 1.0
+            k = rng.binomial(part.size, bound)
+            if k == 0:
+                continue
+            index = rng.choice(part.size, k, replace=False) if k < part.size else np.arange(part.size)
+            sample = np.concatenate([sample, part[index].astype(np.float64)])
+            keys = np.concatenate([keys, bound * rng.random(k)])
+            if keys.size > sample_size:
+                index = np.argpartition(keys, sample_size - 1)[:sample_size]
+                sample, keys = sample[index], keys[index]
+    if count == 0:
+        data_min = data_max = np.nan
+    return {"sample": sample, "min": data_min, "max": data_max, "count": count}
+
+
+def data_range(img: Image) -> tuple[float, float]:
+    """
+    Returns the minimum and maximum of the whole data ignoring NaN.
+
+    The data is read once in chunks of channels and the result is cached in the Image until the data is replaced.
+
+    Args:
+        img (Image): The Image object.
+
+    Returns:
+        tuple[float, float]: The minimum and maximum.
+    """
+    if img.data is None:
+        raise ValueError("Image data is None.")
+    return img.cached_stat("range", lambda: _scan_range(img))
+
+
+def data_sample(img: Image, sample_size: int = 100_000, seed: int = 0) -> np.ndarray:
+    """
+    Returns a uniform random sample of the finite values of the whole data.
+
+    The data is read once and the sample is cached in the Image until the data is replaced.
+    If the data has fewer finite values than `sample_size`, all of them are returned.
+
+    Args:
+        img (Image): The Image object.
+        sample_size (int, optional): Number of values in the sample. Defaults to 100000.
+        seed (int, optional): Seed of the random number generator. Defaults to 0.
+
+    Returns:
+        np.ndarray: The sampled values (in random order).
+    """
+    if img.data is None:
+        raise ValueError("Image data is None.")
+    if sample_size <= 0:
+        raise ValueError("sample_size must be a positive integer.")
+    summary = img.cached_stat(("sample", sample_size, seed), lambda: _scan_sample(img, sample_size, seed))
+    # The exact range is known from the same pass
+    img.cached_stat("range", lambda: (summary["min"], summary["max"]))
+    return summary["sample"]
+
+
+def percentile_range(
+    img: Image, lower: float = 0.5, upper: float = 99.5, sample_size: int = 100_000
+) -> tuple[float, float]:
+    """
+    Returns the percentiles of the whole data estimated from a random sample (see `data_sample`).
+
+    Args:
+        img (Image): The Image object.
+        lower (float, optional): Lower percentile. Defaults to 0.5.
+        upper (float, optional): Upper percentile. Defaults to 99.5.
+        sample_size (int, optional): Number of values in the sample. Defaults to 100000.
+
+    Returns:
+        tuple[float, float]: The lower and upper percentiles.
+    """
+    if not 0 <= lower < upper <= 100:
+        raise ValueError(f"Percentiles must satisfy 0 <= lower < upper <= 100, but got {lower} and {upper}.")
+    sample = data_sample(img, sample_size)
+    if sample.size == 0:
+        return np.nan, np.nan
+    return tuple(np.percentile(sample, [lower, upper]))
+
+
+def asinh_norm(
+    img: Image,
+    vmin: float | None = None,
+    vmax: float | None = None,
+    linear_width: float | None = None,
+    sample_size: int = 100_000,
+) -> AsinhNorm:
+    """
+    Returns the asinh normalization of the data for matplotlib.
+
+    The scale is linear within about `linear_width` from zero and logarithmic beyond,
+    which shows the faint emission and the bright peaks at the same time.
+
+    Args:
+        img (Image): The Image object.
+        vmin (float | None, optional): Minimum of the color scale. If None, the minimum of the data.
+        vmax (float | None, optional): Maximum of the color scale. If None, the maximum of the data.
+        linear_width (float | None, optional): Width of the linear region. If None, the noise level
+            estimated from the median absolute deviation of a random sample of the data (see `data_sample`).
+        sample_size (int, optional): Number of values in the sample. Defaults to 100000.
+
+    Returns:
+        matplotlib.colors.AsinhNorm: The normalization.
+    """
+    if vmin is None or vmax is None:
+        data_min, data_max = data_range(img)
+        vmin = data_min if vmin is None else vmin
+        vmax = data_max if vmax is None else vmax
+    if linear_width is None:
+        sample = data_sample(img, sample_size)
+        if sample.size:
+            linear_width = 1.4826 * np.median(np.abs(sample - np.median(sample)))
+        if not linear_width:
+            # Constant data or no data
+            linear_width = 1.0
+    return AsinhNorm(linear_width=linear_width, vmin=vmin, vmax=vmax)
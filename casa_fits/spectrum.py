@@ -0,0 +1,151 @@
+import numpy as np
+from scipy import sparse
+from .Image import Image
+
+
+def aperture_operator(
+    shape: tuple[int, int],
+    x: np.ndarray,
+    y: np.ndarray,
+    semi_x: float = 0.0,
+    semi_y: float = 0.0,
+    angle: float = 0.0,
+) -> sparse.csr_matrix:
+    """
+    Returns the sparse matrix selecting the pixels in the elliptical aperture of each position.
+
+    A pixel is in the aperture if its center is within the ellipse.
+    If the semi-axes are 0, the aperture is the pixel nearest to the position.
+
+    Args:
+        shape (tuple[int, int]): Shape of the image (height, width).
+        x (np.ndarray): X pixel coordinates of the positions.
+        y (np.ndarray): Y pixel coordinates of the positions.
+        semi_x (float, optional): Semi-axis of the ellipse along the rotated x-axis in pixels. Defaults to 0.0.
+        semi_y (float, optional): Semi-axis of the ellipse along the rotated y-axis in pixels. Defaults to 0.0.
+        angle (float, optional): Rotation angle of the ellipse in degrees, counter-clockwise from the x-axis. Defaults to 0.0.
+
+    Returns:
+        scipy.sparse.csr_matrix: The (npos, height * width) matrix of ones (for the pixels in the apertures) and zeros.
+    """
+    height, width = shape
+    x = np.asarray(x, dtype=float).ravel()
+    y = np.asarray(y, dtype=float).ravel()
+    if x.shape != y.shape:
+        raise ValueError(f"x and y must have the same length, but got {x.size} and {y.size}.")
+    if semi_x > 0 and semi_y > 0:
+        # Pixels of the bounding box around the nearest pixel of each position
+        half = int(np.ceil(max(semi_x, semi_y))) + 1
+        offset = np.arange(-half, half + 1)
+        off_x, off_y = (a.ravel() for a in np.meshgrid(offset, offset))
+        px = np.rint(x).astype(int)[:, np.newaxis] + off_x
+        py = np.rint(y).astype(int)[:, np.newaxis] + off_y
+        dx = px - x[:, np.newaxis]
+        dy = py - y[:, np.newaxis]
+        ang = np.radians(angle)
+        u = dx * np.cos(ang) + dy * np.sin(ang)
+        v = -dx * np.sin(ang) + dy * np.cos(ang)
+        inside = (u / semi_x) ** 2 + (v / semi_y) ** 2 <= 1
+    else:
+        px = np.rint(x).astype(int)[:, np.newaxis]
+        py = np.rint(y).astype(int)[:, np.newaxis]
+        inside = np.ones(px.shape, dtype=bool)
+    inside &= (0 <= px) & (px < width) & (0 <= py) & (py < height)
+    rows = np.broadcast_to(np.arange(x.size)[:, np.newaxis], px.shape)[inside]
+    cols = py[inside] * width + px[inside]
+    return sparse.csr_matrix(
+        (np.ones(rows.size), (rows, cols)), shape=(x.size, height * width)
+    )
+
+
+def extract_spectra(
+    img: Image,
+    x: np.ndarray,
+    y: np.ndarray,
+    aperture: str | float | tuple[float, float, float] | None = None,
+    stokes: int = 0,
+    statistic: str = "mean",
+    chunk_size: int = 64,
+) -> np.ndarray:
+    """
+    Extract the spectra at many positions of a cube at once.
+
+    The apertures of all positions are combined into one sparse operator, and the cube is read once
+    in chunks of `chunk_size` channels, limited to the window covering all apertures.
+    NaN values are ignored. The spectra of apertures without valid pixels are NaN.
+
+    Args:
+        img (Image): The Image object of the cube.
+        x (np.ndarray): X pixel coordinates of the positions (e.g. `peaks['x']` of `detectpeak`).
+        y (np.ndarray): Y pixel coordinates of the positions.
+        aperture (str | float | tuple[float, float, float] | None, optional): The aperture around each position.
+            None for the nearest pixel, a float for the radius of a circle in arcsec,
+            (major, minor, PA) in arcsec and degrees for an ellipse with the same convention as `Image.beam`,
+            or 'beam' for the ellipse of the beam (FWHM). Defaults to None.
+        stokes (int, optional): Stokes parameter index. Defaults to 0.
+        statistic (str, optional): 'mean' or 'sum' of the pixels in the aperture. Defaults to 'mean'.
+        chunk_size (int, optional): Number of channels read at a time. Defaults to 64.
+
+    Returns:
+        np.ndarray: The spectra with the shape (npos, nchan).
+    """
+    if img.data is None:
+        raise ValueError("Image data is None.")
+    if statistic not in ("mean", "sum"):
+        raise ValueError("Arg `statistic` must be `'mean'` or `'sum'`.")
+    if chunk_size <= 0:
+        raise ValueError("chunk_size must be a positive integer.")
+
+    # Aperture in pixels
+    semi_x = semi_y = angle = 0.0
+    if aperture is not None:
+        if img.incr_x is None or img.incr_y is None:
+            raise ValueError("Image increment x or y is None.")
+        img.convert_axes_unit("arcsec")
+        if isinstance(aperture, str):
+            if aperture != "beam":
+                raise ValueError("Arg `aperture` must be None, a radius, (major, minor, PA) or `'beam'`.")
+            if img.beam is None:
+                raise ValueError("The image does not have a beam size.")
+            aperture = img.beam
+        if isinstance(aperture, tuple):
+            major, minor, pa = aperture
+            # Rotated in the same way as draw_beam
+            semi_x = major / 2 / abs(img.incr_x)
+            semi_y = minor / 2 / abs(img.incr_y)
+            angle = 90 + pa
+        else:
+            semi_x = aperture / abs(img.incr_x)
+            semi_y = aperture / abs(img.incr_y)
+
+    height, width = img.data.shape[-2:]
+    operator = aperture_operator((height, width), x, y, semi_x, semi_y, angle)
+    npos = operator.shape[0]
+    nchan = img.data.shape[-3] if img.data.ndim >= 3 else 1
+    spectra = np.full((npos, nchan), np.nan)
+    if operator.nnz == 0:
+        return spectra
+
+    # Read only the window covering all apertures
+    pix_y, pix_x = np.divmod(operator.indices, width)
+    left, right = int(pix_x.min()), int(pix_x.max()) + 1
+    bottom, top = int(pix_y.min()), int(pix_y.max()) + 1
+    operator = operator.tocoo()
+    wy, wx = np.divmod(operator.col, width)
+    operator = sparse.csr_matrix(
+        (operator.data, (operator.row, (wy - bottom) * (right - left) + (wx - left))),
+        shape=(npos, (top - bottom) * (right - left)),
+    )
+
+    for start in range(0, nchan, chunk_size):
+        stop = min(start + chunk_size, nchan)
+        data = img.get_channels(stokes, start, stop, (left, right, bottom, top))
+        data = data.reshape(stop - start, -1).T
+        finite = np.isfinite(data)
+        total = operator @ np.where(finite, data, 0).astype(np.float64)
+        count = operator @ finite.astype(np.float64)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            result = total / count if statistic == "mean" else total
+        result[count == 0] = np.nan
+        spectra[:, start:stop] = result
+    return spectra
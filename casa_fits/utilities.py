@@ -1,6 +1,10 @@
 import math
 import os
+import warnings
+from functools import partial
 import numpy as np
+from scipy import sparse
+from .chunked import ChunkedArray, downsample_chunked
 
 unitConvDict = {
     ('rad', 'rad'): 1,
@@ -77,23 +81,52 @@ def get_pret_dir_name(dir: str) -> str:
     """
     return os.path.split(dir.rstrip('/'))[1]
 
-def downsample_data(data: np.ndarray, sample_size: int) -> np.ndarray:
+def _pool_blocks(blocks: np.ndarray, method: str) -> np.ndarray:
     """
-    Downsamples a 2D numpy array by averaging over blocks of size sample_size.
+    Reduces the blocks of the data reshaped to (..., height_new, sample_size, width_new, sample_size).
+    """
+    if method == "mean":
+        return blocks.mean(axis=(-3, -1))
+    with warnings.catch_warnings():
+        # All-NaN blocks
+        warnings.simplefilter("ignore", RuntimeWarning)
+        block_max = np.nanmax(blocks, axis=(-3, -1))
+        block_min = np.nanmin(blocks, axis=(-3, -1))
+        if method == "max":
+            return block_max
+        if method == "min":
+            return block_min
+        # Keep the extreme farther from the mean of the block
+        block_mean = np.nanmean(blocks, axis=(-3, -1))
+    return np.where(block_max - block_mean >= block_mean - block_min, block_max, block_min)
+
+
+def downsample_data(
+    data: np.ndarray | ChunkedArray, sample_size: int, method: str = "mean"
+) -> np.ndarray | ChunkedArray:
+    """
+    Downsamples a numpy array by averaging over blocks of size sample_size along the last two axes.
+    Leading axes (e.g. channels) are kept, so a whole cube can be downsampled at once.
+    A `ChunkedArray` is downsampled lazily chunk by chunk.
 
     Args:
-        data (np.ndarray): The 2D numpy array to downsample.
+        data (np.ndarray | ChunkedArray): The numpy array (2D or more) to downsample.
         sample_size (int): The size of the blocks to average over.
+        method (str, optional): How the blocks are reduced. 'mean' for the average,
+            'max' or 'min' for the maximum or minimum ignoring NaN, or 'minmax' for whichever of the maximum
+            and minimum is farther from the mean of the block, which keeps both peaks and dips. Defaults to 'mean'.
 
     Returns:
-        np.ndarray: The downsampled 2D numpy array.
+        np.ndarray | ChunkedArray: The downsampled numpy array.
     """
-    if data.ndim != 2:
-        raise ValueError("Input data must be a 2D numpy array.")
+    if data.ndim < 2:
+        raise ValueError("Input data must be a numpy array with at least 2 dimensions.")
     if sample_size <= 0:
         raise ValueError("Sample size must be a positive integer.")
+    if method not in ("mean", "max", "min", "minmax"):
+        raise ValueError(f"Unknown method: {method}. Use 'mean', 'max', 'min' or 'minmax'.")
     
-    height, width = data.shape
+    height, width = data.shape[-2:]
     
     # Crop the data to make sure dimensions are divisible by sample_size
     width_crop = width - (width % sample_size)
@@ -102,10 +135,98 @@ def downsample_data(data: np.ndarray, sample_size: int) -> np.ndarray:
     # Crop the data with keeping the center
     x_start = (width - width_crop) // 2
     y_start = (height - height_crop) // 2
-    data = data[y_start:y_start + height_crop, x_start:x_start + width_crop]
-
     # New width and height
     width_new = width_crop // sample_size
     height_new = height_crop // sample_size
 
-    return data.reshape(height_new, sample_size, width_new, sample_size).mean(axis=(1, 3))
\ No newline at end of file
+    if isinstance(data, ChunkedArray):
+        return downsample_chunked(
+            data, sample_size, y_start, x_start, height_new, width_new, partial(_pool_blocks, method=method)
+        )
+    data = data[..., y_start:y_start + height_crop, x_start:x_start + width_crop]
+
+    return _pool_blocks(data.reshape(data.shape[:-2] + (height_new, sample_size, width_new, sample_size)), method)
+
+
+def bilinear_operator(
+    shape: tuple[int, int], x: np.ndarray, y: np.ndarray
+) -> tuple[sparse.csr_matrix, np.ndarray]:
+    """
+    Returns the sparse matrix which bilinearly interpolates a 2D array at the given points.
+
+    Multiplying the matrix by a flattened image (or by a (npix, nchan) stack of images)
+    gives the interpolated values at all points at once.
+
+    Args:
+        shape (tuple[int, int]): Shape of the image (height, width).
+        x (np.ndarray): X pixel coordinates of the points.
+        y (np.ndarray): Y pixel coordinates of the points.
+
+    Returns:
+        tuple[sparse.csr_matrix, np.ndarray]: The (npoints, height * width) matrix
+            and the boolean array which is False for the points outside the image.
+    """
+    height, width = shape
+    x = np.asarray(x, dtype=float).ravel()
+    y = np.asarray(y, dtype=float).ravel()
+    valid = (0 <= x) & (x <= width - 1) & (0 <= y) & (y <= height - 1)
+    x = np.where(valid, x, 0)
+    y = np.where(valid, y, 0)
+    x0 = np.floor(x).astype(int)
+    y0 = np.floor(y).astype(int)
+    fx = x - x0
+    fy = y - y0
+    x1 = np.minimum(x0 + 1, width - 1)
+    y1 = np.minimum(y0 + 1, height - 1)
+    rows = np.tile(np.arange(x.size), 4)
+    cols = np.concatenate([y0 * width + x0, y0 * width + x1, y1 * width + x0, y1 * width + x1])
+    weights = np.concatenate(
+        [(1 - fx) * (1 - fy), fx * (1 - fy), (1 - fx) * fy, fx * fy]
+    ) * np.tile(valid, 4)
+    matrix = sparse.csr_matrix((weights, (rows, cols)), shape=(x.size, height * width))
+    # Zero weights must not propagate NaN values of the neighbors
+    matrix.eliminate_zeros()
+    return matrix, valid
+
+
+def _binned_stats(
+    values: np.ndarray,
+    idx: np.ndarray,
+    nbins: int,
+    empty: float = np.nan,
+    ignore_nan: bool = True,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Mean, standard deviation and number of pixels in each bin of each plane.
+
+    Args:
+        values (np.ndarray): (plane, pixel) values.
+        idx (np.ndarray): Bin index of each pixel.
+        nbins (int): Number of bins.
+        empty (float, optional): Mean and standard deviation of the bins without pixels. Defaults to NaN.
+        ignore_nan (bool, optional): If True, NaN (and infinite) values are ignored and not counted,
+            so bins with only NaN values are NaN. Otherwise a NaN value makes its bin NaN. Defaults to True.
+
+    Returns:
+        tuple: Mean, standard deviation and count with the shape (plane, nbins).
+    """
+    nplane = values.shape[0]
+    # Bin index over all planes
+    keys = np.broadcast_to(np.arange(nplane)[:, np.newaxis] * nbins + idx, values.shape)
+    values = values.astype(float)
+    if ignore_nan:
+        finite = np.isfinite(values)
+        keys, values = keys[finite], values[finite]
+    else:
+        keys, values = keys.ravel(), values.ravel()
+    length = nplane * nbins
+    count = np.bincount(keys, minlength=length)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mean = np.bincount(keys, weights=values, minlength=length) / count
+        var = np.bincount(keys, weights=(values - mean[keys]) ** 2, minlength=length) / count
+    mean = mean.reshape(nplane, nbins)
+    std = np.sqrt(var).reshape(nplane, nbins)
+    no_pixel = np.bincount(idx, minlength=nbins) == 0
+    mean[:, no_pixel] = empty
+    std[:, no_pixel] = empty
+    return mean, std, count.reshape(nplane, nbins)
@@ -1,12 +1,13 @@
-from math import degrees, radians
+from math import degrees
 import numpy as np
+from casa_fits.geometry import get_disk_geometry
 from .Image import Image
 
 def azimuthal_cut(img: Image, radius: float, inclination: float, pa: float, beam_factor: float = 0.5) -> tuple:
     """
     Extract an azimuthal cut from an image using a deprojected elliptical annulus.
 
-    This implementation computes the deprojected radius for each pixel,
+    This implementation uses the (cached) deprojected radius of each pixel,
     given the inclination and position angle, and selects pixels that lie
     within an annulus defined by [radius_px - beam_size/2, radius_px + beam_size/2].
     The azimuthal angle is computed in the deprojected frame.
@@ -47,41 +48,28 @@ def azimuthal_cut(img: Image, radius: float, inclination: float, pa: float, beam
     sampling_rad = beam_size * beam_factor / radius_px
     sampling_deg = degrees(sampling_rad)
     line_azm = np.arange(0, 360, sampling_deg)
-    sample = [[] for _ in range(len(line_azm))]
 
-    # Convert inclination and PA to radians
-    incl_rad = radians(inclination)
-    pa_rad = radians(pa)
+    # Deprojected radius and azimuth angle of each pixel (cached for the same geometry).
+    # The maps have the shape of the data, which includes the top right corner of the region.
+    geom = get_disk_geometry(
+        img.img.shape[-2:], (center_x, center_y), inclination, pa, np.abs(img.incr_x)
+    )
 
-    # Loop over image pixels
-    # For each pixel, compute its deprojected radius and azimuth angle.
-    for i in range(img.height):
-        for j in range(img.width):
-            dx = j - center_x
-            dy = i - center_y
+    # Select pixels within the annulus.
+    in_annulus = (geom.r >= r_min) & (geom.r <= r_max)
 
-            # Rotate coordinates by PA to align with the disk's axes.
-            xp = dx * np.cos(pa_rad) + dy * np.sin(pa_rad)
-            yp = -dx * np.sin(pa_rad) + dy * np.cos(pa_rad)
+    # Deprojected azimuth angle (in degrees) measured from the north.
+    theta_deproj = (geom.theta[in_annulus] - 90) % 360
 
-            # Compute deprojected radius:
-            # y'-coordinate is corrected by 1/cos(inclination)
-            r_deproj = np.sqrt(xp**2 + (yp / np.cos(incl_rad))**2)
-
-            # Select pixels within the annulus.
-            if r_deproj < r_min or r_deproj > r_max:
-                continue
-
-            # Compute the deprojected azimuth angle (in degrees).
-            # Note: np.arctan2(y, x) yields the angle in radians.
-            theta_deproj = (np.degrees(np.arctan2(yp / np.cos(incl_rad), xp)) - 90) % 360
-
-            # Find the closest azimuthal bin.
-            idx = np.argmin(np.abs(line_azm - theta_deproj))
-            sample[idx].append(img.img[i, j])
+    # Find the closest azimuthal bin.
+    idx = np.argmin(np.abs(line_azm[:, np.newaxis] - theta_deproj), axis=0)
+    values = img.img[in_annulus]
 
     # Compute mean and standard deviation in each azimuthal bin.
-    line_mean = np.array([np.mean(s) if s else np.nan for s in sample])
-    line_std = np.array([np.std(s) if s else np.nan for s in sample])
+    count = np.bincount(idx, minlength=len(line_azm))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        line_mean = np.bincount(idx, weights=values, minlength=len(line_azm)) / count
+        line_var = np.bincount(idx, weights=(values - line_mean[idx])**2, minlength=len(line_azm)) / count
+    line_std = np.sqrt(line_var)
 
     return line_azm, line_mean, line_std
@@ -0,0 +1,32 @@
+import sys
+sys.path.append('.')
+import numpy as np
+import pytest
+from casa_fits import Image
+
+
+@pytest.fixture
+def make_image():
+    """
+    Factory of synthetic Images: `make_image(data)` returns an Image of the data
+    with arcsec axes of 0.05 arcsec pixels and a beam of (0.3, 0.2, 30.0).
+    """
+
+    def make(
+        data: np.ndarray,
+        incr: float = 0.05,
+        beam: tuple[float, float, float] | None = (0.3, 0.2, 30.0),
+        unit_data: str | None = 'Jy/beam',
+    ) -> Image:
+        img = Image()
+        img.data = data
+        img.height, img.width = data.shape[-2:]
+        img.incr_x = -incr
+        img.incr_y = incr
+        img.unit_x = 'arcsec'
+        img.unit_y = 'arcsec'
+        img.beam = beam
+        img.unit_data = unit_data
+        return img
+
+    return make
@@ -0,0 +1,37 @@
+import sys
+sys.path.append('.')
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+import casa_fits as cf
+
+
+def test_channel_map_pages(tmp_path):
+    img = cf.load_fits('fits/twhya_n2hp.fits')
+    cmap = cf.ChannelMap(img, nrows=3, ncols=4, axisunit='arcsec')
+    try:
+        assert cmap.npages == 2
+        images = list(cmap.images)
+        names = cmap.save(str(tmp_path / 'chmap.png'))
+        assert names == [str(tmp_path / 'chmap-0.png'), str(tmp_path / 'chmap-1.png')]
+        assert all((tmp_path / f'chmap-{page}.png').exists() for page in range(2))
+        # The artists are reused and only the data is replaced
+        assert cmap.images == images
+        assert cmap.page == 1
+        assert (cmap.images[0].get_array() == img.get_two_dim_data(0, 12)).all()
+
+        # The last page has 3 channels in the first row, which gets the outer labels and the beam
+        axes = cmap.axes
+        assert [ax.get_visible() for ax in axes.ravel()] == [True] * 3 + [False] * 9
+        assert axes[0, 0].get_xlabel().startswith('RA') and axes[0, 0].get_ylabel().startswith('DEC')
+        assert all(label.get_visible() for label in axes[0, 1].get_xticklabels())
+        assert cmap.beams[0].get_visible()
+        assert not any(beam.get_visible() for beam in cmap.beams[1:])
+
+        # A full page is labeled in the bottom row
+        cmap.draw(0)
+        assert axes[-1, 0].get_xlabel().startswith('RA') and axes[0, 0].get_xlabel() == ''
+        assert not any(label.get_visible() for label in axes[0, 1].get_xticklabels())
+        assert cmap.beams[8].get_visible() and not cmap.beams[0].get_visible()
+    finally:
+        plt.close(cmap.fig)
@@ -0,0 +1,55 @@
+import sys
+sys.path.append('.')
+import numpy as np
+from casa_fits import Image, detectpeak
+
+
+def _noise_image(make_image, size: int = 96):
+    return make_image(np.random.default_rng(1).normal(0, 1, (1, 1, size, size)))
+
+
+def _detectpeak_loop(img: Image, rms: float, threshold_rms: int, find_max: bool) -> list:
+    """The per-pixel loop of the original detectpeak."""
+    beam_x = img.beam[0] / abs(img.incr_x)
+    beam_y = img.beam[1] / abs(img.incr_y)
+    beam_ang = (90 + img.beam[2]) * np.pi / 180
+    cell_width = int(np.sqrt((beam_x * np.cos(beam_ang)) ** 2 + (beam_x * np.sin(beam_ang)) ** 2) + 1)
+    cell_height = int(np.sqrt((beam_x * np.sin(beam_ang)) ** 2 + (beam_y * np.cos(beam_ang)) ** 2) + 1)
+    threshold = threshold_rms * rms
+    data = img.get_two_dim_data()
+    peak = []
+    for i in range(cell_height // 2, img.height - cell_height // 2, 1):
+        for j in range(cell_width // 2, img.width - cell_width // 2, 1):
+            if data[i][j] > threshold:
+                region = data[
+                    i - cell_height // 2 : i + cell_height // 2 + 1,
+                    j - cell_width // 2 : j + cell_width // 2 + 1,
+                ]
+                if find_max:
+                    if data[i][j] == np.max(region):
+                        peak.append((j, i, data[i][j]))
+                else:
+                    if data[i][j] == np.min(region):
+                        peak.append((j, i, data[i][j]))
+    return peak
+
+
+def test_detectpeak_box_matches_loop(make_image):
+    img = _noise_image(make_image)
+    # Minima are searched among the pixels above the threshold too
+    for find_max, threshold_rms in ((True, 1), (False, -3)):
+        expected = _detectpeak_loop(img, 1.0, threshold_rms, find_max)
+        assert expected
+        assert detectpeak(img, 1.0, threshold_rms, find_max=find_max) == expected
+
+
+def test_detectpeak_tiled_matches_untiled(make_image):
+    img = _noise_image(make_image)
+    # Peaks on both sides of the tile seams and at a tile corner
+    for x, y in ((31, 40), (32, 50), (60, 63), (70, 64), (63, 64), (64, 31)):
+        img.data[0, 0, y, x] = 20.0
+    for footprint in ('box', 'beam'):
+        expected = detectpeak(img, 1.0, 2, footprint=footprint)
+        assert {(31, 40), (32, 50), (60, 63), (70, 64), (63, 64), (64, 31)} <= {(x, y) for x, y, _ in expected}
+        for tile_size, workers in ((32, 1), (32, 3), (17, 2)):
+            assert detectpeak(img, 1.0, 2, footprint=footprint, tile_size=tile_size, workers=workers) == expected
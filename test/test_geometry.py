@@ -0,0 +1,16 @@
+import sys
+sys.path.append('.')
+import numpy as np
+from casa_fits.geometry import AnnulusWeights
+
+
+def test_annulus_weights_area():
+    inc = 40
+    edges = np.arange(0, 60, 3.5)
+    wedges = tuple((a, a + 30.0) for a in range(0, 360, 30))
+    weights = AnnulusWeights((201, 201), (100, 100), inc, 30, tuple(edges), wedges)
+    # Exact area of the projected annuli split into 12 wedges
+    expected = np.pi * np.diff(edges**2) * np.cos(np.radians(inc)) / 12
+    assert np.allclose(weights.area, expected[:, np.newaxis])
+    # No pixel is counted more than once
+    assert weights.matrix.sum(axis=0).max() <= 1 + 1e-9
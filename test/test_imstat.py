@@ -0,0 +1,38 @@
+import sys
+sys.path.append('.')
+import numpy as np
+from casa_fits import imstat
+
+
+def _noise_image(make_image):
+    data = np.random.default_rng(4).normal(0, 1, (1, 1, 64, 64))
+    data[0, 0, 5:8, 5:8] = np.nan
+    return make_image(data)
+
+
+def test_imstat_does_not_modify_image(make_image):
+    img = _noise_image(make_image)
+    data = img.data.copy()
+    mask = np.zeros((64, 64), dtype=bool)
+    mask[:20] = True
+    first = imstat(img, 0.1, unit='arcsec', mask=mask)
+    assert np.array_equal(img.data, data, equal_nan=True)
+    assert (img.unit_x, img.incr_x, img.beam) == ('arcsec', -0.05, (0.3, 0.2, 30.0))
+    # Repeated calls give the same results
+    assert imstat(img, 0.1, unit='arcsec', mask=mask) == first
+
+
+def test_imstat_area_normalization(make_image):
+    img = _noise_image(make_image)
+    data = img.data[np.isfinite(img.data)]
+    per_beam = imstat(img, 0.1)['all']
+    assert np.isclose(per_beam['max'], data.max())
+    assert np.isclose(per_beam['sum'], data.sum())
+    assert np.isclose(per_beam['rms'], np.sqrt(np.mean(data**2)))
+    area = np.pi * 0.3 * 0.2
+    per_arcsec = imstat(img, 0.1, unit='arcsec')['all']
+    for key in ('max', 'min', 'sum', 'mean', 'rms'):
+        assert np.isclose(per_arcsec[key], per_beam[key] / area)
+    for key in ('sumsq', 'sigma'):
+        assert np.isclose(per_arcsec[key], per_beam[key] / area**2)
+    assert np.isclose(per_arcsec['max_sigma'], per_arcsec['max'] * 0.1)
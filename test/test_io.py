@@ -0,0 +1,86 @@
+import sys
+sys.path.append('.')
+import numpy as np
+import pytest
+from astropy.io import fits
+import casa_fits as cf
+
+
+def test_load_fits_window():
+    img = cf.load_fits('fits/twhya_n2hp.fits', width=64, height=32, chan=(3, 6))
+    assert img.data.shape == (1, 3, 32, 64)
+    assert (img.width, img.height, img.nchan) == (64, 32, 3)
+    assert img.nbytes_read == img.data.size * 4
+    with fits.open('fits/twhya_n2hp.fits') as hdul:
+        full = hdul[0].data
+    assert (img.data == full[:, 3:6, 109:141, 93:157]).all()
+
+
+def test_load_fits_full():
+    img = cf.load_fits('fits/twhya_cont.fits')
+    assert img.data.shape == (1, 1, 250, 250)
+    assert img.center_pix == (125.0, 125.0)
+
+
+def test_load_fits_lazy():
+    img = cf.load_fits('fits/twhya_n2hp.fits', lazy=True, max_planes=2)
+    full = cf.load_fits('fits/twhya_n2hp.fits')
+    assert img.data.shape == full.data.shape
+    assert img.data.nbytes_read == 0
+    for chan in range(4):
+        plane = img.get_two_dim_data(0, chan)
+        assert (plane == full.data[0, chan]).all()
+    assert len(img.data._cache) == 2
+    assert img.data.nbytes_read == 4 * 250 * 250 * 4
+
+
+def test_load_fits_chunked():
+    img = cf.load_fits('fits/twhya_n2hp.fits', chan=(2, 13), chunks=(1, 4, 64, 64))
+    full = cf.load_fits('fits/twhya_n2hp.fits', chan=(2, 13))
+    assert isinstance(img.data, cf.ChunkedArray)
+    assert img.data.shape == full.data.shape
+    assert (img.data[0, 1:5, 10:100].compute() == full.data[0, 1:5, 10:100]).all()
+    assert img.data.nanmax() == full.data.max()
+    assert abs((img.data * 2).nansum() - 2 * full.data.astype(float).sum()) < 1e-6
+
+
+def test_chunked_reductions_int():
+    data = np.arange(1, 25, dtype=np.int32).reshape(1, 2, 3, 4)
+    for values in (data, -data):
+        chunked = cf.ChunkedArray(values, chunks=(1, 1, 2, 3))
+        assert chunked.min() == values.min() and chunked.max() == values.max()
+        assert chunked.nanmin() == values.min() and chunked.nanmax() == values.max()
+        assert (chunked.max(axis=1) == values.max(axis=1)).all()
+        assert (chunked.min(axis=(2, 3), keepdims=True) == values.min(axis=(2, 3), keepdims=True)).all()
+        assert chunked.max().dtype == np.int32
+
+
+def _shift_spectral_refpix(path, refpix):
+    """Write a copy of the N2H+ cube with the spectral reference pixel moved (same spectral axis)."""
+    with fits.open('fits/twhya_n2hp.fits') as hdul:
+        header = hdul[0].header.copy()
+        data = hdul[0].data
+    header['CRVAL3'] += (refpix - header['CRPIX3']) * header['CDELT3']
+    header['CRPIX3'] = refpix
+    fits.writeto(path, data, header)
+
+
+def test_load_fits_spectral_refpix(tmp_path):
+    path = str(tmp_path / 'shifted.fits')
+    _shift_spectral_refpix(path, 8)
+    v_ref, width_ref, _ = cf.velocity_axis(cf.load_fits('fits/twhya_n2hp.fits'))
+    v, width, _ = cf.velocity_axis(cf.load_fits(path))
+    assert np.allclose(v, v_ref) and np.isclose(width, width_ref)
+
+
+def test_load_image_velocity_axis(tmp_path):
+    casatasks = pytest.importorskip('casatasks')
+    path = str(tmp_path / 'shifted.fits')
+    _shift_spectral_refpix(path, 8)
+    imagename = str(tmp_path / 'shifted.image')
+    casatasks.importfits(fitsimage=path, imagename=imagename)
+    v_fits, width_fits, unit_fits = cf.velocity_axis(cf.load_fits(path))
+    v_image, width_image, unit_image = cf.velocity_axis(cf.load_image(imagename))
+    assert unit_image == unit_fits
+    assert np.allclose(v_image, v_fits)
+    assert np.isclose(width_image, width_fits)
@@ -0,0 +1,68 @@
+import sys
+sys.path.append('.')
+import numpy as np
+from casa_fits import immoments
+
+
+def _line_cube(make_image):
+    """Gaussian lines with the center and width varying over the map, plus noise and NaN pixels."""
+    rng = np.random.default_rng(5)
+    nchan, height, width = 12, 17, 23
+    velocity = -3 + 0.5 * np.arange(nchan)
+    yy, xx = np.mgrid[:height, :width]
+    center = -1 + 2 * xx / width
+    sigma = 0.6 + yy / height
+    data = np.exp(-0.5 * ((velocity[:, None, None] - center) / sigma) ** 2) + rng.normal(0, 0.02, (nchan, height, width))
+    data += 0.1
+    data[2, 3, 4] = np.nan
+    data[:, 10, 10] = np.nan
+    img = make_image(data[np.newaxis])
+    img.freq0 = velocity[0] * 1e3
+    img.incr_hz = 500.0
+    img.unit_freq = 'm/s'
+    return img, velocity, data
+
+
+def _expected(data, velocity, valid):
+    """Moments calculated directly over the channel axis."""
+    w = np.where(valid, data, 0)
+    v = velocity[:, None, None]
+    empty = ~valid.any(axis=0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        m1 = (w * v).sum(axis=0) / w.sum(axis=0)
+        m2 = np.sqrt((w * (v - m1) ** 2).sum(axis=0) / w.sum(axis=0))
+    masked = np.where(valid, data, -np.inf)
+    moments = {
+        0: w.sum(axis=0) * 0.5,
+        1: m1,
+        2: m2,
+        8: masked.max(axis=0),
+        9: velocity[np.argmax(masked, axis=0)],
+    }
+    for result in moments.values():
+        result[empty] = np.nan
+    return moments
+
+
+def test_immoments_matches_numpy(make_image):
+    img, velocity, data = _line_cube(make_image)
+    mask2d = np.ones(data.shape[1:], dtype=bool)
+    mask2d[:, :3] = False
+    mask3d = np.random.default_rng(6).random(data.shape) > 0.2
+    finite = np.isfinite(data)
+    cases = [
+        (None, None, finite),
+        (0.3, mask2d, finite & (data >= 0.3) & mask2d),
+        (None, mask3d, finite & mask3d),
+    ]
+    for threshold, mask, valid in cases:
+        expected = _expected(data, velocity, valid)
+        for chunk_size, tile_size, workers in ((64, None, 1), (5, None, 1), (4, 6, 2), (1, 7, 3)):
+            maps = immoments(
+                img, (0, 1, 2, 8, 9), threshold=threshold, mask=mask,
+                chunk_size=chunk_size, tile_size=tile_size, workers=workers,
+            )
+            for moment, result in expected.items():
+                assert np.allclose(maps[moment].data, result, rtol=1e-9, atol=1e-9, equal_nan=True), moment
+            assert np.isnan(maps[0].data[10, 10])
+    assert maps[0].unit_data == 'Jy/beam.km/s' and maps[1].unit_data == 'km/s'
@@ -0,0 +1,44 @@
+import sys
+sys.path.append('.')
+import threading
+import matplotlib
+matplotlib.use('Agg')
+from PIL import Image as PILImage
+import casa_fits as cf
+
+
+def test_save_movie_gif(tmp_path):
+    img = cf.load_fits('fits/twhya_n2hp.fits')
+    for decimate in (None, True):
+        filename = str(tmp_path / f'movie-{decimate}.gif')
+        # At 30 dpi the axes are smaller than the image, so the decimated planes are used
+        assert cf.save_movie(img, filename, dpi=30, prefetch=2, decimate=decimate) == filename
+        with PILImage.open(filename) as movie:
+            assert movie.n_frames == 15
+            assert movie.size == (192, 144)
+
+
+def test_save_movie_read_error(tmp_path):
+    img = cf.load_fits('fits/twhya_n2hp.fits')
+    get_two_dim_data = img.get_two_dim_data
+
+    def failing(stokes=0, chan=0):
+        if chan >= 3:
+            raise OSError(f'cannot read channel {chan}')
+        return get_two_dim_data(stokes, chan)
+
+    img.get_two_dim_data = failing
+    errors = []
+
+    def run():
+        try:
+            cf.save_movie(img, str(tmp_path / 'movie.gif'), dpi=30, prefetch=1)
+        except OSError as error:
+            errors.append(error)
+
+    # The error of the reader thread reaches the caller without hanging
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    thread.join(30)
+    assert not thread.is_alive()
+    assert len(errors) == 1 and str(errors[0]) == 'cannot read channel 3'
@@ -0,0 +1,33 @@
+import sys
+sys.path.append('.')
+import os
+from functools import partial
+import numpy as np
+import casa_fits as cf
+
+
+def _plane_info(plane):
+    data = plane.data
+    return data.shape, data.flags.writeable, data.dtype.isnative, plane.freq0, float(np.nansum(data, dtype=np.float64))
+
+
+def test_map_channels_shared_memory():
+    img = cf.load_fits('fits/twhya_n2hp.fits')
+    assert not img.data.dtype.isnative
+    shm_before = set(os.listdir('/dev/shm')) if os.path.isdir('/dev/shm') else set()
+    stat = partial(cf.imstat, uncertainty=0.1)
+    for chans in (None, [14, 0, 3, 4, 11]):
+        serial = cf.map_channels(img, stat, workers=1, chans=chans)
+        parallel = cf.map_channels(img, stat, workers=2, chans=chans)
+        assert parallel == serial
+        info = cf.map_channels(img, _plane_info, workers=2, chans=chans)
+        expected = cf.map_channels(img, _plane_info, workers=1, chans=chans)
+        assert len(info) == (15 if chans is None else len(chans))
+        for (shape, writeable, native, freq0, total), (shape_1, _, _, freq0_1, total_1) in zip(info, expected):
+            # Read-only native-endian views of the shared block
+            assert shape == shape_1 == (250, 250)
+            assert not writeable and native
+            assert freq0 == freq0_1 and total == total_1
+    # The shared memory blocks are unlinked
+    if os.path.isdir('/dev/shm'):
+        assert set(os.listdir('/dev/shm')) == shm_before
@@ -0,0 +1,25 @@
+import sys
+sys.path.append('.')
+import numpy as np
+import casa_fits as cf
+from casa_fits.geometry import DiskGeometry
+
+
+def _disk_image(make_image, inc: float, PA: float):
+    """Smooth inclined disk with an azimuthal asymmetry."""
+    size = 201
+    geom = DiskGeometry((size, size), (size // 2, size // 2), inc, PA)
+    theta = np.radians(geom.theta)
+    return make_image((np.exp(-((geom.r / 40) ** 2)) * (1 + 0.3 * np.cos(theta)))[np.newaxis, np.newaxis])
+
+
+def test_polar_radial_profile_matches_radial_profile(make_image):
+    inc, PA = 40.0, 30.0
+    img = _disk_image(make_image, inc, PA)
+    r, azimuth, polar = cf.reproject_polar(img, inc, PA, nr=401, nazimuth=720)
+    for azimuth_range in (None, (20, 160)):
+        line_r, line_mean, _ = cf.radial_profile(img, azimuth_range, sample_size=2, inc=inc, PA=PA, exact=True)
+        polar_mean, _ = cf.polar_radial_profile(azimuth, polar, azimuth_range)
+        # The annulus [r, r + 2 pixels) is compared with the polar profile at its middle
+        expected = np.interp(line_r + 0.05, r, polar_mean)
+        assert np.allclose(line_mean[1:80], expected[1:80], rtol=0, atol=0.005)
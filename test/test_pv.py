@@ -0,0 +1,29 @@
+import sys
+sys.path.append('.')
+import numpy as np
+from casa_fits import pv_diagram
+
+
+def test_pv_diagram_straight_line(make_image):
+    rng = np.random.default_rng(8)
+    data = rng.normal(0, 1, (7, 30, 40))
+    img = make_image(data[np.newaxis])
+    img.freq0 = -1500.0
+    img.incr_hz = 500.0
+    img.unit_freq = 'm/s'
+    for chunk_size in (64, 3):
+        # Samples on the pixel centers along a row
+        pv = pv_diagram(img, [5, 30], [10, 10], chunk_size=chunk_size)
+        assert np.allclose(pv.data, data[:, 10, 5:31])
+        assert np.allclose(pv.offset, 0.05 * np.arange(26))
+        assert np.allclose(pv.velocity, -1.5 + 0.5 * np.arange(7))
+        # Averaged across a width of 3 pixels
+        pv = pv_diagram(img, [5, 30], [10, 10], width=0.15, chunk_size=chunk_size)
+        assert np.allclose(pv.data, data[:, 9:12, 5:31].mean(axis=1))
+        # A polyline turning upward at (20, 10)
+        pv = pv_diagram(img, [5, 20, 20], [10, 10, 25], chunk_size=chunk_size)
+        assert np.allclose(pv.data, np.concatenate([data[:, 10, 5:21], data[:, 11:26, 20]], axis=1))
+    # Samples outside the image are NaN
+    pv = pv_diagram(img, [35, 45], [5, 5])
+    assert np.allclose(pv.data[:, :5], data[:, 5, 35:40])
+    assert np.isnan(pv.data[:, 5:]).all()
@@ -0,0 +1,69 @@
+import sys
+sys.path.append('.')
+from math import ceil, cos, radians, sin, sqrt
+import numpy as np
+import casa_fits as cf
+
+
+def _radial_cut_loop(img, azimuth: float, beam_factor: float = 0.5) -> tuple:
+    """The per-step rotated-rectangle loop of the original radial_cut (empty steps are NaN)."""
+    center_x = img.width // 2
+    center_y = img.height // 2
+    img.convert_axes_unit("arcsec")
+    beam_size = max(img.beam[0] / np.abs(img.incr_x), img.beam[1] / np.abs(img.incr_y))
+    sampling_size = ceil(beam_size * beam_factor)
+    azimuth_rad = radians(azimuth - 270)
+    data = img.get_two_dim_data()
+    line_r, line_mean, line_std = [], [], []
+    direction_x = cos(azimuth_rad)
+    direction_y = sin(azimuth_rad)
+    step = 0
+    search_range = int(sqrt(sampling_size**2 + sampling_size**2) / 2 + 1)
+    while True:
+        x = int(center_x + step * direction_x)
+        y = int(center_y + step * direction_y)
+        rect_center = np.array([x, y])
+        if x < 0 or x >= img.width or y < 0 or y >= img.height:
+            break
+        line_r.append(step * np.abs(img.incr_x))
+        v_para = np.array([direction_x, direction_y]) * sampling_size * 0.5
+        v_perp = np.array([-direction_y, direction_x]) * beam_size * 0.5
+        verts = [
+            rect_center + v_para + v_perp,
+            rect_center + v_para - v_perp,
+            rect_center - v_para - v_perp,
+            rect_center - v_para + v_perp,
+        ]
+        edges = [verts[(k + 1) % 4] - verts[k] for k in range(4)]
+        sample = []
+        for i in range(-search_range, search_range + 1):
+            for j in range(-search_range, search_range + 1):
+                px = x + i
+                py = y + j
+                inside = all(
+                    edges[k][0] * (py - verts[k][1]) - edges[k][1] * (px - verts[k][0]) <= 0 for k in range(4)
+                )
+                if inside and 0 <= px < img.width and 0 <= py < img.height:
+                    sample.append(data[py, px])
+        line_mean.append(np.mean(sample) if sample else np.nan)
+        line_std.append(np.std(sample) if sample else np.nan)
+        step += sampling_size
+    return np.array(line_r), np.array(line_mean), np.array(line_std)
+
+
+def test_radial_cut_matches_loop():
+    img = cf.load_fits('fits/twhya_cont.fits')
+    azimuths = np.array([0.0, 37.5, 90.0, 200.0, 315.0])
+    line_r, line_mean, line_std = cf.radial_cut(img, azimuths)
+    assert line_mean.shape == line_std.shape == (len(azimuths), len(line_r))
+    for i, azimuth in enumerate(azimuths):
+        r, mean, std = _radial_cut_loop(img, azimuth)
+        n = len(r)
+        assert np.allclose(line_r[:n], r)
+        assert np.allclose(line_mean[i, :n], mean, equal_nan=True)
+        assert np.allclose(line_std[i, :n], std, equal_nan=True)
+        # Steps beyond the edge of the image
+        assert np.isnan(line_mean[i, n:]).all()
+        # A single azimuth gives one cut
+        single = cf.radial_cut(img, azimuth)
+        assert np.allclose(single[1], line_mean[i, : len(single[0])], equal_nan=True)
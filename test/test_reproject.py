@@ -0,0 +1,47 @@
+import sys
+sys.path.append('.')
+import numpy as np
+from astropy.wcs import WCS
+import casa_fits as cf
+from casa_fits.geometry import geometry_cache
+from casa_fits.reproject import _pix_to_sky, _sky_frame, _sky_to_pix, get_reprojection
+
+
+def _wcs(frame: tuple) -> WCS:
+    (cx, cy), (ra0, dec0), incr_x, incr_y = frame
+    wcs = WCS(naxis=2)
+    wcs.wcs.ctype = ['RA---SIN', 'DEC--SIN']
+    wcs.wcs.crval = [ra0, dec0]
+    # FITS pixels are 1-based
+    wcs.wcs.crpix = [cx + 1, cy + 1]
+    wcs.wcs.cdelt = [incr_x, incr_y]
+    return wcs
+
+
+def test_sky_projection_matches_wcs():
+    # Off-center reference pixel and different pixel scales of x and y
+    frame = ((37.3, 180.0), (165.4658166667, -34.70482388889), -2.5e-4, 4e-4)
+    wcs = _wcs(frame)
+    y, x = np.mgrid[-20:260:7, -30:220:9].astype(float)
+    ra, dec = _pix_to_sky(frame, x, y)
+    ra_wcs, dec_wcs = wcs.wcs_pix2world(x, y, 0)
+    assert np.allclose(np.degrees(ra) % 360, ra_wcs % 360, rtol=0, atol=1e-9)
+    assert np.allclose(np.degrees(dec), dec_wcs, rtol=0, atol=1e-9)
+    px, py = _sky_to_pix(frame, np.radians(ra_wcs), np.radians(dec_wcs))
+    assert np.allclose(px, x, rtol=0, atol=1e-6)
+    assert np.allclose(py, y, rtol=0, atol=1e-6)
+
+
+def test_reprojection_reused_across_channels():
+    img = cf.load_fits('fits/twhya_n2hp.fits')
+    base = cf.load_fits('fits/twhya_cont.fits', width=120, height=100)
+    geometry_cache.clear()
+    planes = [cf.reproject_image(img, base, chan=chan) for chan in (0, 5, 9)]
+    assert len(geometry_cache) == 1
+    reprojection = get_reprojection(
+        _sky_frame(base), (0, 120, 0, 100), _sky_frame(img), img.data.shape[-2:]
+    )
+    assert len(geometry_cache) == 1
+    for chan, plane in zip((0, 5, 9), planes):
+        expected = reprojection.reproject(img.get_two_dim_window(0, chan, reprojection.source_window))
+        assert np.array_equal(plane, expected, equal_nan=True)
@@ -0,0 +1,39 @@
+import sys
+sys.path.append('.')
+import numpy as np
+from casa_fits import data_range, percentile_range
+from casa_fits.scaling import data_sample
+
+
+def test_data_range(make_image):
+    rng = np.random.default_rng(2)
+    data = rng.normal(0, 1, (2, 40, 30, 30))
+    data[0, 3, :5] = np.nan
+    data[1, 17, 4, 4] = np.inf
+    img = make_image(data)
+    finite = data[np.isfinite(data)]
+    assert data_range(img) == (finite.min(), finite.max())
+    # The same pass of the sample gives the exact range
+    img = make_image(data)
+    data_sample(img, 1000)
+    assert data_range(img) == (finite.min(), finite.max())
+
+
+def test_data_range_invalidated(make_image):
+    img = make_image(np.arange(24.0).reshape(1, 2, 3, 4))
+    assert data_range(img) == (0, 23)
+    img.data = -np.arange(24.0).reshape(1, 2, 3, 4)
+    assert data_range(img) == (-23, 0)
+
+
+def test_percentile_range(make_image):
+    rng = np.random.default_rng(3)
+    data = rng.lognormal(0, 1, (1, 20, 100, 100))
+    data[0, 0, :10] = np.nan
+    img = make_image(data)
+    lower, upper = percentile_range(img, 1, 99, sample_size=50_000)
+    expected = np.nanpercentile(data, [1, 99])
+    assert np.allclose((lower, upper), expected, rtol=0.05)
+    # A sample as large as the data is the whole data
+    sample = data_sample(img, data.size)
+    assert np.array_equal(np.sort(sample), np.sort(data[np.isfinite(data)]))
@@ -0,0 +1,33 @@
+import sys
+sys.path.append('.')
+import numpy as np
+from casa_fits import extract_spectra
+
+
+def test_extract_spectra_point_source(make_image):
+    rng = np.random.default_rng(7)
+    nchan, height, width = 9, 30, 40
+    data = rng.normal(0, 0.01, (nchan, height, width))
+    spectrum = np.exp(-0.5 * ((np.arange(nchan) - 4) / 1.5) ** 2)
+    data[:, 12, 25] += spectrum
+    data[3, 13, 25] = np.nan
+    img = make_image(data[np.newaxis])
+    x = np.array([25, 5, 100])
+    y = np.array([12, 20, 5])
+    for chunk_size in (64, 4, 1):
+        # The nearest pixel
+        spectra = extract_spectra(img, x + 0.3, y - 0.4, chunk_size=chunk_size)
+        assert spectra.shape == (3, nchan)
+        assert np.allclose(spectra[0], data[:, 12, 25])
+        assert np.allclose(spectra[1], data[:, 20, 5])
+        # Outside the image
+        assert np.isnan(spectra[2]).all()
+        # Circle of 0.1 arcsec (2 pixels): the pixels whose centers are within the circle, ignoring NaN
+        yy, xx = np.mgrid[:height, :width]
+        inside = (xx - 25) ** 2 + (yy - 12) ** 2 <= 4
+        box = np.where(inside, data, np.nan)
+        mean = extract_spectra(img, x[:1], y[:1], aperture=0.1, chunk_size=chunk_size)[0]
+        total = extract_spectra(img, x[:1], y[:1], aperture=0.1, statistic='sum', chunk_size=chunk_size)[0]
+        assert np.allclose(mean, np.nanmean(box, axis=(1, 2)))
+        assert np.allclose(total, np.nansum(box, axis=(1, 2)))
+        assert np.argmax(mean) == 4